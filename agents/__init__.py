@@ -1,6 +1,7 @@
 from agents.news_scraper_agent import NewsScraperAgent
 from agents.market_data_agent import MarketDataAgent
 from agents.analytics_agent import AnalyticsAgent
+from agents.portfolio_agent import PortfolioAnalyticsAgent
 from agents.stock_insights_agent import StockInsightsAgent
 from agents.stock_parser_agent import stock_parser  
 from agents.report_generator_agent import ReportGeneratorAgent
@@ -11,4 +12,5 @@ root_agent = StockInsightsAgent(
     market_agent=MarketDataAgent(),
     analytics_agent=AnalyticsAgent(),
     report_agent=ReportGeneratorAgent(),
+    portfolio_agent=PortfolioAnalyticsAgent(),
 )
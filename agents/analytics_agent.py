@@ -1,38 +1,206 @@
+import asyncio
 import logging
-from typing import AsyncGenerator, Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncGenerator, Dict, List, Any, Optional
+from pydantic import Field
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
 from google.genai.types import Content, Part
 import re
 from datetime import datetime
+from agents.lexicon import LexiconMatcher
+from agents.sentiment_model import SentimentScorer
+from agents.sentiment_store import SentimentStore
+from agents.indicators import build_price_matrix, compute_indicators, latest_snapshot
+from agents.cross_section import rank_insights
+from agents.peer_index import PeerIndex
+from agents.rules import RULE_PARAMS
+from agents.signal_model import SignalModel
+from agents.risk import RiskAnalyzer
+from agents.blob_store import offload, load_state
+from agents.process_pool import worker_context
 
 logger = logging.getLogger(__name__)
 
 class AnalyticsAgent(BaseAgent):
+    news_lexicon: LexiconMatcher = Field(default_factory=LexiconMatcher)
+    sentiment_scorer: SentimentScorer = Field(default_factory=SentimentScorer)
+    sentiment_store: SentimentStore = Field(default_factory=SentimentStore)
+    peer_index: PeerIndex = Field(default_factory=PeerIndex)
+    signal_model: SignalModel = Field(default_factory=SignalModel)
+    risk_analyzer: RiskAnalyzer = Field(default_factory=RiskAnalyzer)
+    max_workers: Optional[int] = None
+    # Symbol lists at least this long are analysed in a process pool instead of threads
+    process_pool_threshold: int = 50
+    model_config = {"arbitrary_types_allowed": True}
+    # Long-lived analysis pool, started on first use
+    _pool: Optional[ProcessPoolExecutor] = None
+
     def __init__(self, name="AnalyticsAgent"):
         super().__init__(name=name)
     
     def _extract_stock_data(self, market_data: List) -> Dict:
-        """Extract stock data from the nested structure"""
+        """Extract the first stock's data from the nested structure"""
+        stocks = self._extract_all_stock_data(market_data)
+        return stocks[0] if stocks else {}
+    
+    def _extract_all_stock_data(self, market_data: List) -> List[Dict]:
+        """Extract every stock's data from the nested structure"""
         try:
             if not market_data or not isinstance(market_data, list):
+                return []
+            
+            stocks = []
+            for stock_entry in market_data:
+                if not isinstance(stock_entry, dict):
+                    continue
+                for symbol, data in stock_entry.items():
+                    if isinstance(data, dict) and 'summary' in data:
+                        stocks.append({
+                            'symbol': symbol,
+                            'data': data['summary'],
+                            'price_history': data.get('price_data', [])
+                        })
+            return stocks
+        except Exception as e:
+            logger.error(f"Error extracting stock data: {e}")
+            return []
+    
+    def _match_news(self, symbol: str, news_data: List) -> List:
+        """News entries belonging to one symbol"""
+        entries = [n for n in news_data or [] if isinstance(n, dict)]
+        tagged = [n for n in entries if n.get('symbol') == symbol]
+        if tagged:
+            return tagged
+        # Older entries only carry the search query they were fetched with
+        pattern = re.compile(rf"\b{re.escape(symbol)}\b", re.IGNORECASE)
+        return [n for n in entries if 'symbol' not in n and pattern.search(str(n.get('stock', '')))]
+    
+    def _analyze_symbol(self, stock_data: Dict, news_entries: List, indicators: Dict = None, risk: Dict = None,
+                        peers: Dict = None, sentiment: Dict = None) -> Dict:
+        """
+        Full technical, fundamental, news and recommendation analysis for one
+        symbol. Reads no stores, so it can run in a pool worker: peer
+        percentiles and scored sentiment are passed in by the caller.
+        """
+        symbol = stock_data.get('symbol', 'Unknown')
+        technical_analysis = self._analyze_technical_indicators(stock_data, indicators)
+        fundamental_analysis = self._analyze_fundamental_metrics(stock_data, risk, peers)
+        news_analysis = self._analyze_news_sentiment(news_entries, symbol, sentiment)
+        recommendations = self._generate_investment_recommendations(technical_analysis, fundamental_analysis, news_analysis)
+        
+        comprehensive_report = self._generate_comprehensive_report(
+            symbol,
+            technical_analysis,
+            fundamental_analysis,
+            news_analysis,
+            recommendations
+        )
+        
+        return {
+            "symbol": symbol,
+            "technical_analysis": technical_analysis,
+            "fundamental_analysis": fundamental_analysis,
+            "news_analysis": news_analysis,
+            "recommendations": recommendations,
+            "comprehensive_report": comprehensive_report,
+            "analysis_timestamp": datetime.now().isoformat()
+        }
+    
+    async def _analyze_all(self, stocks: List[Dict], news_data: List, snapshots: Dict[str, Dict],
+                           risk_metrics: Dict[str, Dict] = None) -> List[Dict]:
+        """Analyse every symbol concurrently; large lists go to a process pool"""
+        risk_metrics = risk_metrics or {}
+        news = {stock['symbol']: self._match_news(stock['symbol'], news_data) for stock in stocks}
+        # Shared state is read and written here only: peer lookups, then one scoring batch
+        # whose results are recorded in the sentiment store before the per-symbol analysis
+        sentiment = await asyncio.to_thread(self._score_and_record_news, news)
+        jobs = [
+            (stock, news[stock['symbol']], snapshots.get(stock['symbol']), risk_metrics.get(stock['symbol']),
+             self.peer_index.peer_percentiles(stock.get('data', {})), sentiment.get(stock['symbol']))
+            for stock in stocks
+        ]
+        
+        if len(jobs) >= self.process_pool_threshold:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            return list(await asyncio.gather(*(
+                loop.run_in_executor(pool, _analyze_symbol_in_worker, *job) for job in jobs
+            )))
+        
+        semaphore = asyncio.Semaphore(self.max_workers or 8)
+        
+        async def _run(job):
+            async with semaphore:
+                return await asyncio.to_thread(self._analyze_symbol, *job)
+        
+        return list(await asyncio.gather(*(_run(job) for job in jobs)))
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Not forked from this process, which runs the peer-index thread and holds store locks
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=worker_context())
+        return self._pool
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def _collect_articles(self, news_data: List) -> List[Dict]:
+        """News entries carry their articles under 'articles'; accept bare articles too"""
+        articles = []
+        for item in news_data or []:
+            if isinstance(item, dict) and isinstance(item.get('articles'), list):
+                articles.extend(item['articles'])
+            elif isinstance(item, dict):
+                articles.append(item)
+        return articles
+    
+    def _score_and_record_news(self, news: Dict[str, List]) -> Dict[str, Dict]:
+        """
+        Score every symbol's articles in one batch, record them in the sentiment
+        store and read back the trend features: {symbol: {"scored", "trend"}}
+        """
+        articles = {symbol: self._collect_articles(entries) for symbol, entries in news.items()}
+        batch = self.sentiment_scorer.score_articles([a for symbol_articles in articles.values() for a in symbol_articles])
+        
+        sentiment, offset = {}, 0
+        for symbol, symbol_articles in articles.items():
+            scored = dict(batch, articles=batch["articles"][offset:offset + len(symbol_articles)])
+            offset += len(symbol_articles)
+            trend = {}
+            if symbol_articles:
+                try:
+                    self.sentiment_store.record_articles(symbol, symbol_articles, scored["articles"])
+                    trend = self.sentiment_store.get_features(symbol)
+                except Exception as e:
+                    logger.warning(f"Sentiment store unavailable for {symbol}: {e}")
+            sentiment[symbol] = {"scored": scored, "trend": trend}
+        return sentiment
+    
+    def _compute_indicator_snapshots(self, market_data: List) -> Dict[str, Dict]:
+        """Run the vectorised indicator engine once over every symbol's price history"""
+        try:
+            symbols, dates, prices = build_price_matrix(market_data)
+            if not symbols or not dates:
                 return {}
-            
-            stock_entry = market_data[0]
-            for symbol, data in stock_entry.items():
-                if isinstance(data, dict) and 'summary' in data:
-                    return {
-                        'symbol': symbol,
-                        'data': data['summary'],
-                        'price_history': data.get('price_data', [])
-                    }
+            return latest_snapshot(symbols, compute_indicators(prices))
+        except Exception as e:
+            logger.error(f"Error computing technical indicators: {e}")
             return {}
+    
+    def _compute_risk_metrics(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Realised risk for every symbol at once from the stored daily history"""
+        try:
+            return self.risk_analyzer.analyze(symbols)
         except Exception as e:
-            logger.error(f"Error extracting stock data: {e}")
+            logger.error(f"Error computing risk metrics: {e}")
             return {}
     
-    def _analyze_technical_indicators(self, stock_data: Dict) -> Dict:
+    def _analyze_technical_indicators(self, stock_data: Dict, indicators: Dict = None) -> Dict:
         """Comprehensive technical analysis"""
         try:
             data = stock_data.get('data', {})
@@ -60,7 +228,8 @@ class AnalyticsAgent(BaseAgent):
             
             # Volume analysis
             volume_ratio = volume / avg_volume if avg_volume > 0 else 1
-            volume_signal = "High" if volume_ratio > 1.5 else "Above Average" if volume_ratio > 1.2 else "Normal"
+            volume_signal = ("High" if volume_ratio > RULE_PARAMS["volume_high"]
+                             else "Above Average" if volume_ratio > RULE_PARAMS["volume_above_average"] else "Normal")
             
             # Trend analysis from recent data using dynamic keys
             if len(price_history) >= 3:
@@ -85,9 +254,27 @@ class AnalyticsAgent(BaseAgent):
                 resistance = data.get('High', 0)
                 support = data.get('Low', 0)
             
+            # Signals from the indicator engine, where enough history exists
+            indicators = indicators or {}
+            rsi = indicators.get('rsi_14')
+            rsi_signal = "N/A" if rsi is None else "Overbought" if rsi > 70 else "Oversold" if rsi < 30 else "Neutral"
+            if indicators.get('macd') is None or indicators.get('macd_signal') is None:
+                macd_trend = "N/A"
+            else:
+                macd_trend = "Bullish" if indicators['macd'] > indicators['macd_signal'] else "Bearish"
+            ma_alignment = "N/A"
+            if all(indicators.get(k) is not None for k in ('sma_20', 'sma_50', 'sma_200')):
+                if indicators['sma_20'] > indicators['sma_50'] > indicators['sma_200']:
+                    ma_alignment = "Bullish"
+                elif indicators['sma_20'] < indicators['sma_50'] < indicators['sma_200']:
+                    ma_alignment = "Bearish"
+                else:
+                    ma_alignment = "Mixed"
+            
             return {
                 "price_change_percent": round(change_percent, 2),
-                "momentum": "Bullish" if change_percent > 1 else "Bearish" if change_percent < -1 else "Neutral",
+                "momentum": ("Bullish" if change_percent > RULE_PARAMS["momentum_threshold"]
+                             else "Bearish" if change_percent < -RULE_PARAMS["momentum_threshold"] else "Neutral"),
                 "year_high_distance": round(year_high_distance, 1),
                 "year_low_distance": round(year_low_distance, 1),
                 "volume_signal": volume_signal,
@@ -95,34 +282,49 @@ class AnalyticsAgent(BaseAgent):
                 "trend": trend,
                 "support_level": round(support, 2),
                 "resistance_level": round(resistance, 2),
-                "position_strength": "Strong" if year_low_distance > 50 else "Moderate" if year_low_distance > 20 else "Weak"
+                "position_strength": "Strong" if year_low_distance > 50 else "Moderate" if year_low_distance > 20 else "Weak",
+                "rsi_signal": rsi_signal,
+                "macd_trend": macd_trend,
+                "ma_alignment": ma_alignment,
+                "indicators": indicators
             }
         except Exception as e:
             logger.error(f"Error in technical analysis: {e}")
             return {"error": "Technical analysis failed"}
     
-    def _analyze_fundamental_metrics(self, stock_data: Dict) -> Dict:
+    def _analyze_fundamental_metrics(self, stock_data: Dict, risk: Dict = None, peers: Dict = None) -> Dict:
         """Comprehensive fundamental analysis"""
         try:
             data = stock_data.get('data', {})
             
             # Key metrics
-            pe_ratio = data.get('P/E Ratio (TTM)', 0)
+            pe_ratio = data.get('P/E Ratio (TTM)')
             forward_pe = data.get('Forward P/E', 0)
             eps = data.get('EPS (TTM)', 0)
             pb_ratio = data.get('P/B Ratio', 0)
             dividend_yield = data.get('Dividend Yield', 0)
-            beta = data.get('Beta', 1.0)
+            # Yahoo's beta when reported, otherwise the beta realised against the benchmark
+            risk = risk or {}
+            if isinstance(data.get('Beta'), (int, float)):
+                beta, beta_source = data['Beta'], "reported"
+            elif risk.get('beta') is not None:
+                beta, beta_source = risk['beta'], f"realised vs {risk.get('benchmark')}"
+            else:
+                beta, beta_source = 1.0, "default"
             market_cap = data.get('Market Cap (USD)', 0)
             
-            # Valuation assessment
-            if pe_ratio > 35:
+            # Valuation assessment; a missing P/E scores neutral, as in agents.backtest.rule_scores
+            if not isinstance(pe_ratio, (int, float)) or pe_ratio != pe_ratio:
+                pe_ratio = None
+                valuation = "Unknown"
+                valuation_score = 3
+            elif pe_ratio > RULE_PARAMS["pe_expensive"]:
                 valuation = "Expensive"
                 valuation_score = 2
-            elif pe_ratio > 20:
+            elif pe_ratio > RULE_PARAMS["pe_fair"]:
                 valuation = "Fair Value"
                 valuation_score = 3
-            elif pe_ratio > 15:
+            elif pe_ratio > RULE_PARAMS["pe_attractive"]:
                 valuation = "Attractive"
                 valuation_score = 4
             else:
@@ -130,7 +332,7 @@ class AnalyticsAgent(BaseAgent):
                 valuation_score = 5
             
             # Growth prospects
-            growth_outlook = "Strong" if forward_pe < pe_ratio and eps > 10 else "Moderate" if eps > 5 else "Weak"
+            growth_outlook = "Strong" if pe_ratio is not None and forward_pe < pe_ratio and eps > 10 else "Moderate" if eps > 5 else "Weak"
             
             # Risk assessment
             if beta > 1.3:
@@ -151,10 +353,10 @@ class AnalyticsAgent(BaseAgent):
                 dividend_rating = "Growth Focus"
             
             # Market cap category
-            if market_cap > 1000000000000:  # >$1T
+            if market_cap > RULE_PARAMS["mega_cap"]:  # >$1T
                 size_category = "Mega Cap"
                 stability_score = 5
-            elif market_cap > 200000000000:  # >$200B
+            elif market_cap > RULE_PARAMS["large_cap"]:  # >$200B
                 size_category = "Large Cap"
                 stability_score = 4
             else:
@@ -170,52 +372,45 @@ class AnalyticsAgent(BaseAgent):
                 "growth_outlook": growth_outlook,
                 "risk_level": risk_level,
                 "beta": beta,
+                "beta_source": beta_source,
+                "risk_metrics": risk,
                 "dividend_yield": dividend_yield,
                 "dividend_rating": dividend_rating,
                 "size_category": size_category,
                 "stability_score": stability_score,
-                "pb_ratio": pb_ratio
+                "pb_ratio": pb_ratio,
+                "sector": self._get_sector_info(stock_data.get('symbol', ''), data.get('Sector')),
+                "industry": data.get('Industry'),
+                # Constant-time lookups against the precomputed sector/industry sketches
+                "peer_percentiles": peers if peers is not None else self.peer_index.peer_percentiles(data)
             }
         except Exception as e:
             logger.error(f"Error in fundamental analysis: {e}")
             return {"error": "Fundamental analysis failed"}
     
-    def _analyze_news_sentiment(self, news_data: List) -> Dict:
-        """Advanced news sentiment analysis"""
+    def _analyze_news_sentiment(self, news_data: List, symbol: str = None, sentiment: Dict = None) -> Dict:
+        """
+        Advanced news sentiment analysis. `sentiment` is the symbol's entry from
+        `_score_and_record_news`; without it the articles are scored here and
+        no trend is reported.
+        """
         try:
-            if not news_data:
+            articles = self._collect_articles(news_data)
+            
+            if not articles:
                 return {"sentiment": "Neutral", "impact": "No recent news"}
             
-            # Sentiment keywords
-            positive_words = ['growth', 'strong', 'beat', 'profit', 'increase', 'bullish', 'upgrade', 'outperform', 'buy', 'gains']
-            negative_words = ['decline', 'loss', 'weak', 'miss', 'decrease', 'bearish', 'downgrade', 'underperform', 'sell', 'falls']
-            neutral_words = ['analysis', 'report', 'update', 'position', 'hold']
-            
-            sentiment_score = 0
-            total_articles = len(news_data)
-            themes = []
-            
-            for article in news_data:
-                title = article.get('title', '').lower()
-                
-                # Count sentiment words
-                positive_count = sum(1 for word in positive_words if word in title)
-                negative_count = sum(1 for word in negative_words if word in title)
-                
-                if positive_count > negative_count:
-                    sentiment_score += 1
-                elif negative_count > positive_count:
-                    sentiment_score -= 1
-                
-                # Extract themes
-                if any(word in title for word in ['dividend', 'yield']):
-                    themes.append('Dividend Focus')
-                if any(word in title for word in ['position', 'investment', 'portfolio']):
-                    themes.append('Institutional Interest')
-                if any(word in title for word in ['competition', 'vs', 'compared']):
-                    themes.append('Competitive Analysis')
-                if any(word in title for word in ['earnings', 'profit', 'revenue']):
-                    themes.append('Financial Performance')
+            scores = self.news_lexicon.score_batch([article.get('title', '') for article in articles])
+            aggregate = scores["aggregate"]
+            
+            sentiment_score = aggregate["net_sentiment"]
+            total_articles = aggregate["total_articles"]
+            
+            # Continuous title + body score from the local sentiment model, with the
+            # trend features of the daily series it was recorded into
+            sentiment = sentiment or {"scored": self.sentiment_scorer.score_articles(articles), "trend": {}}
+            model_sentiment = self.sentiment_scorer.summarize(sentiment["scored"])
+            sentiment_trend = sentiment["trend"]
             
             # Overall sentiment
             if sentiment_score > 1:
@@ -228,9 +423,12 @@ class AnalyticsAgent(BaseAgent):
             return {
                 "sentiment": overall_sentiment,
                 "sentiment_score": sentiment_score,
+                "weighted_score": aggregate["weighted_score"],
                 "total_articles": total_articles,
-                "key_themes": list(set(themes)),
-                "impact": f"{overall_sentiment} sentiment across {total_articles} recent articles"
+                "key_themes": list(aggregate["theme_counts"]),
+                "impact": f"{overall_sentiment} sentiment across {total_articles} recent articles",
+                **model_sentiment,
+                "sentiment_trend": sentiment_trend
             }
         except Exception as e:
             logger.error(f"Error in news analysis: {e}")
@@ -250,7 +448,10 @@ class AnalyticsAgent(BaseAgent):
             stability_score = fundamental.get("stability_score", 3)
             
             news_score = 3  # Default neutral
-            if news.get("sentiment") == "Positive":
+            if news.get("model_confidence"):
+                # Continuous model score in [-1, 1], shrunk towards neutral by its confidence
+                news_score = round(3 + 2 * news["model_score"] * news["model_confidence"], 2)
+            elif news.get("sentiment") == "Positive":
                 news_score = 4
             elif news.get("sentiment") == "Negative":
                 news_score = 2
@@ -288,11 +489,11 @@ class AnalyticsAgent(BaseAgent):
                 recommendations["income"] = {"action": "AVOID", "confidence": "High", "rationale": "Insufficient dividend yield"}
             
             # Overall recommendation
-            if overall_score >= 4:
+            if overall_score >= RULE_PARAMS["strong_buy_score"]:
                 overall_action = "STRONG BUY"
-            elif overall_score >= 3.5:
+            elif overall_score >= RULE_PARAMS["buy_score"]:
                 overall_action = "BUY"
-            elif overall_score >= 2.5:
+            elif overall_score >= RULE_PARAMS["hold_score"]:
                 overall_action = "HOLD"
             else:
                 overall_action = "CONSIDER SELLING"
@@ -309,9 +510,12 @@ class AnalyticsAgent(BaseAgent):
             logger.error(f"Error generating recommendations: {e}")
             return {"overall_action": "HOLD", "error": "Recommendation generation failed"}
     
-    def _get_sector_info(self, symbol: str) -> str:
-        """Get sector information based on stock symbol"""
-        # Common sector mappings - can be expanded or made dynamic
+    def _get_sector_info(self, symbol: str, fetched_sector: str = None) -> str:
+        """Get sector information, preferring the sector fetched with the market data"""
+        if fetched_sector:
+            return fetched_sector
+        
+        # Fallback sector mappings for symbols without a fetched sector
         sector_map = {
             'MSFT': 'Technology',
             'AAPL': 'Technology', 
@@ -329,7 +533,7 @@ class AnalyticsAgent(BaseAgent):
     def _generate_comprehensive_report(self, symbol: str, technical: Dict, fundamental: Dict, news: Dict, recommendations: Dict) -> str:
         """Generate a comprehensive 1-page analysis report"""
         
-        sector = self._get_sector_info(symbol)
+        sector = fundamental.get('sector') or self._get_sector_info(symbol)
         
         # Header
         report = f"""
@@ -362,6 +566,11 @@ The stock is positioned {technical.get('position_strength', 'moderately')} withi
 • **Resistance Level:** ${technical.get('resistance_level', 'N/A')}
 • **52W Position:** {technical.get('year_low_distance', 0):.1f}% above yearly low, {technical.get('year_high_distance', 0):.1f}% below yearly high
 • **Technical Strength:** {technical.get('position_strength', 'Moderate')}
+• **RSI (14):** {technical.get('indicators', {}).get('rsi_14', 'N/A')} ({technical.get('rsi_signal', 'N/A')})
+• **MACD:** {technical.get('indicators', {}).get('macd', 'N/A')} vs signal {technical.get('indicators', {}).get('macd_signal', 'N/A')} ({technical.get('macd_trend', 'N/A')})
+• **Moving Averages:** SMA20 {technical.get('indicators', {}).get('sma_20', 'N/A')} | SMA50 {technical.get('indicators', {}).get('sma_50', 'N/A')} | SMA200 {technical.get('indicators', {}).get('sma_200', 'N/A')} ({technical.get('ma_alignment', 'N/A')})
+• **Bollinger Bands (20, 2):** {technical.get('indicators', {}).get('bollinger_lower', 'N/A')} - {technical.get('indicators', {}).get('bollinger_upper', 'N/A')}
+• **ATR (14):** {technical.get('indicators', {}).get('atr_14', 'N/A')} | **OBV:** {technical.get('indicators', {}).get('obv', 'N/A')}
 
 """
         
@@ -369,13 +578,14 @@ The stock is positioned {technical.get('position_strength', 'moderately')} withi
         report += f"""
 💼 **FUNDAMENTAL ANALYSIS**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• **Valuation:** {fundamental.get('valuation', 'Unknown')} (P/E: {fundamental.get('pe_ratio', 'N/A')})
+• **Valuation:** {fundamental.get('valuation', 'Unknown')} (P/E: {fundamental.get('pe_ratio') or 'N/A'})
 • **Forward P/E:** {fundamental.get('forward_pe', 'N/A')} (Growth outlook: {fundamental.get('growth_outlook', 'Unknown')})
 • **Earnings Power:** ${fundamental.get('eps', 'N/A')} EPS (TTM)
 • **Dividend Profile:** {fundamental.get('dividend_rating', 'Unknown')} ({fundamental.get('dividend_yield', 0):.1f}% yield)
 • **Risk Level:** {fundamental.get('risk_level', 'Unknown')} (Beta: {fundamental.get('beta', 'N/A')})
 • **Market Position:** {fundamental.get('size_category', 'Unknown')} company
 • **Book Value:** P/B Ratio of {fundamental.get('pb_ratio', 'N/A')}
+• **Peer Percentiles:** {self._format_peer_percentiles(fundamental.get('peer_percentiles', {}))}
 
 """
         
@@ -387,6 +597,8 @@ The stock is positioned {technical.get('position_strength', 'moderately')} withi
 • **Key Themes:** {', '.join(news.get('key_themes', ['None identified']))}
 • **Market Impact:** {news.get('impact', 'Unknown')}
 • **Sentiment Score:** {news.get('sentiment_score', 0):+d}/±{news.get('total_articles', 0)}
+• **Model Sentiment:** {news.get('model_score', 0):+.2f} (confidence {news.get('model_confidence', 0):.0%})
+• **Sentiment Trend:** 7D {news.get('sentiment_trend', {}).get('mean_7d', 'N/A')} | 30D {news.get('sentiment_trend', {}).get('mean_30d', 'N/A')} | Decayed {news.get('sentiment_trend', {}).get('decayed_sentiment', 'N/A')}
 
 """
         
@@ -406,7 +618,8 @@ The stock is positioned {technical.get('position_strength', 'moderately')} withi
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 • **Stop Loss Level:** Below ${technical.get('support_level', 'N/A')} (Support break)
 • **Profit Target:** Above ${technical.get('resistance_level', 'N/A')} (Resistance break)
-• **Volatility Risk:** {fundamental.get('risk_level', 'Unknown')} based on Beta {fundamental.get('beta', 'N/A')}
+• **Volatility Risk:** {fundamental.get('risk_level', 'Unknown')} based on Beta {fundamental.get('beta', 'N/A')} ({fundamental.get('beta_source', 'reported')})
+• **Realised Risk:** {self._format_risk_metrics(fundamental.get('risk_metrics', {}))}
 • **Valuation Risk:** {fundamental.get('valuation', 'Unknown')} at current P/E levels
 • **Volume Confirmation:** Watch for {technical.get('volume_signal', 'normal')} volume continuation
 
@@ -420,6 +633,7 @@ The stock is positioned {technical.get('position_strength', 'moderately')} withi
 • Fundamental Score: {recommendations.get('fundamental_score', 0)}/5 ⭐
 • News Sentiment: {recommendations.get('news_score', 0)}/5 ⭐
 • **Overall Rating: {recommendations.get('overall_score', 0)}/5.0 ⭐**
+• Model Signal: {self._format_model_signal(recommendations.get('model_signal'))}
 
 **Final Recommendation: {recommendations.get('overall_action', 'HOLD')}**
 
@@ -430,54 +644,141 @@ Please consult with a financial advisor before making investment decisions.*
         
         return report.strip()
     
+    def _format_model_signal(self, signal: Dict = None) -> str:
+        """Model signal next to the rule-based score, or N/A without a trained model"""
+        if not signal:
+            return "N/A"
+        return f"{signal['signal']} ({signal['confidence']:.0%} probability, model {signal.get('model_version', 'unknown')})"
+    
+    def _attach_model_signals(self, insights: Dict[str, Dict], market_data: List) -> Dict:
+        """Score every symbol with the signal model in one batch and add it to the recommendations"""
+        try:
+            sentiment = {symbol: insight["news_analysis"].get("model_score") for symbol, insight in insights.items()}
+            signals = self.signal_model.score_market_data(market_data, sentiment)
+            for symbol, signal in signals.items():
+                insight = insights.get(symbol)
+                if not insight:
+                    continue
+                insight["recommendations"]["model_signal"] = signal
+                insight["comprehensive_report"] = self._generate_comprehensive_report(
+                    symbol,
+                    insight["technical_analysis"],
+                    insight["fundamental_analysis"],
+                    insight["news_analysis"],
+                    insight["recommendations"]
+                )
+            if not signals:
+                return {}
+            return {
+                "model_version": self.signal_model.metadata.get("version"),
+                "latency_ms": self.signal_model.last_latency_ms,
+                "tickers": len(signals)
+            }
+        except Exception as e:
+            logger.error(f"Error scoring the signal model: {e}")
+            return {}
+    
+    def _format_risk_metrics(self, risk: Dict) -> str:
+        """Volatility, VaR/CVaR, drawdown and realised beta from the stored history"""
+        if not risk or risk.get('volatility') is None:
+            return "N/A (insufficient stored price history)"
+        
+        def pct(value):
+            return "N/A" if value is None else f"{value:.1%}"
+        
+        parts = [
+            f"Volatility {pct(risk.get('volatility'))} annualised",
+            f"95% 1-day VaR {pct(risk.get('var_historical'))} hist / {pct(risk.get('var_parametric'))} normal",
+            f"CVaR {pct(risk.get('cvar_historical'))}",
+            f"Max drawdown {pct(risk.get('max_drawdown'))}",
+        ]
+        if risk.get('beta') is not None:
+            parts.append(f"Realised beta {risk['beta']:.2f} vs {risk.get('benchmark')}")
+        return " | ".join(parts) + f" ({risk.get('observations', 0)} days)"
+    
+    def _format_peer_percentiles(self, peers: Dict) -> str:
+        """One-line summary of P/E, P/B and beta against peers"""
+        labels = {"pe_ratio": "P/E", "pb_ratio": "P/B", "beta": "Beta"}
+        parts = [
+            f"{label} at percentile {peers[metric]['percentile']:.0f} (median {peers[metric]['peer_median']:.2f}, {peers[metric]['peers']} {peers[metric]['group']} peers)"
+            for metric, label in labels.items() if metric in peers
+        ]
+        return " | ".join(parts) or "N/A"
+    
+    def _combine_reports(self, insights: Dict[str, Dict], rankings: Dict = None) -> str:
+        """One combined message: an overview line per symbol followed by each full report"""
+        if len(insights) == 1:
+            return next(iter(insights.values()))["comprehensive_report"]
+        
+        overview = ["📊 **MULTI-STOCK ANALYSIS OVERVIEW**", ""]
+        if rankings and rankings.get("table"):
+            # Cross-sectional order: sector-relative composite score
+            ranked = [insights[row["symbol"]] for row in rankings["table"]]
+            rows = {row["symbol"]: row for row in rankings["table"]}
+        else:
+            ranked = sorted(insights.values(), key=lambda i: i["recommendations"].get("overall_score", 0), reverse=True)
+            rows = {}
+        for insight in ranked:
+            rec = insight["recommendations"]
+            line = f"• **{insight['symbol']}:** {rec.get('overall_action', 'HOLD')} ({rec.get('overall_score', 0)}/5.0)"
+            row = rows.get(insight['symbol'])
+            if row:
+                line += (f" | Rank #{row['rank']} | {row['sector']} #{row['sector_rank']}/{row['sector_size']}"
+                         f" | Relative score {row['composite_score']}")
+            overview.append(line)
+        
+        reports = [insight["comprehensive_report"] for insight in ranked]
+        return "\n".join(overview) + "\n\n" + "\n\n".join(reports)
+    
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         try:
             # Get data from session state
-            market_data = ctx.session.state.get("market_data", [])
-            news_data = ctx.session.state.get("news_analysis", [])
+            market_data = load_state(ctx.session.state, "market_data", [])
+            news_data = load_state(ctx.session.state, "news_analysis", [])
             
             logger.info(f"Processing comprehensive analysis for {len(market_data)} stocks")
             
             # Extract stock data
-            stock_data = self._extract_stock_data(market_data)
+            stocks = self._extract_all_stock_data(market_data)
             
-            if not stock_data:
+            if not stocks:
                 yield Event(
                     author="agent",
                     content=Content(parts=[Part(text="❌ No valid stock data found for comprehensive analysis.")])
                 )
                 return
             
-            # Perform comprehensive analysis
-            technical_analysis = self._analyze_technical_indicators(stock_data)
-            fundamental_analysis = self._analyze_fundamental_metrics(stock_data)
-            news_analysis = self._analyze_news_sentiment(news_data)
-            recommendations = self._generate_investment_recommendations(technical_analysis, fundamental_analysis, news_analysis)
-            
-            # Generate comprehensive report
-            comprehensive_report = self._generate_comprehensive_report(
-                stock_data.get('symbol', 'Unknown'),
-                technical_analysis,
-                fundamental_analysis,
-                news_analysis,
-                recommendations
-            )
-            
-            # Store comprehensive insights
-            ctx.session.state["stock_insights"] = {
-                "symbol": stock_data.get('symbol', 'Unknown'),
-                "technical_analysis": technical_analysis,
-                "fundamental_analysis": fundamental_analysis,
-                "news_analysis": news_analysis,
-                "recommendations": recommendations,
-                "comprehensive_report": comprehensive_report,
-                "analysis_timestamp": datetime.now().isoformat()
-            }
-            
-            # Send the comprehensive report
+            # Perform comprehensive analysis for every symbol
+            indicator_snapshots = self._compute_indicator_snapshots(market_data)
+            risk_metrics = await asyncio.to_thread(self._compute_risk_metrics, [stock['symbol'] for stock in stocks])
+            results = await self._analyze_all(stocks, news_data, indicator_snapshots, risk_metrics)
+            insights = {result["symbol"]: result for result in results}
+            
+            # Model signal alongside the rule-based score, one batched inference call
+            model_stats = await asyncio.to_thread(self._attach_model_signals, insights, market_data)
+            if model_stats:
+                logger.info(f"Signal model scored {model_stats['tickers']} tickers in {model_stats['latency_ms']}ms")
+                ctx.session.state["signal_model"] = model_stats
+            
+            # Feed the freshly fetched fundamentals to the peer index; sketches rebuild in the background
+            self.peer_index.update_many({stock['symbol']: stock['data'] for stock in stocks})
+            
+            # Store comprehensive insights keyed by symbol
+            ctx.session.state["stock_insights"] = offload(insights)
+            
+            # Sector-relative cross-sectional ranking across the analysed symbols
+            rankings = None
+            if len(insights) > 1:
+                try:
+                    rankings = rank_insights(insights)
+                    ctx.session.state["stock_rankings"] = rankings
+                except Exception as e:
+                    logger.error(f"Error ranking stocks cross-sectionally: {e}")
+            
+            # Send one combined report
             yield Event(
                 author="agent",
-                content=Content(parts=[Part(text=comprehensive_report)])
+                content=Content(parts=[Part(text=self._combine_reports(insights, rankings))])
             )
             
         except Exception as e:
@@ -485,4 +786,16 @@ Please consult with a financial advisor before making investment decisions.*
             yield Event(
                 author="agent",
                 content=Content(parts=[Part(text=f"❌ Comprehensive analysis failed: {str(e)}")])
-            )
\ No newline at end of file
+            )
+
+
+_worker_agent = None
+
+
+def _analyze_symbol_in_worker(stock_data: Dict, news_entries: List, indicators: Dict = None, risk: Dict = None,
+                              peers: Dict = None, sentiment: Dict = None) -> Dict:
+    """Process-pool entry point: one AnalyticsAgent per worker process, used only for its pure analysis"""
+    global _worker_agent
+    if _worker_agent is None:
+        _worker_agent = AnalyticsAgent()
+    return _worker_agent._analyze_symbol(stock_data, news_entries, indicators, risk, peers, sentiment)
@@ -0,0 +1,237 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process index lock, so one process per reports directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+DEFAULT_MAX_BYTES = int(float(os.getenv("REPORTS_MAX_MB", "500")) * 1024 * 1024)
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("REPORTS_MAX_AGE_DAYS", "30"))
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+# Artifact kinds stored gzip-compressed; PDFs are already compressed
+COMPRESSED_KINDS = ("txt",)
+
+
+class ArtifactStore:
+    """
+    Report files sharded by date and content hash:
+    `<root>/<YYYY>/<MM>/<DD>/<hash[:2]>/<hash>.<kind>[.gz]`.
+
+    Identical content is stored once and reference-counted. An index maps each
+    report name to its symbols, date and object so lookups never list the tree.
+    Size and age limits are enforced by a background eviction thread.
+
+    Several processes may share a root: every change re-reads the index under
+    an exclusive file lock and writes it back before releasing it, and reads
+    reload the index whenever another process has replaced it.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.root = root or DEFAULT_REPORTS_DIR
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        # (inode, mtime) of the index file `_index` was read from
+        self._index_stamp: Optional[tuple] = None
+        self._lock = threading.Lock()
+        # Serialises this process's index changes; the file lock serialises processes
+        self._persist_lock = threading.Lock()
+        self._evictor: Optional[threading.Thread] = None
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.index_path)
+            return stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """The index, re-read when the file changed since it was loaded. Caller holds the lock."""
+        stamp = self._stamp()
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {"artifacts": {}, "objects": {}}
+            except Exception as e:
+                logger.error(f"Error loading report index from {self.index_path}: {e}")
+                self._index = {"artifacts": {}, "objects": {}}
+            self._index_stamp = stamp
+        return self._index
+
+    @contextlib.contextmanager
+    def _update(self):
+        """
+        Exclusive read-modify-write of the index: yields the current on-disk
+        index under the lock and persists it afterwards, so changes made by
+        other processes sharing the root are kept rather than overwritten.
+        """
+        with self._persist_lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    with self._lock:
+                        try:
+                            yield self._load()
+                        except BaseException:
+                            # Partially applied: drop it and read the file again next time
+                            self._index = None
+                            raise
+                        payload = json.dumps(self._index)
+                    self._persist(payload)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _persist(self, payload: str):
+        try:
+            # Per-writer temp file: other processes may share the reports directory
+            tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.index_path)
+            with self._lock:
+                self._index_stamp = self._stamp()
+        except Exception as e:
+            logger.error(f"Error persisting report index to {self.index_path}: {e}")
+
+    def put(self, name: str, data: bytes, kind: str, symbols: List[str]) -> Dict[str, Any]:
+        """Store a report file under `name`; returns its index entry with the stored file's `path`"""
+        digest = hashlib.sha256(data).hexdigest()
+        now = datetime.now()
+        compressed = kind in COMPRESSED_KINDS
+
+        entry = {
+            "name": name,
+            "kind": kind,
+            "symbols": list(symbols),
+            "date": now.strftime("%Y-%m-%d"),
+            "created_at": time.time(),
+            "hash": digest,
+        }
+        # Held across the write so eviction cannot delete an object that is being referenced again
+        with self._update() as index:
+            obj = index["objects"].get(digest)
+            if obj is None:
+                suffix = f".{kind}.gz" if compressed else f".{kind}"
+                relative = os.path.join(now.strftime("%Y"), now.strftime("%m"), now.strftime("%d"), digest[:2], digest + suffix)
+                path = os.path.join(self.root, relative)
+                stored = gzip.compress(data, mtime=0) if compressed else data
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(stored)
+                os.replace(tmp_path, path)
+                obj = index["objects"][digest] = {
+                    "path": relative, "size": len(stored), "raw_size": len(data), "refs": 0, "compressed": compressed
+                }
+            obj["refs"] += 1
+            entry["path"] = obj["path"]
+            replaced = index["artifacts"].pop(name, None)
+            if replaced:
+                self._release(replaced["hash"])
+            index["artifacts"][name] = entry
+        self._schedule_eviction()
+        return self._resolved(entry)
+
+    def _resolved(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of an index entry whose `path` points at the file rather than being relative to the root"""
+        return {**entry, "path": os.path.join(self.root, entry["path"])}
+
+    def _release(self, digest: str):
+        """Drop one reference to an object, deleting its file with the last one. Caller holds the lock."""
+        obj = self._index["objects"].get(digest)
+        if obj is None:
+            return
+        obj["refs"] -= 1
+        if obj["refs"] <= 0:
+            del self._index["objects"][digest]
+            try:
+                os.remove(os.path.join(self.root, obj["path"]))
+            except FileNotFoundError:
+                pass
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Contents of a stored report, decompressed"""
+        with self._lock:
+            entry = self._load()["artifacts"].get(name)
+            obj = self._index["objects"].get(entry["hash"]) if entry else None
+        if obj is None:
+            return None
+        with open(os.path.join(self.root, obj["path"]), "rb") as f:
+            data = f.read()
+        return gzip.decompress(data) if obj.get("compressed") else data
+
+    def find(self, symbol: Optional[str] = None, date: Optional[str] = None,
+             kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Index entries (with file paths) matching a symbol, a YYYY-MM-DD date and/or a kind, newest first"""
+        with self._lock:
+            entries = list(self._load()["artifacts"].values())
+        matches = [
+            e for e in entries
+            if (symbol is None or symbol in e["symbols"]) and (date is None or e["date"] == date)
+            and (kind is None or e["kind"] == kind)
+        ]
+        return [self._resolved(e) for e in sorted(matches, key=lambda e: e["created_at"], reverse=True)]
+
+    def enforce_retention(self) -> int:
+        """Evict reports older than `max_age_days`, then the oldest until under `max_bytes`. Returns evictions."""
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            index = self._load()
+            oldest = min((e["created_at"] for e in index["artifacts"].values()), default=cutoff)
+            if oldest >= cutoff and sum(obj["size"] for obj in index["objects"].values()) <= self.max_bytes:
+                return 0
+        evicted = 0
+        with self._update() as index:
+            by_age = sorted(index["artifacts"].values(), key=lambda e: e["created_at"])
+            total = sum(obj["size"] for obj in index["objects"].values())
+            for entry in by_age:
+                if entry["created_at"] >= cutoff and total <= self.max_bytes:
+                    break
+                del index["artifacts"][entry["name"]]
+                obj = index["objects"].get(entry["hash"])
+                if obj and obj["refs"] == 1:
+                    total -= obj["size"]
+                self._release(entry["hash"])
+                evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} reports from {self.root}")
+        return evicted
+
+    def _schedule_eviction(self):
+        with self._lock:
+            if self._evictor is not None:
+                return
+            self._evictor = threading.Thread(target=self._evict_in_background, name="report-eviction", daemon=True)
+            self._evictor.start()
+
+    def _evict_in_background(self):
+        try:
+            self.enforce_retention()
+        except Exception as e:
+            logger.error(f"Error enforcing report retention in {self.root}: {e}")
+        finally:
+            with self._lock:
+                self._evictor = None
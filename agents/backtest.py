@@ -0,0 +1,284 @@
+"""
+Vectorised backtest of the AnalyticsAgent recommendation rules.
+
+Replays the technical, fundamental and overall-score rules over stored daily
+history for every ticker x date at once, then measures forward returns, hit
+rates and turnover for each `overall_action`.
+
+Usage (from the repository root, over the PriceStore history):
+    python -m agents.backtest --horizons 1 5 21
+    python -m agents.backtest --sweep momentum_threshold=0.5,1,2 buy_score=3.25,3.5
+"""
+import argparse
+import itertools
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from agents.indicators import sma, _previous_valid
+from agents.rules import RULE_PARAMS, OVERALL_ACTIONS, ACTION_DIRECTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZONS = (1, 5, 21)
+# Recent bars averaged for the volume ratio, as in _analyze_technical_indicators
+VOLUME_LOOKBACK = 5
+TRADING_DAYS = 252
+
+# Action codes index into OVERALL_ACTIONS; -1 marks bars without a signal
+NO_SIGNAL = -1
+
+
+def _broadcast(values: Optional[np.ndarray], shape) -> Optional[np.ndarray]:
+    """Per-ticker (N,) or per-bar (N, T) fundamentals as an (N, T) matrix"""
+    if values is None:
+        return None
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    return np.broadcast_to(values, shape)
+
+
+def rule_scores(prices: Dict[str, np.ndarray], params: Optional[Dict[str, float]] = None,
+                fundamentals: Optional[Dict[str, np.ndarray]] = None,
+                sentiment: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Component scores and overall score for every ticker x bar.
+
+    `fundamentals` may hold "pe_ratio" and "market_cap" as (N,) or (N, T)
+    arrays and `sentiment` an (N, T) matrix of confidence-weighted model scores
+    in [-1, 1]. Missing inputs score a neutral 3, since point-in-time history
+    of fundamentals and news is usually not stored.
+    """
+    params = {**RULE_PARAMS, **(params or {})}
+    close, open_, volume = prices["Close"], prices["Open"], prices["Volume"]
+    shape = close.shape
+    fundamentals = fundamentals or {}
+
+    # Technical: open vs previous close, today's volume vs the recent average
+    previous_close = _previous_valid(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change_percent = (open_ - previous_close) / previous_close * 100
+        volume_ratio = volume / sma(volume, VOLUME_LOOKBACK)
+    bullish = change_percent > params["momentum_threshold"]
+    bearish = change_percent < -params["momentum_threshold"]
+    strong_volume = volume_ratio > params["volume_above_average"]
+    technical = np.where(bullish & strong_volume, 4.0, np.where(bearish, 2.0, 3.0))
+
+    pe = _broadcast(fundamentals.get("pe_ratio"), shape)
+    if pe is None:
+        valuation = np.full(shape, 3.0)
+    else:
+        valuation = np.select(
+            [pe > params["pe_expensive"], pe > params["pe_fair"], pe > params["pe_attractive"]],
+            [2.0, 3.0, 4.0], default=5.0)
+        valuation = np.where(np.isnan(pe), 3.0, valuation)
+
+    market_cap = _broadcast(fundamentals.get("market_cap"), shape)
+    if market_cap is None:
+        stability = np.full(shape, 3.0)
+    else:
+        stability = np.select([market_cap > params["mega_cap"], market_cap > params["large_cap"]], [5.0, 4.0], default=3.0)
+
+    if sentiment is None:
+        news = np.full(shape, 3.0)
+    else:
+        news = np.where(np.isnan(sentiment), 3.0, 3.0 + 2.0 * np.clip(sentiment, -1.0, 1.0))
+
+    overall = (technical + valuation + news + stability) / 4
+    # No signal without both an open and a previous close
+    overall[np.isnan(change_percent)] = np.nan
+    return {"technical": technical, "fundamental": valuation, "news": news, "stability": stability, "overall": overall}
+
+
+def classify(overall: np.ndarray, params: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Overall score -> index into OVERALL_ACTIONS (NO_SIGNAL where the score is NaN)"""
+    params = {**RULE_PARAMS, **(params or {})}
+    codes = np.select(
+        [overall >= params["strong_buy_score"], overall >= params["buy_score"], overall >= params["hold_score"]],
+        [0, 1, 2], default=3)
+    codes[np.isnan(overall)] = NO_SIGNAL
+    return codes
+
+
+def forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """Close-to-close return from each bar to `horizon` bars later (NaN past the end)"""
+    out = np.full(close.shape, np.nan)
+    if horizon < close.shape[1]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1.0
+    return out
+
+
+def _turnover(codes: np.ndarray) -> Dict[str, Any]:
+    """Action changes between consecutive signalled bars of the same ticker"""
+    previous = codes[:, :-1]
+    current = codes[:, 1:]
+    both = (previous != NO_SIGNAL) & (current != NO_SIGNAL)
+    changed = both & (previous != current)
+    transitions = int(both.sum())
+    daily = changed.sum() / transitions if transitions else 0.0
+
+    per_action = {}
+    for code, action in enumerate(OVERALL_ACTIONS):
+        in_action = both & (previous == code)
+        exits = int((in_action & changed).sum())
+        per_action[action] = round(float(in_action.sum()) / exits, 2) if exits else None
+    return {
+        "daily_change_rate": round(float(daily), 4),
+        "annual_changes_per_ticker": round(float(daily) * TRADING_DAYS, 2),
+        "avg_holding_days": per_action,
+    }
+
+
+def evaluate(codes: np.ndarray, close: np.ndarray, horizons: Sequence[int] = DEFAULT_HORIZONS) -> Dict[str, Any]:
+    """Forward return, excess return and hit-rate statistics per overall action and horizon"""
+    stats: Dict[str, Any] = {action: {"signals": int((codes == code).sum())} for code, action in enumerate(OVERALL_ACTIONS)}
+
+    for horizon in horizons:
+        returns = forward_returns(close, horizon)
+        # Excess over the equal-weighted universe on the same date
+        present = ~np.isnan(returns)
+        universe = np.nansum(returns, axis=0) / np.maximum(present.sum(axis=0), 1)
+        excess = returns - universe
+
+        valid = present & (codes != NO_SIGNAL)
+        flat_codes = codes[valid]
+        flat_returns = returns[valid]
+        flat_excess = excess[valid]
+        counts = np.bincount(flat_codes, minlength=len(OVERALL_ACTIONS))
+        sums = np.bincount(flat_codes, weights=flat_returns, minlength=len(OVERALL_ACTIONS))
+        excess_sums = np.bincount(flat_codes, weights=flat_excess, minlength=len(OVERALL_ACTIONS))
+        positive = np.bincount(flat_codes, weights=flat_returns > 0, minlength=len(OVERALL_ACTIONS))
+        negative = np.bincount(flat_codes, weights=flat_returns < 0, minlength=len(OVERALL_ACTIONS))
+
+        for code, action in enumerate(OVERALL_ACTIONS):
+            n = counts[code]
+            if not n:
+                stats[action][f"{horizon}d"] = None
+                continue
+            direction = ACTION_DIRECTION[action]
+            # Buys are right when the price rises, sells when it falls; HOLD reports the share of rises
+            hits = negative[code] if direction < 0 else positive[code]
+            stats[action][f"{horizon}d"] = {
+                "observations": int(n),
+                "mean_return": round(float(sums[code] / n), 6),
+                "median_return": round(float(np.median(flat_returns[flat_codes == code])), 6),
+                "mean_excess_return": round(float(excess_sums[code] / n), 6),
+                "hit_rate": round(float(hits / n), 4),
+            }
+    return stats
+
+
+def run_backtest(prices: Dict[str, np.ndarray], params: Optional[Dict[str, float]] = None,
+                 fundamentals: Optional[Dict[str, np.ndarray]] = None, sentiment: Optional[np.ndarray] = None,
+                 horizons: Sequence[int] = DEFAULT_HORIZONS) -> Dict[str, Any]:
+    """Replay the rule set over (N, T) price matrices and summarise every overall action"""
+    scores = rule_scores(prices, params, fundamentals, sentiment)
+    codes = classify(scores["overall"], params)
+    return {
+        "params": {**RULE_PARAMS, **(params or {})},
+        "tickers": int(codes.shape[0]),
+        "bars": int(codes.shape[1]),
+        "actions": evaluate(codes, prices["Close"], horizons),
+        "turnover": _turnover(codes),
+    }
+
+
+def _spread(result: Dict[str, Any], horizon: int) -> Optional[float]:
+    """
+    Mean excess return of the buy actions minus that of the sell action.
+    Excess returns average zero across the universe, so a side without signals counts as 0.
+    """
+    def _mean(actions):
+        rows = [result["actions"][a].get(f"{horizon}d") for a in actions]
+        rows = [r for r in rows if r]
+        total = sum(r["observations"] for r in rows)
+        return sum(r["mean_excess_return"] * r["observations"] for r in rows) / total if total else None
+
+    buys = _mean([a for a in OVERALL_ACTIONS if ACTION_DIRECTION[a] > 0])
+    sells = _mean([a for a in OVERALL_ACTIONS if ACTION_DIRECTION[a] < 0])
+    if buys is None and sells is None:
+        return None
+    return round((buys or 0.0) - (sells or 0.0), 6)
+
+
+# Sweep workers receive the price matrices once, through the pool initializer
+_sweep_inputs: Dict[str, Any] = {}
+
+
+def _init_sweep_worker(prices, fundamentals, sentiment, horizons):
+    _sweep_inputs.update(prices=prices, fundamentals=fundamentals, sentiment=sentiment, horizons=horizons)
+
+
+def _run_sweep_point(params: Dict[str, float]) -> Dict[str, Any]:
+    return run_backtest(_sweep_inputs["prices"], params, _sweep_inputs["fundamentals"],
+                        _sweep_inputs["sentiment"], _sweep_inputs["horizons"])
+
+
+def sweep(prices: Dict[str, np.ndarray], grid: Dict[str, Sequence[float]],
+          fundamentals: Optional[Dict[str, np.ndarray]] = None, sentiment: Optional[np.ndarray] = None,
+          horizons: Sequence[int] = DEFAULT_HORIZONS, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Backtest every combination of the threshold values in `grid` across a
+    process pool, best buy-minus-sell spread at the longest horizon first.
+    """
+    unknown = set(grid) - set(RULE_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown rule parameters: {sorted(unknown)}")
+
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                             initargs=(prices, fundamentals, sentiment, tuple(horizons))) as pool:
+        results = list(pool.map(_run_sweep_point, points))
+
+    horizon = max(horizons)
+    summary = []
+    for point, result in zip(points, results):
+        summary.append({
+            "params": point,
+            "spread": _spread(result, horizon),
+            "annual_changes_per_ticker": result["turnover"]["annual_changes_per_ticker"],
+            "result": result,
+        })
+    summary.sort(key=lambda row: -np.inf if row["spread"] is None else row["spread"], reverse=True)
+    return summary
+
+
+def _parse_grid(items: List[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        grid[name] = [float(v) for v in values.split(",") if v]
+    return grid
+
+
+def main():
+    from agents.price_store import PriceStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="*", help="defaults to every stored symbol")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--horizons", nargs="+", type=int, default=list(DEFAULT_HORIZONS))
+    parser.add_argument("--sweep", nargs="*", default=[], metavar="PARAM=V1,V2")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    symbols, dates, prices = PriceStore().load_matrix(args.symbols, args.start, args.end)
+    if not symbols:
+        parser.error("no stored price history; run the market data agent first")
+
+    if args.sweep:
+        rows = sweep(prices, _parse_grid(args.sweep), horizons=args.horizons, max_workers=args.workers)
+        print(json.dumps([{k: v for k, v in row.items() if k != "result"} for row in rows], indent=2))
+    else:
+        print(json.dumps(run_backtest(prices, horizons=args.horizons), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_DIR = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "blobs")
+DEFAULT_CACHE_BYTES = int(float(os.getenv("BLOB_CACHE_MB", "64")) * 1024 * 1024)
+# Session-state values that serialise larger than this are moved into the blob store
+OFFLOAD_THRESHOLD = int(os.getenv("BLOB_OFFLOAD_BYTES", "16384"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("BLOB_MAX_MB", "1024")) * 1024 * 1024)
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("BLOB_MAX_AGE_DAYS", "7"))
+# Minimum seconds between background garbage collections
+GC_INTERVAL = 600
+BLOB_REF_KEY = "$blob"
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+
+class BlobStore:
+    """
+    Content-addressed blobs on local disk (sha256 of the encoded bytes), with
+    an in-memory LRU of recently used blobs in front.
+
+    Values are stored once however many sessions reference them; session state
+    keeps a small JSON reference `{"$blob": digest, "kind": ..., "size": ...}`.
+
+    A file's mtime is its last use. Blobs unused for `max_age_days` are
+    deleted, then the least recently used until the store fits `max_bytes`;
+    a session that outlives its blobs reads None for those values.
+    """
+
+    def __init__(self, root: Optional[str] = None, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.root = root or DEFAULT_BLOB_DIR
+        self.cache_bytes = cache_bytes
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._last_collection = 0.0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def _remember(self, digest: str, data: bytes):
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return
+            if len(data) > self.cache_bytes:
+                return
+            self._cache[digest] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    def put(self, value: Any) -> Dict[str, Any]:
+        """Store a str, bytes or JSON-serialisable value and return its reference"""
+        if isinstance(value, bytes):
+            kind, data = "bytes", value
+        elif isinstance(value, str):
+            kind, data = "text", value.encode("utf-8")
+        else:
+            kind, data = "json", json.dumps(value, default=str).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        path = self._path(digest)
+        # Same content, same address: an existing blob is never rewritten, only marked as used
+        if not self._touch(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._remember(digest, data)
+        self._schedule_collection()
+        return {BLOB_REF_KEY: digest, "kind": kind, "size": len(data)}
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, ref: Dict[str, Any]) -> Any:
+        """Load the value behind a reference; a fresh copy on every call"""
+        digest = ref[BLOB_REF_KEY]
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+        if data is None:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+            self._remember(digest, data)
+            self._touch(self._path(digest))
+
+        kind = ref.get("kind", "json")
+        if kind == "bytes":
+            return data
+        if kind == "text":
+            return data.decode("utf-8")
+        return json.loads(data)
+
+    def offload(self, value: Any, threshold: int = OFFLOAD_THRESHOLD) -> Any:
+        """A reference when the value is larger than `threshold` bytes, otherwise the value itself"""
+        if value is None or is_blob_ref(value):
+            return value
+        try:
+            if isinstance(value, bytes):
+                size = len(value)
+            elif isinstance(value, str):
+                size = len(value.encode("utf-8"))
+            else:
+                size = len(json.dumps(value, default=str))
+            return self.put(value) if size > threshold else value
+        except Exception as e:
+            logger.error(f"Error offloading value to blob store {self.root}: {e}")
+            return value
+
+    def resolve(self, value: Any) -> Any:
+        """The stored value when given a reference, anything else unchanged"""
+        if not is_blob_ref(value):
+            return value
+        try:
+            return self.get(value)
+        except Exception as e:
+            logger.error(f"Error loading blob {value.get(BLOB_REF_KEY)} from {self.root}: {e}")
+            return None
+
+
+    def collect_garbage(self) -> int:
+        """Delete blobs unused for `max_age_days`, then the least recently used beyond `max_bytes`. Returns deletions."""
+        blobs = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                # Temp files belong to writes in progress
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+        blobs.sort()
+
+        cutoff = time.time() - self.max_age_days * 86400
+        total = sum(size for _, size, _ in blobs)
+        deleted = 0
+        for used, size, path in blobs:
+            if used >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        if deleted:
+            logger.info(f"Deleted {deleted} blobs from {self.root}")
+        return deleted
+
+    def _schedule_collection(self):
+        with self._lock:
+            if self._collector is not None or time.time() - self._last_collection < GC_INTERVAL:
+                return
+            self._last_collection = time.time()
+            self._collector = threading.Thread(target=self._collect_in_background, name="blob-gc", daemon=True)
+            self._collector.start()
+
+    def _collect_in_background(self):
+        try:
+            self.collect_garbage()
+        except Exception as e:
+            logger.error(f"Error collecting blobs in {self.root}: {e}")
+        finally:
+            with self._lock:
+                self._collector = None
+
+
+_default_store: Optional[BlobStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_store() -> BlobStore:
+    """Process-wide blob store shared by the agents"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = BlobStore()
+        return _default_store
+
+
+def offload(value: Any, threshold: int = OFFLOAD_THRESHOLD) -> Any:
+    return get_default_store().offload(value, threshold)
+
+
+def load_state(state: Any, key: str, default: Any = None) -> Any:
+    """Read a session-state value, loading it from the blob store when it was offloaded"""
+    value = get_default_store().resolve(state.get(key, default))
+    return default if value is None else value
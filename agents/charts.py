@@ -0,0 +1,181 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from agents.indicators import sma, rsi, rolling_std, RSI_PERIOD, BOLLINGER_PERIOD, BOLLINGER_WIDTH
+from agents.prompt_builder import iter_market
+from agents.process_pool import worker_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHART_DIR = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "charts")
+DEFAULT_CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+# MarketDataAgent histories are daily bars
+INTERVAL = "1d"
+
+# Part of the cache key: changing the layout invalidates every cached image
+CHART_SPEC = {
+    "version": 1,
+    "bars": 180,
+    "sma": [20, 50],
+    "bollinger": True,
+    "rsi": True,
+    "size": [7.0, 5.0],
+    "dpi": 110,
+}
+
+
+def chart_key(symbol: str, interval: str, last_bar: str, spec: Dict[str, Any], fields: Dict[str, np.ndarray]) -> str:
+    """
+    Cache key of a chart. The bar values are hashed as well as the last date,
+    so an intraday last bar that has since moved, or a revised older bar,
+    renders a new image.
+    """
+    values = hashlib.sha256()
+    for field in sorted(fields):
+        values.update(field.encode("utf-8"))
+        values.update(np.ascontiguousarray(fields[field], dtype=float).tobytes())
+    payload = json.dumps({"symbol": symbol, "interval": interval, "last_bar": last_bar, "spec": spec,
+                          "values": values.hexdigest()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _series(symbol: str, records: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """Dates and Close/High/Low/Volume arrays of one symbol's `price_data` records"""
+    records = sorted(records, key=lambda r: str(r.get("Date")))
+    dates = [str(r.get("Date"))[:10] for r in records]
+    fields = {}
+    for field in ("Close", "High", "Low", "Volume"):
+        values = [r.get(f"{field}_{symbol}") for r in records]
+        fields[field] = np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=float)
+    return dates, fields
+
+
+def render_chart(symbol: str, dates: List[str], fields: Dict[str, np.ndarray], spec: Dict[str, Any],
+                 path: str) -> str:
+    """
+    Price (with moving averages and Bollinger bands), volume and RSI panels as
+    a PNG at `path`. Indicators use the whole history; only the last
+    `spec["bars"]` bars are drawn. Runs in a pool worker with the Agg backend.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    close = fields["Close"][None, :]
+    window = slice(-spec["bars"], None)
+    x = np.arange(len(dates))[window]
+    shown_dates = dates[window]
+
+    panels = 3 if spec.get("rsi") else 2
+    fig, axes = plt.subplots(panels, 1, sharex=True, figsize=spec["size"], dpi=spec["dpi"],
+                             gridspec_kw={"height_ratios": [3, 1, 1][:panels]})
+    try:
+        price_ax, volume_ax = axes[0], axes[1]
+        price_ax.plot(x, fields["Close"][window], color="#1f4e79", linewidth=1.2, label="Close")
+        for period in spec.get("sma", []):
+            price_ax.plot(x, sma(close, period)[0][window], linewidth=0.9, label=f"SMA {period}")
+        if spec.get("bollinger"):
+            middle = sma(close, BOLLINGER_PERIOD)[0][window]
+            width = BOLLINGER_WIDTH * rolling_std(close, BOLLINGER_PERIOD)[0][window]
+            price_ax.fill_between(x, middle - width, middle + width, color="#9dc3e6", alpha=0.25, label="Bollinger")
+        price_ax.set_title(f"{symbol} - last {len(x)} sessions to {shown_dates[-1] if shown_dates else '-'}", fontsize=10)
+        price_ax.legend(loc="upper left", fontsize=7, ncol=4, frameon=False)
+        price_ax.grid(alpha=0.3)
+
+        volume = fields["Volume"][window]
+        up = np.diff(fields["Close"], prepend=np.nan)[window] >= 0
+        volume_ax.bar(x, volume, color=np.where(up, "#70ad47", "#c00000"), width=0.8)
+        volume_ax.set_ylabel("Volume", fontsize=8)
+        volume_ax.grid(alpha=0.3)
+
+        if spec.get("rsi"):
+            rsi_ax = axes[2]
+            rsi_ax.plot(x, rsi(close, RSI_PERIOD)[0][window], color="#7030a0", linewidth=1.0)
+            rsi_ax.axhline(70, color="#c00000", linewidth=0.6, linestyle="--")
+            rsi_ax.axhline(30, color="#70ad47", linewidth=0.6, linestyle="--")
+            rsi_ax.set_ylim(0, 100)
+            rsi_ax.set_ylabel(f"RSI {RSI_PERIOD}", fontsize=8)
+            rsi_ax.grid(alpha=0.3)
+
+        ticks = np.linspace(0, len(x) - 1, num=min(6, len(x)), dtype=int) if len(x) else []
+        axes[-1].set_xticks([x[i] for i in ticks])
+        axes[-1].set_xticklabels([shown_dates[i] for i in ticks], fontsize=7)
+        for ax in axes:
+            ax.tick_params(labelsize=7)
+        fig.tight_layout()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fig.savefig(tmp_path, format="png")
+        os.replace(tmp_path, path)
+        return path
+    finally:
+        plt.close(fig)
+
+
+def _init_chart_worker():
+    # Pay the matplotlib import and backend set-up once per worker
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+
+class ChartRenderer:
+    """
+    Per-ticker price/volume/RSI charts for the PDF report, rendered in a warm
+    process pool. PNGs are cached on disk by (symbol, interval, last bar,
+    chart spec), so unchanged histories reuse the same image.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_workers: int = DEFAULT_CHART_WORKERS,
+                 spec: Optional[Dict[str, Any]] = None):
+        self.cache_dir = cache_dir or DEFAULT_CHART_DIR
+        self.max_workers = max_workers
+        self.spec = spec or CHART_SPEC
+        self.counters = {"hits": 0, "rendered": 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Not forked from this process, which runs store threads and holds locks and SQLite connections
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_chart_worker,
+                                             mp_context=worker_context())
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render_market_charts(self, market_data: Any) -> Dict[str, str]:
+        """{symbol: PNG path} for every symbol with price history in `market_data`"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool() if self.max_workers > 0 else None
+        charts, jobs = {}, {}
+        for symbol, data in iter_market(market_data):
+            records = data.get("price_data") or []
+            if len(records) < 2:
+                continue
+            dates, fields = _series(symbol, records)
+            path = os.path.join(self.cache_dir, f"{chart_key(symbol, INTERVAL, dates[-1], self.spec, fields)}.png")
+            if os.path.exists(path):
+                self.counters["hits"] += 1
+                charts[symbol] = path
+                continue
+            jobs[symbol] = loop.run_in_executor(pool, render_chart, symbol, dates, fields, self.spec, path)
+
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for symbol, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error rendering chart for {symbol}: {result}")
+                continue
+            self.counters["rendered"] += 1
+            charts[symbol] = result
+        return charts
@@ -0,0 +1,171 @@
+import logging
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Feature name -> direction (+1 when higher is better, -1 when lower is better)
+FEATURES: Dict[str, int] = {
+    "earnings_yield": 1,   # valuation: EPS / price, so cheap stocks score high
+    "momentum": 1,         # daily price change %
+    "volume_ratio": 1,     # volume vs recent average
+    "sentiment": 1,        # model news sentiment in [-1, 1]
+    "beta": -1,            # market risk
+}
+
+# Sectors with fewer valid members than this are scored against the whole universe
+MIN_SECTOR_SIZE = 3
+
+
+def _feature_row(insight: Dict[str, Any]) -> Tuple[str, List[float]]:
+    fundamental = insight.get("fundamental_analysis", {})
+    technical = insight.get("technical_analysis", {})
+    news = insight.get("news_analysis", {})
+
+    pe = fundamental.get("pe_ratio")
+    earnings_yield = 1.0 / pe if isinstance(pe, (int, float)) and pe > 0 else np.nan
+
+    def _num(value):
+        return float(value) if isinstance(value, (int, float)) else np.nan
+
+    row = [
+        earnings_yield,
+        _num(technical.get("price_change_percent")),
+        _num(technical.get("volume_ratio")),
+        _num(news.get("model_score")),
+        _num(fundamental.get("beta")),
+    ]
+    return fundamental.get("sector") or "Unknown", row
+
+
+def build_feature_matrix(insights: Dict[str, Dict[str, Any]]) -> Tuple[List[str], List[str], np.ndarray]:
+    """(symbols, sectors, N x F feature matrix) from per-symbol AnalyticsAgent insights"""
+    symbols, sectors, rows = [], [], []
+    for symbol, insight in insights.items():
+        sector, row = _feature_row(insight)
+        symbols.append(symbol)
+        sectors.append(sector)
+        rows.append(row)
+    matrix = np.array(rows, dtype=float).reshape(len(rows), len(FEATURES))
+    return symbols, sectors, matrix
+
+
+def _group_stats(x: np.ndarray, groups: np.ndarray, n_groups: int):
+    """Per-group count, mean and population std of every column, ignoring NaN"""
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    count = np.zeros((n_groups, x.shape[1]))
+    total = np.zeros((n_groups, x.shape[1]))
+    squares = np.zeros((n_groups, x.shape[1]))
+    np.add.at(count, groups, valid)
+    np.add.at(total, groups, filled)
+    np.add.at(squares, groups, filled * filled)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+    return count, mean, std
+
+
+def _percentile_ranks(x: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Percentile rank in [0, 1] of each value within its group; NaN stays NaN, ties share the mean rank"""
+    n, f = x.shape
+    out = np.full((n, f), np.nan)
+    for j in range(f):
+        column = x[:, j]
+        valid = ~np.isnan(column)
+        # Sort by group then value; NaNs sort last within each group
+        order = np.lexsort((np.where(valid, column, np.inf), groups))
+        sorted_groups = groups[order]
+        sorted_values = column[order]
+        group_start = np.searchsorted(sorted_groups, np.arange(n_groups))
+        position = np.arange(n) - group_start[sorted_groups]
+
+        # Average positions over runs of equal values within a group
+        new_run = np.ones(n, dtype=bool)
+        new_run[1:] = (sorted_groups[1:] != sorted_groups[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+        run_id = np.cumsum(new_run) - 1
+        run_mean = np.bincount(run_id, weights=position) / np.bincount(run_id)
+
+        group_valid = np.bincount(groups[valid], minlength=n_groups)
+        denominator = np.maximum(group_valid[sorted_groups] - 1, 1)
+        ranks = run_mean[run_id] / denominator
+        ranks[group_valid[sorted_groups] == 1] = 0.5
+        ranks[~valid[order]] = np.nan
+        out[order, j] = ranks
+    return out
+
+
+def rank_cross_section(symbols: List[str], sectors: List[str], features: np.ndarray,
+                       min_sector_size: int = MIN_SECTOR_SIZE) -> Dict[str, Any]:
+    """
+    Sector-relative z-scores and percentile ranks for an N x F feature matrix.
+
+    Every feature is standardised within the stock's sector when the sector has
+    at least `min_sector_size` valid members, otherwise against the whole
+    universe. The composite score is the mean of direction-adjusted z-scores.
+    """
+    n = len(symbols)
+    if n == 0:
+        return {"features": list(FEATURES), "table": []}
+
+    sector_names, sector_ids = np.unique(np.array(sectors, dtype=object).astype(str), return_inverse=True)
+    universe_ids = np.zeros(n, dtype=int)
+
+    sector_count, sector_mean, sector_std = _group_stats(features, sector_ids, len(sector_names))
+    universe_count, universe_mean, universe_std = _group_stats(features, universe_ids, 1)
+
+    use_sector = sector_count[sector_ids] >= min_sector_size
+    mean = np.where(use_sector, sector_mean[sector_ids], universe_mean[universe_ids])
+    std = np.where(use_sector, sector_std[sector_ids], universe_std[universe_ids])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(std > 0, (features - mean) / std, 0.0)
+    z[np.isnan(features)] = np.nan
+
+    percentiles = np.where(
+        use_sector,
+        _percentile_ranks(features, sector_ids, len(sector_names)),
+        _percentile_ranks(features, universe_ids, 1),
+    )
+
+    direction = np.array(list(FEATURES.values()), dtype=float)
+    signed = z * direction
+    available = (~np.isnan(signed)).sum(axis=1)
+    composite = np.where(available > 0, np.nansum(signed, axis=1) / np.maximum(available, 1), np.nan)
+
+    order = np.argsort(np.where(np.isnan(composite), -np.inf, -composite), kind="stable")
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(1, n + 1)
+
+    # Rank within sector by composite score
+    sector_order = np.lexsort((np.where(np.isnan(composite), np.inf, -composite), sector_ids))
+    sector_start = np.searchsorted(sector_ids[sector_order], np.arange(len(sector_names)))
+    sector_rank = np.empty(n, dtype=int)
+    sector_rank[sector_order] = np.arange(n) - sector_start[sector_ids[sector_order]] + 1
+
+    sector_sizes = np.bincount(sector_ids, minlength=len(sector_names))
+
+    def _clean(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    names = list(FEATURES)
+    table = []
+    for i in order:
+        table.append({
+            "symbol": symbols[i],
+            "sector": str(sectors[i]),
+            "rank": int(rank[i]),
+            "sector_rank": int(sector_rank[i]),
+            "sector_size": int(sector_sizes[sector_ids[i]]),
+            "composite_score": _clean(composite[i]),
+            "relative_to": "sector" if use_sector[i].all() else "universe" if not use_sector[i].any() else "mixed",
+            "z_scores": {name: _clean(z[i, j]) for j, name in enumerate(names)},
+            "percentiles": {name: _clean(percentiles[i, j]) for j, name in enumerate(names)},
+        })
+    return {"features": names, "table": table}
+
+
+def rank_insights(insights: Dict[str, Dict[str, Any]], min_sector_size: int = MIN_SECTOR_SIZE) -> Dict[str, Any]:
+    """Cross-sectional ranking straight from AnalyticsAgent's per-symbol insights"""
+    symbols, sectors, features = build_feature_matrix(insights)
+    return rank_cross_section(symbols, sectors, features, min_sector_size)
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "fundamentals.json")
+DEFAULT_TTL_SECONDS = float(os.getenv("FUNDAMENTALS_TTL_HOURS", "24")) * 3600
+
+# `ticker.info` keys worth keeping: true fundamentals that do not follow from OHLCV
+INFO_FIELDS = (
+    "bookValue", "dividendRate", "dividendYield", "beta", "trailingPE", "forwardPE",
+    "trailingEps", "forwardEps", "priceToBook", "sector", "industry", "marketCap",
+    "enterpriseValue", "sharesOutstanding", "currentPrice", "regularMarketPrice",
+)
+
+
+class FundamentalsCache:
+    """
+    Per-symbol `ticker.info` fundamentals with a time-to-live, persisted as JSON
+    so the slow Yahoo endpoint is only hit once per symbol per TTL window.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        # Serialises file writes so an older snapshot never replaces a newer one
+        self._persist_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logger.error(f"Error loading fundamentals cache from {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Cached fundamentals, or None when missing or older than the TTL"""
+        with self._lock:
+            entry = self._load().get(symbol)
+        if entry is None or time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return entry["values"]
+
+    def put(self, symbol: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the fundamental fields of a `ticker.info` payload and persist the cache"""
+        values = {key: info.get(key) for key in INFO_FIELDS}
+        with self._lock:
+            self._load()[symbol] = {"fetched_at": time.time(), "values": values}
+        self._persist()
+        return values
+
+    def _persist(self):
+        with self._persist_lock:
+            with self._lock:
+                payload = json.dumps(self._load())
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # Per-writer temp file: fetch_all stores from several threads at once
+                tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Error persisting fundamentals cache to {self.path}: {e}")
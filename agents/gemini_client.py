@@ -0,0 +1,330 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from functools import cached_property
+from typing import Dict, Any, AsyncGenerator, Optional, Tuple
+
+import google.generativeai as genai
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+
+from agents.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Request priorities; lower is served first
+INTERACTIVE, BATCH = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Free-tier defaults; per-model overrides as "model=rpm:tpm,..." in GEMINI_RATE_LIMITS
+DEFAULT_RPM = int(os.getenv("GEMINI_RPM", "10"))
+DEFAULT_TPM = int(os.getenv("GEMINI_TPM", "250000"))
+RATE_LIMITS_SPEC = os.getenv("GEMINI_RATE_LIMITS", "")
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+BACKOFF_BASE, BACKOFF_CAP = 1.0, 30.0
+# Tokens reserved for the response until the real usage is known
+DEFAULT_OUTPUT_TOKENS = 2048
+# Longest a queued request sleeps before re-checking its place in the queue
+MAX_POLL_SECONDS = 0.25
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """`"gemini-2.5-flash=10:250000,..."` -> {model: (requests/min, tokens/min)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            model, rates = item.split("=", 1)
+            rpm, tpm = rates.split(":", 1)
+            limits[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate limit '{item}'")
+    return limits
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED from either Gemini SDK"""
+    code = getattr(error, "code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(error) or str(error).startswith("429")
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to one minute's worth"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available; requests above capacity wait for a full bucket"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float):
+        # May go negative: an oversized request is paid back before the next one
+        self.level -= amount
+
+
+class ModelQuota:
+    """Request and token buckets of one model and the priority queue waiting on them"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.waiting: Dict[int, int] = {}
+        self.counters = {"granted": 0, "in_flight": 0, "rate_limited": 0, "wait_ms": 0.0,
+                         "max_queue_depth": 0, "tokens_estimated": 0, "tokens_used": 0}
+
+    def head(self) -> Optional[int]:
+        return min(self.waiting, key=lambda ticket: (self.waiting[ticket], ticket)) if self.waiting else None
+
+
+class QuotaScheduler:
+    """
+    Admits Gemini calls against per-model requests/min and tokens/min buckets.
+    Waiting calls are served in priority order (interactive before batch), FIFO
+    within a priority. A 429 pauses the whole model for a jittered backoff so
+    queued calls do not pile onto the same limit. State is guarded by a thread
+    lock, so one scheduler can serve several event loops.
+    """
+
+    def __init__(self, default_rpm: int = DEFAULT_RPM, default_tpm: int = DEFAULT_TPM,
+                 limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.limits = parse_rate_limits(RATE_LIMITS_SPEC) if limits is None else limits
+        self._quotas: Dict[str, ModelQuota] = {}
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+
+    def _quota(self, model: str) -> ModelQuota:
+        quota = self._quotas.get(model)
+        if quota is None:
+            rpm, tpm = self.limits.get(model, (self.default_rpm, self.default_tpm))
+            quota = self._quotas[model] = ModelQuota(rpm, tpm)
+        return quota
+
+    async def acquire(self, model: str, tokens: int, priority: int = BATCH) -> float:
+        """Wait for a slot for a call of about `tokens` tokens; returns the seconds waited"""
+        started = time.monotonic()
+        with self._lock:
+            quota = self._quota(model)
+            ticket = next(self._tickets)
+            quota.waiting[ticket] = priority
+            quota.counters["max_queue_depth"] = max(quota.counters["max_queue_depth"], len(quota.waiting))
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    if quota.head() != ticket:
+                        wait = MAX_POLL_SECONDS
+                    else:
+                        wait = max(quota.blocked_until - now, quota.requests.wait_time(1, now),
+                                   quota.tokens.wait_time(tokens, now))
+                    if wait <= 0:
+                        del quota.waiting[ticket]
+                        quota.requests.consume(1)
+                        quota.tokens.consume(tokens)
+                        waited = now - started
+                        quota.counters["granted"] += 1
+                        quota.counters["in_flight"] += 1
+                        quota.counters["wait_ms"] += waited * 1000
+                        quota.counters["tokens_estimated"] += tokens
+                        return waited
+                await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+        finally:
+            with self._lock:
+                quota.waiting.pop(ticket, None)
+
+    def release(self, model: str, estimated: int, used: Optional[int] = None):
+        """End a granted call; `used` tokens, when reported, correct the estimate taken from the bucket"""
+        with self._lock:
+            quota = self._quota(model)
+            quota.counters["in_flight"] -= 1
+            if used is not None:
+                quota.tokens.level = min(quota.tokens.capacity, quota.tokens.level + estimated - used)
+                quota.counters["tokens_used"] += used
+
+    async def backoff(self, model: str, attempt: int):
+        """Record a 429 and sleep a full-jitter exponential backoff, pausing the model meanwhile"""
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        with self._lock:
+            quota = self._quota(model)
+            quota.counters["rate_limited"] += 1
+            quota.blocked_until = max(quota.blocked_until, time.monotonic() + delay)
+        logger.warning(f"Gemini rate limit on {model}; retrying in {delay:.1f}s (attempt {attempt + 1})")
+        await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth by priority, in-flight calls, waits and bucket levels per model"""
+        with self._lock:
+            now = time.monotonic()
+            stats = {}
+            for model, quota in self._quotas.items():
+                quota.requests._refill(now)
+                quota.tokens._refill(now)
+                depth = {name: 0 for name in PRIORITY_NAMES.values()}
+                for priority in quota.waiting.values():
+                    name = PRIORITY_NAMES.get(priority, str(priority))
+                    depth[name] = depth.get(name, 0) + 1
+                counters = dict(quota.counters)
+                stats[model] = {
+                    **counters,
+                    "queue_depth": len(quota.waiting),
+                    "queue_by_priority": depth,
+                    "avg_wait_ms": round(counters["wait_ms"] / counters["granted"], 1) if counters["granted"] else 0.0,
+                    "wait_ms": round(counters["wait_ms"], 1),
+                    "requests_available": round(quota.requests.level, 2),
+                    "tokens_available": round(quota.tokens.level),
+                    "blocked_for_s": round(max(0.0, quota.blocked_until - now), 2),
+                }
+            return stats
+
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+class ScheduledModel:
+    """`GenerativeModel` stand-in whose calls go through the shared client and its scheduler"""
+
+    def __init__(self, client: "GeminiClient", model_name: str, priority: int = BATCH,
+                 output_tokens: int = DEFAULT_OUTPUT_TOKENS):
+        self.client = client
+        self.model_name = model_name
+        self.priority = priority
+        self.output_tokens = output_tokens
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        return await self.client.generate(self.model_name, prompt, stream=stream, priority=self.priority,
+                                          output_tokens=self.output_tokens)
+
+
+class GeminiClient:
+    """
+    Process-wide Gemini access. The SDKs are configured once, model handles
+    are reused across invocations, and every call is admitted by the shared
+    `QuotaScheduler` and retried on 429s.
+    """
+
+    def __init__(self, scheduler: Optional[QuotaScheduler] = None, max_retries: int = MAX_RETRIES):
+        self.scheduler = scheduler or QuotaScheduler()
+        self.max_retries = max_retries
+        self._api_key: Optional[str] = None
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._genai_client = None
+        self._lock = threading.Lock()
+
+    def _generative_model(self, model_name: str, api_key: Optional[str]) -> genai.GenerativeModel:
+        with self._lock:
+            if api_key and api_key != self._api_key:
+                genai.configure(api_key=api_key)
+                self._api_key = api_key
+                self._models.clear()
+            if model_name not in self._models:
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def model(self, model_name: str, api_key: Optional[str] = None, priority: int = BATCH,
+              output_tokens: int = DEFAULT_OUTPUT_TOKENS) -> ScheduledModel:
+        self._generative_model(model_name, api_key)
+        return ScheduledModel(self, model_name, priority, output_tokens)
+
+    def genai_client(self, headers: Optional[Dict[str, str]] = None):
+        """The `google.genai` client shared by ADK agents"""
+        from google.genai import Client, types
+
+        with self._lock:
+            if self._genai_client is None:
+                self._genai_client = Client(http_options=types.HttpOptions(headers=headers))
+            return self._genai_client
+
+    async def generate(self, model_name: str, prompt: str, stream: bool = False, priority: int = BATCH,
+                       output_tokens: int = DEFAULT_OUTPUT_TOKENS):
+        """
+        `generate_content_async` under the model's quota. Streaming calls hold
+        their slot until the first chunk arrives, which is where the SDK
+        raises a 429; their usage is not known up front and stays estimated.
+        """
+        estimated = estimate_tokens(prompt) + output_tokens
+        model = self._generative_model(model_name, None)
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(model_name, estimated, priority)
+            used = None
+            try:
+                response = await model.generate_content_async(prompt, stream=stream)
+                used = None if stream else _usage_tokens(response)
+                return response
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+            finally:
+                self.scheduler.release(model_name, estimated, used)
+            await self.scheduler.backoff(model_name, attempt)
+
+
+_default_client: Optional[GeminiClient] = None
+_default_lock = threading.Lock()
+
+
+def get_default_client() -> GeminiClient:
+    """Process-wide client shared by the agents"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = GeminiClient()
+        return _default_client
+
+
+class ScheduledGemini(Gemini):
+    """
+    ADK `Gemini` model for `LlmAgent`s: shares the process-wide `google.genai`
+    client and admits each request through the shared scheduler, at
+    interactive priority by default.
+    """
+
+    priority: int = INTERACTIVE
+
+    @cached_property
+    def api_client(self):
+        return get_default_client().genai_client(self._tracking_headers)
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        client = get_default_client()
+        model_name = llm_request.model or self.model
+        text = "".join(
+            part.text for content in llm_request.contents or [] for part in content.parts or [] if part.text
+        )
+        if llm_request.config and llm_request.config.system_instruction:
+            text += str(llm_request.config.system_instruction)
+        output_tokens = (llm_request.config.max_output_tokens if llm_request.config else None) or DEFAULT_OUTPUT_TOKENS
+        estimated = estimate_tokens(text) + output_tokens
+
+        for attempt in range(client.max_retries + 1):
+            await client.scheduler.acquire(model_name, estimated, self.priority)
+            used, started = None, False
+            try:
+                async for response in super().generate_content_async(llm_request, stream):
+                    started = True
+                    used = _usage_tokens(response) or used
+                    yield response
+                return
+            except Exception as e:
+                # Once output has been yielded the call cannot be replayed
+                if started or not is_rate_limited(e) or attempt == client.max_retries:
+                    raise
+            finally:
+                client.scheduler.release(model_name, estimated, used)
+            await client.scheduler.backoff(model_name, attempt)
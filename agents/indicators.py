@@ -0,0 +1,238 @@
+import logging
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Indicator set computed for every ticker
+SMA_PERIODS = (20, 50, 200)
+EMA_PERIODS = (20, 50, 200)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_PERIOD, BOLLINGER_WIDTH = 20, 2.0
+ATR_PERIOD = 14
+VOLUME_AVG_PERIOD = 20
+RANGE_PERIOD = 20
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+# Conventions shared with agents.streaming_indicators, which must reproduce these
+# results exactly:
+#  - inputs are (N tickers, T bars) float64 matrices with NaN for missing bars
+#  - recursive indicators (EMA, RSI, MACD, ATR, OBV) skip missing bars: state is
+#    carried and the previous output is repeated
+#  - windowed indicators (SMA, Bollinger, volume average) average the valid bars
+#    of the last `n` bars and need more than half of the window present
+#  - windowed sums are differences of sequential cumulative sums
+
+
+def min_window_count(n: int) -> int:
+    return n // 2 + 1
+
+
+def _window_diff(cumulative: np.ndarray, n: int) -> np.ndarray:
+    """cumulative[:, t] - cumulative[:, t - n] with zeros before the start"""
+    shifted = np.zeros_like(cumulative)
+    shifted[:, n:] = cumulative[:, :-n]
+    return cumulative - shifted
+
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    valid = ~np.isnan(x)
+    total = _window_diff(np.cumsum(np.where(valid, x, 0.0), axis=1), n)
+    count = _window_diff(np.cumsum(valid, axis=1, dtype=np.float64), n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total / count
+    out[count < min_window_count(n)] = np.nan
+    return out
+
+
+def rolling_std(x: np.ndarray, n: int) -> np.ndarray:
+    """Population standard deviation over the valid bars of each window"""
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    total = _window_diff(np.cumsum(filled, axis=1), n)
+    squares = _window_diff(np.cumsum(filled * filled, axis=1), n)
+    count = _window_diff(np.cumsum(valid, axis=1, dtype=np.float64), n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        var = np.maximum(squares / count - mean * mean, 0.0)
+    out = np.sqrt(var)
+    out[count < min_window_count(n)] = np.nan
+    return out
+
+
+def rolling_max(x: np.ndarray, n: int) -> np.ndarray:
+    padded = np.concatenate([np.full((x.shape[0], n - 1), np.nan), x], axis=1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, n, axis=1)
+    return np.fmax.reduce(windows, axis=2)
+
+
+def rolling_min(x: np.ndarray, n: int) -> np.ndarray:
+    padded = np.concatenate([np.full((x.shape[0], n - 1), np.nan), x], axis=1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, n, axis=1)
+    return np.fmin.reduce(windows, axis=2)
+
+
+def ema(x: np.ndarray, n: int) -> np.ndarray:
+    """EMA seeded with the first valid value; NaN until `n` valid bars are seen"""
+    alpha = 2.0 / (n + 1)
+    # Iterate over bars with tickers contiguous in memory
+    bars = np.ascontiguousarray(x.T)
+    out = np.empty_like(bars)
+    state = np.full(bars.shape[1], np.nan)
+    seen = np.zeros(bars.shape[1])
+    with np.errstate(invalid="ignore"):
+        for t in range(bars.shape[0]):
+            value = bars[t]
+            valid = ~np.isnan(value)
+            updated = np.where(np.isnan(state), value, alpha * value + (1.0 - alpha) * state)
+            state = np.where(valid, updated, state)
+            seen += valid
+            out[t] = np.where(seen >= n, state, np.nan)
+    return out.T
+
+
+def _wilder(values: np.ndarray, n: int) -> np.ndarray:
+    """Wilder smoothing: mean of the first `n` valid values, then (prev * (n - 1) + v) / n"""
+    bars = np.ascontiguousarray(values.T)
+    out = np.empty_like(bars)
+    total = np.zeros(bars.shape[1])
+    state = np.full(bars.shape[1], np.nan)
+    seen = np.zeros(bars.shape[1])
+    with np.errstate(invalid="ignore"):
+        for t in range(bars.shape[0]):
+            value = bars[t]
+            valid = ~np.isnan(value)
+            seen += valid
+            total = np.where(valid & (seen <= n), total + value, total)
+            smoothed = np.where(seen == n, total / n, (state * (n - 1) + value) / n)
+            state = np.where(valid & (seen >= n), smoothed, state)
+            out[t] = state
+    return out.T
+
+
+def _previous_valid(x: np.ndarray) -> np.ndarray:
+    """Value of the last valid bar strictly before each bar"""
+    rows, cols = x.shape
+    idx = np.where(~np.isnan(x), np.arange(cols), -1)
+    idx = np.maximum.accumulate(idx, axis=1)
+    prev_idx = np.concatenate([np.full((rows, 1), -1), idx[:, :-1]], axis=1)
+    prev = np.take_along_axis(x, np.maximum(prev_idx, 0), axis=1)
+    prev[prev_idx < 0] = np.nan
+    return prev
+
+
+def rsi(close: np.ndarray, n: int = RSI_PERIOD) -> np.ndarray:
+    change = close - _previous_valid(close)
+    gain = np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+    loss = np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+    avg_gain = _wilder(gain, n)
+    avg_loss = _wilder(loss, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out = np.where(avg_loss == 0.0, np.where(avg_gain > 0.0, 100.0, 50.0), out)
+    out[np.isnan(avg_gain)] = np.nan
+    return out
+
+
+def macd(close: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+         signal: int = MACD_SIGNAL) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    # Feed the signal EMA only on bars where the close was present
+    line_on_bars = np.where(np.isnan(close), np.nan, line)
+    signal_line = ema(line_on_bars, signal)
+    return line, signal_line, line - signal_line
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = _previous_valid(close)
+    ranges = np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    tr = np.fmax.reduce(ranges, axis=0)
+    tr[np.isnan(high) | np.isnan(low) | np.isnan(close)] = np.nan
+    return tr
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int = ATR_PERIOD) -> np.ndarray:
+    return _wilder(true_range(high, low, close), n)
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    direction = np.sign(close - _previous_valid(close))
+    flow = np.where(np.isnan(direction) | np.isnan(volume), 0.0, direction * np.nan_to_num(volume))
+    out = np.cumsum(flow, axis=1)
+    # Undefined before the first bar with a close
+    started = np.maximum.accumulate(~np.isnan(close), axis=1)
+    out[~started] = np.nan
+    return out
+
+
+def compute_indicators(prices: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Compute the full indicator set for an N x T price matrix in one pass.
+
+    `prices` maps "Open"/"High"/"Low"/"Close"/"Volume" to (N, T) float arrays.
+    Every returned array has the same shape.
+    """
+    close, high, low, volume = prices["Close"], prices["High"], prices["Low"], prices["Volume"]
+    out: Dict[str, np.ndarray] = {}
+
+    for n in SMA_PERIODS:
+        out[f"sma_{n}"] = sma(close, n)
+    for n in EMA_PERIODS:
+        out[f"ema_{n}"] = ema(close, n)
+
+    out[f"rsi_{RSI_PERIOD}"] = rsi(close, RSI_PERIOD)
+    out["macd"], out["macd_signal"], out["macd_histogram"] = macd(close)
+
+    middle = sma(close, BOLLINGER_PERIOD)
+    width = BOLLINGER_WIDTH * rolling_std(close, BOLLINGER_PERIOD)
+    out["bollinger_middle"] = middle
+    out["bollinger_upper"] = middle + width
+    out["bollinger_lower"] = middle - width
+
+    out[f"atr_{ATR_PERIOD}"] = atr(high, low, close, ATR_PERIOD)
+    out["obv"] = obv(close, volume)
+    out[f"volume_avg_{VOLUME_AVG_PERIOD}"] = sma(volume, VOLUME_AVG_PERIOD)
+    out[f"high_{RANGE_PERIOD}"] = rolling_max(high, RANGE_PERIOD)
+    out[f"low_{RANGE_PERIOD}"] = rolling_min(low, RANGE_PERIOD)
+    return out
+
+
+def build_price_matrix(market_data: List[Dict[str, Any]]) -> Tuple[List[str], List[str], Dict[str, np.ndarray]]:
+    """
+    Align the `price_data` records of every symbol in `market_data` on a shared
+    date axis. Returns (symbols, dates, {field: (N, T) array}).
+    """
+    histories = {}
+    for entry in market_data or []:
+        for symbol, data in entry.items():
+            if isinstance(data, dict) and data.get("price_data"):
+                histories[symbol] = data["price_data"]
+
+    symbols = list(histories)
+    dates = sorted({str(row.get("Date")) for rows in histories.values() for row in rows})
+    date_index = {d: i for i, d in enumerate(dates)}
+    matrix = {field: np.full((len(symbols), len(dates)), np.nan) for field in FIELDS}
+
+    for i, symbol in enumerate(symbols):
+        for row in histories[symbol]:
+            t = date_index[str(row.get("Date"))]
+            for field in FIELDS:
+                value = row.get(f"{field}_{symbol}")
+                if isinstance(value, (int, float)) and value == value:
+                    matrix[field][i, t] = value
+    return symbols, dates, matrix
+
+
+def latest_snapshot(symbols: List[str], indicators: Dict[str, np.ndarray]) -> Dict[str, Dict[str, Any]]:
+    """Most recent value of every indicator per symbol, NaN reported as None"""
+    snapshot = {}
+    for i, symbol in enumerate(symbols):
+        values = {}
+        for name, matrix in indicators.items():
+            value = matrix[i, -1] if matrix.shape[1] else np.nan
+            values[name] = None if np.isnan(value) else round(float(value), 4)
+        snapshot[symbol] = values
+    return snapshot
@@ -0,0 +1,160 @@
+import re
+import bisect
+import logging
+from typing import Dict, List, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Term -> weight. Terms match on word boundaries with their inflected forms
+# ("drop" matches "dropped", "plunge" matches "plunging", never "bestseller" for "sell").
+DEFAULT_SENTIMENT_LEXICON: Dict[str, float] = {
+    'growth': 1.0, 'strong': 1.0, 'beat': 1.0, 'profit': 1.0, 'increase': 1.0,
+    'bullish': 1.0, 'upgrade': 1.0, 'outperform': 1.0, 'buy': 1.0, 'gains': 1.0,
+    'decline': -1.0, 'loss': -1.0, 'weak': -1.0, 'miss': -1.0, 'decrease': -1.0,
+    'bearish': -1.0, 'downgrade': -1.0, 'underperform': -1.0, 'sell': -1.0, 'falls': -1.0,
+}
+
+DEFAULT_THEME_LEXICON: Dict[str, List[str]] = {
+    'Dividend Focus': ['dividend', 'yield'],
+    'Institutional Interest': ['position', 'investment', 'portfolio'],
+    'Competitive Analysis': ['competition', 'vs', 'versus', 'compared'],
+    'Financial Performance': ['earnings', 'profit', 'revenue'],
+}
+
+DEFAULT_NEGATORS = ['not', 'no', 'never', 'without', "isn't", "aren't", "wasn't", "didn't", "doesn't", "won't", 'fails to', 'failed to']
+
+# A negator flips the polarity of sentiment terms up to this many words after it
+NEGATION_WINDOW = 3
+
+# Forms the regular rules in `inflections` cannot produce
+IRREGULAR_FORMS: Dict[str, List[str]] = {
+    'falls': ['fall', 'fell', 'fallen', 'falling'],
+    'gains': ['gain', 'gained', 'gaining'],
+    'sell': ['sold'],
+    'buy': ['bought'],
+    'win': ['won'],
+    'slide': ['slid'],
+}
+
+_ARTICLE_SEPARATOR = "\n"
+# Single-vowel words ending in one consonant double it before -ed/-ing ("drop" -> "dropped")
+_DOUBLING = re.compile(r"[^aeiou]*[aeiou][^aeiouwxy]")
+
+
+def inflections(term: str) -> List[str]:
+    """The term and its plural/verb forms; multi-word terms inflect their last word"""
+    head, _, word = term.rpartition(" ")
+    prefix = f"{head} " if head else ""
+    if word.endswith("e"):
+        forms = {word, word + "s", word + "d", word[:-1] + "ing"}
+    elif len(word) > 1 and word.endswith("y") and word[-2] not in "aeiou":
+        forms = {word, word[:-1] + "ies", word[:-1] + "ied", word + "ing"}
+    else:
+        plural = word + "es" if word.endswith(("s", "x", "z", "ch", "sh")) else word + "s"
+        forms = {word, plural, word + "ed", word + "ing"}
+        if _DOUBLING.fullmatch(word):
+            forms |= {word + word[-1] + "ed", word + word[-1] + "ing"}
+    forms |= set(IRREGULAR_FORMS.get(term, ()))
+    return sorted(prefix + form for form in forms)
+
+
+def _alternation(terms: Iterable[str]) -> str:
+    # Longest first so multi-word terms win over their prefixes
+    return "|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True))
+
+
+class LexiconMatcher:
+    """
+    Compiled word-boundary matcher for weighted sentiment terms, theme terms and
+    negators. All lexicons are folded into a single regular expression so a batch
+    of titles is scanned in one pass.
+    """
+
+    def __init__(self,
+                 sentiment_lexicon: Optional[Dict[str, float]] = None,
+                 theme_lexicon: Optional[Dict[str, List[str]]] = None,
+                 negators: Optional[List[str]] = None,
+                 negation_window: int = NEGATION_WINDOW):
+        self.sentiment_lexicon = {k.lower(): v for k, v in (sentiment_lexicon or DEFAULT_SENTIMENT_LEXICON).items()}
+        self.theme_lexicon = theme_lexicon or DEFAULT_THEME_LEXICON
+        self.negators = [n.lower() for n in (negators or DEFAULT_NEGATORS)]
+        self.negation_window = negation_window
+
+        self._term_themes: Dict[str, List[str]] = {}
+        for theme, terms in self.theme_lexicon.items():
+            for term in terms:
+                self._term_themes.setdefault(term.lower(), []).append(theme)
+
+        # Surface form -> lexicon term; a form shared by two terms keeps the first
+        self._forms: Dict[str, str] = {}
+        for term in sorted(set(self.sentiment_lexicon) | set(self._term_themes)):
+            for form in inflections(term):
+                self._forms.setdefault(form, term)
+        for term in set(self.sentiment_lexicon) | set(self._term_themes):
+            self._forms[term] = term
+        self._pattern = re.compile(
+            rf"\b(?:(?P<neg>{_alternation(self.negators)})|(?P<term>{_alternation(self._forms)}))\b"
+        )
+
+    def score_batch(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Score a batch of texts in a single scan.
+
+        Returns per-article results (weighted score, positive/negative hit counts,
+        themes) and batch aggregates.
+        """
+        articles = [{"score": 0.0, "positive": 0, "negative": 0, "themes": []} for _ in texts]
+        if not texts:
+            return {"articles": articles, "aggregate": self._aggregate(articles)}
+
+        cleaned = [(t or "").lower().replace(_ARTICLE_SEPARATOR, " ") for t in texts]
+        corpus = _ARTICLE_SEPARATOR.join(cleaned)
+        starts = []
+        offset = 0
+        for text in cleaned:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        negation_article = -1
+        negation_end = -1
+        for match in self._pattern.finditer(corpus):
+            idx = bisect.bisect_right(starts, match.start()) - 1
+            if match.group("neg"):
+                negation_article, negation_end = idx, match.end()
+                continue
+
+            term = self._forms[match.group("term")]
+            result = articles[idx]
+            for theme in self._term_themes.get(term, ()):
+                if theme not in result["themes"]:
+                    result["themes"].append(theme)
+
+            weight = self.sentiment_lexicon.get(term)
+            if not weight:
+                continue
+            if negation_article == idx and corpus.count(" ", negation_end, match.start()) <= self.negation_window:
+                weight = -weight
+            result["score"] += weight
+            if weight > 0:
+                result["positive"] += 1
+            else:
+                result["negative"] += 1
+
+        return {"articles": articles, "aggregate": self._aggregate(articles)}
+
+    @staticmethod
+    def _aggregate(articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        positive_articles = sum(1 for a in articles if a["score"] > 0)
+        negative_articles = sum(1 for a in articles if a["score"] < 0)
+        theme_counts: Dict[str, int] = {}
+        for a in articles:
+            for theme in a["themes"]:
+                theme_counts[theme] = theme_counts.get(theme, 0) + 1
+        return {
+            "total_articles": len(articles),
+            "positive_articles": positive_articles,
+            "negative_articles": negative_articles,
+            "net_sentiment": positive_articles - negative_articles,
+            "weighted_score": round(sum(a["score"] for a in articles), 4),
+            "theme_counts": theme_counts,
+        }
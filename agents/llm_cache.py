@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "llm_cache.db")
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24")) * 3600
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+# Session state flag that makes the next model calls skip the cache
+SKIP_CACHE_STATE_KEY = "skip_llm_cache"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation-only differences share a cache entry"""
+    return re.sub(r"\s+", " ", prompt or "").strip()
+
+
+def cache_key(model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps({"model": model, "prompt": normalise_prompt(prompt), "config": config or {}},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent LLM response cache keyed by (model, normalised prompt hash,
+    generation config), with a time-to-live and least-recently-used eviction
+    once more than `max_entries` responses are stored.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path or DEFAULT_DB_PATH
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response, or None when missing or older than the TTL"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                now = time.time()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    self.counters["misses"] += 1
+                    return None
+                with conn:
+                    conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                self.counters["hits"] += 1
+                return row[0]
+        except Exception as e:
+            logger.error(f"Error reading LLM cache {self.path}: {e}")
+            return None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        if not response:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                now = time.time()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                        (key, model, response, now, now),
+                    )
+                    # Expired rows go first, then the least recently used beyond the size bound
+                    expired = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+                    overflow = conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    ).rowcount
+                self.counters["stores"] += 1
+                self.counters["evictions"] += expired + overflow
+        except Exception as e:
+            logger.error(f"Error writing LLM cache {self.path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": entries,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM responses")
+
+
+_default_cache: Optional[LLMCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> LLMCache:
+    """Process-wide cache shared by the agents"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+# Cache keys of LlmAgent calls in flight, by invocation id, between the before and after callbacks
+_pending_keys: Dict[str, tuple] = {}
+
+
+def release_pending(invocation_id: str) -> None:
+    """Forget the cache key of a call that never reached `cache_after_model`, e.g. because the model raised"""
+    _pending_keys.pop(invocation_id, None)
+
+
+def _request_key(llm_request) -> str:
+    contents = [
+        {"role": content.role, "parts": [part.text for part in content.parts or [] if part.text]}
+        for content in llm_request.contents or []
+    ]
+    config = {}
+    if llm_request.config:
+        config = llm_request.config.model_dump(mode="json", exclude_none=True, exclude={"response_schema"})
+        schema = llm_request.config.response_schema
+        # Output schemas are usually pydantic classes, which do not serialise as config values
+        if schema is not None:
+            config["response_schema"] = (
+                schema.model_json_schema() if hasattr(schema, "model_json_schema") else str(schema)
+            )
+    return cache_key(llm_request.model or "", json.dumps(contents, sort_keys=True), config)
+
+
+def cache_before_model(callback_context, llm_request):
+    """
+    LlmAgent `before_model_callback`: answer from the cache when the same
+    request was seen within the TTL, otherwise remember the key for
+    `cache_after_model`. Set `skip_llm_cache` in session state to opt out.
+    """
+    from google.genai.types import Content, Part
+    from google.adk.models import LlmResponse
+
+    if callback_context.state.get(SKIP_CACHE_STATE_KEY):
+        return None
+    try:
+        key = _request_key(llm_request)
+    except Exception as e:
+        logger.error(f"Error building LLM cache key: {e}")
+        return None
+    cached = get_default_cache().get(key)
+    if cached is not None:
+        logger.info(f"[{callback_context.agent_name}] Answered from LLM cache")
+        return LlmResponse(content=Content(role="model", parts=[Part(text=cached)]))
+    _pending_keys[callback_context.invocation_id] = (key, llm_request.model or "")
+    return None
+
+
+def cache_after_model(callback_context, llm_response):
+    """LlmAgent `after_model_callback`: store the final text response of a cache miss"""
+    if llm_response.partial:
+        return None
+    pending = _pending_keys.pop(callback_context.invocation_id, None)
+    if pending is None or llm_response.error_code or not llm_response.content:
+        return None
+    text = "".join(part.text for part in llm_response.content.parts or [] if part.text)
+    # Responses with function calls are not plain text and are never cached
+    if text and not any(part.function_call for part in llm_response.content.parts or []):
+        get_default_cache().put(*pending, text)
+    return None
@@ -1,21 +1,36 @@
 import ast
+import time
 import asyncio
 import logging
+from datetime import date, timedelta
 import requests
 import yfinance as yf
 import pandas as pd
-from typing import List, Dict, Any, AsyncGenerator
+from typing import List, Dict, Any, AsyncGenerator, Optional
 from typing_extensions import override
+from pydantic import Field
 
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
 from google.genai.types import Content, Part
+from agents.price_store import PriceStore
+from agents.risk import BENCHMARK_SYMBOL
+from agents.fundamentals_cache import FundamentalsCache
+from agents.blob_store import offload
 
 logger = logging.getLogger(__name__)
 
 class MarketDataAgent(BaseAgent):
     name: str = "Market_Data_Agent"
+    price_store: PriceStore = Field(default_factory=PriceStore)
+    benchmark_symbol: str = BENCHMARK_SYMBOL
+    fundamentals_cache: FundamentalsCache = Field(default_factory=FundamentalsCache)
+    # Derive price fields from OHLCV and call ticker.info only for stale fundamentals
+    derive_from_ohlcv: bool = True
+    history_period: str = "1y"
+    # Stored history written more recently than this is used without downloading
+    history_ttl_seconds: float = 900
     model_config = {"arbitrary_types_allowed": True}
 
     def __init__(self, name="Market_Data_Agent"):
@@ -40,6 +55,12 @@ class MarketDataAgent(BaseAgent):
                 df["Date"] = df["Date"].astype(str)
 
             price_data_dict = df.to_dict(orient="records")
+            
+            # Accumulate the daily history for backtesting
+            try:
+                self.price_store.save_records(stock, price_data_dict)
+            except Exception as e:
+                logger.error(f"[{self.name}] Error storing price history for {stock}: {str(e)}")
             info = ticker.info
             
 
@@ -60,6 +81,7 @@ class MarketDataAgent(BaseAgent):
                 "EPS (TTM)": info.get("trailingEps"),
                 "P/B Ratio": info.get("priceToBook"),
                 "Sector": info.get("sector"),
+                "Industry": info.get("industry"),
                 "Market Cap (USD)": info.get("marketCap"),
                 "Enterprise Value": info.get("enterpriseValue"),
                 "50D Avg": info.get("fiftyDayAverage"),
@@ -84,6 +106,168 @@ class MarketDataAgent(BaseAgent):
             result[stock] = {"error": str(e)}
         return result
 
+    def _local_history(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Recently written stored history covering the last year, or None"""
+        modified = self.price_store.modified_at(symbol)
+        if modified is None or time.time() - modified > self.history_ttl_seconds:
+            return None
+        frame = self.price_store.load(symbol, start=(date.today() - timedelta(days=365)).isoformat())
+        return frame if len(frame) >= 200 else None
+
+    def _download_history(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        """One batched yf.download for every symbol; returns a Date + OHLCV frame per symbol"""
+        if not symbols:
+            return {}
+        df = yf.download(symbols, period=self.history_period, interval="1d", group_by="ticker", progress=False)
+        frames = {}
+        for symbol in symbols:
+            if isinstance(df.columns, pd.MultiIndex):
+                if symbol not in df.columns.get_level_values(0):
+                    continue
+                frame = df[symbol]
+            else:
+                frame = df
+            frame = frame.dropna(how="all").reset_index()
+            if not frame.empty:
+                frames[symbol] = frame
+        return frames
+
+    def _fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        """Fundamentals from the cache, calling ticker.info only when the entry is stale"""
+        cached = self.fundamentals_cache.get(symbol)
+        if cached is not None:
+            return cached
+        logger.info(f"[{self.name}] Fundamentals for {symbol} are stale; calling ticker.info")
+        return self.fundamentals_cache.put(symbol, yf.Ticker(symbol).info)
+
+    def _price_records(self, symbol: str, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Date + OHLCV rows in the `Close_MSFT`-style layout the other agents read"""
+        records = []
+        for row in frame.itertuples(index=False):
+            row = row._asdict()
+            record = {"Date": pd.Timestamp(row["Date"]).strftime("%Y-%m-%d")}
+            for field in ("Close", "High", "Low", "Open", "Volume"):
+                value = row.get(field)
+                record[f"{field}_{symbol}"] = None if pd.isna(value) else float(value)
+            records.append(record)
+        return records
+
+    def _derive_summary(self, frame: pd.DataFrame, fundamentals: Dict[str, Any]) -> Dict[str, Any]:
+        """Summary with price fields from the OHLCV history and price-dependent ratios at the latest close"""
+        frame = frame.dropna(subset=["Close"])
+        last = frame.iloc[-1]
+        close = float(last["Close"])
+        year = frame.tail(252)
+
+        eps = fundamentals.get("trailingEps")
+        book_value = fundamentals.get("bookValue")
+        shares = fundamentals.get("sharesOutstanding")
+        # Ratios cached with the fundamentals would be stale by the price move since; recompute them
+        pe_ratio = close / eps if isinstance(eps, (int, float)) and eps > 0 else fundamentals.get("trailingPE")
+        pb_ratio = close / book_value if isinstance(book_value, (int, float)) and book_value > 0 else fundamentals.get("priceToBook")
+        market_cap = close * shares if isinstance(shares, (int, float)) and shares > 0 else fundamentals.get("marketCap")
+
+        return {
+            "Open": float(last["Open"]),
+            "Previous Close": float(frame["Close"].iloc[-2]) if len(frame) > 1 else None,
+            "High": float(last["High"]),
+            "Low": float(last["Low"]),
+            "52W High": float(year["High"].max()),
+            "52W Low": float(year["Low"].min()),
+            "Volume": float(last["Volume"]),
+            "Book Value Per Share": book_value,
+            "Dividend Rate": fundamentals.get("dividendRate"),
+            "Dividend Yield": fundamentals.get("dividendYield"),
+            "Beta": fundamentals.get("beta"),
+            "P/E Ratio (TTM)": round(pe_ratio, 2) if isinstance(pe_ratio, (int, float)) else pe_ratio,
+            "Forward P/E": fundamentals.get("forwardPE"),
+            "EPS (TTM)": eps,
+            "P/B Ratio": round(pb_ratio, 2) if isinstance(pb_ratio, (int, float)) else pb_ratio,
+            "Sector": fundamentals.get("sector"),
+            "Industry": fundamentals.get("industry"),
+            "Market Cap (USD)": market_cap,
+            "Enterprise Value": fundamentals.get("enterpriseValue"),
+            "50D Avg": float(frame["Close"].tail(50).mean()),
+        }
+
+    async def fetch_all(self, stocks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Market data for every stock: local or one batched OHLCV download for the
+        price fields, cached fundamentals, and ticker.info only for stale entries.
+        """
+        histories = {}
+        for stock in stocks:
+            local = self._local_history(stock)
+            if local is not None:
+                histories[stock] = local
+        
+        to_download = [s for s in stocks if s not in histories]
+        if self._benchmark_stale() and self.benchmark_symbol not in stocks:
+            to_download.append(self.benchmark_symbol)
+        
+        if to_download:
+            logger.info(f"[{self.name}] Downloading {self.history_period} of OHLCV for {to_download} in one batch")
+            try:
+                downloaded = await asyncio.to_thread(self._download_history, to_download)
+            except Exception as e:
+                logger.error(f"[{self.name}] Error downloading price history: {str(e)}")
+                downloaded = {}
+            for symbol, frame in downloaded.items():
+                try:
+                    self.price_store.save(symbol, frame)
+                except Exception as e:
+                    logger.error(f"[{self.name}] Error storing price history for {symbol}: {str(e)}")
+                if symbol in stocks:
+                    histories[symbol] = frame
+        
+        # Only stale fundamentals hit the slow endpoint, concurrently
+        fundamentals = await asyncio.gather(
+            *(asyncio.to_thread(self._fetch_fundamentals, stock) for stock in stocks),
+            return_exceptions=True
+        )
+        
+        results = []
+        for stock, info in zip(stocks, fundamentals):
+            try:
+                if stock not in histories:
+                    raise ValueError("No price history returned")
+                if isinstance(info, Exception):
+                    logger.error(f"[{self.name}] Error fetching fundamentals for {stock}: {str(info)}")
+                    info = {}
+                frame = histories[stock]
+                results.append({stock: {
+                    "summary": self._derive_summary(frame, info),
+                    "price_data": self._price_records(stock, frame)
+                }})
+                logger.info(f"[{self.name}] Successfully fetched data for {stock}")
+            except Exception as e:
+                logger.error(f"[{self.name}] Error fetching data for {stock}: {str(e)}")
+                results.append({stock: {"error": str(e)}})
+        return results
+
+    def _benchmark_stale(self) -> bool:
+        """True when the stored benchmark history stops before the previous business day"""
+        last = self.price_store.last_date(self.benchmark_symbol)
+        return not last or pd.Timestamp(last) < pd.Timestamp(date.today()) - pd.offsets.BDay(1)
+
+    async def refresh_benchmark(self):
+        """Keep a year of benchmark history in the price store for local risk metrics"""
+        try:
+            if not self._benchmark_stale():
+                return
+            # From the last stored bar (re-fetched in case it was partial) however long ago that was,
+            # so a pause of more than a few days leaves no gap; at most a year back
+            year_ago = (date.today() - timedelta(days=365)).isoformat()
+            last = self.price_store.last_date(self.benchmark_symbol)
+            df = await asyncio.to_thread(
+                yf.download, self.benchmark_symbol, start=max(last or year_ago, year_ago), interval="1d", progress=False
+            )
+            df.columns = [col[0] if isinstance(col, tuple) else col for col in df.columns]
+            df.reset_index(inplace=True)
+            self.price_store.save(self.benchmark_symbol, df)
+        except Exception as e:
+            logger.error(f"[{self.name}] Error refreshing benchmark {self.benchmark_symbol}: {str(e)}")
+
     def format_market_summary(self, summary: Dict[str, Any]) -> str:
         def fmt(val):
             if isinstance(val, (int, float)):
@@ -105,14 +289,17 @@ class MarketDataAgent(BaseAgent):
         ]
         return "\n".join(lines)
     
-    def format_price_data(self, records: List[Dict[str, Any]]) -> str:
+    def format_price_data(self, records: List[Dict[str, Any]], symbol: str, rows: int = 5) -> str:
+        def price(value):
+            return f"{value:.2f}" if isinstance(value, (int, float)) else "N/A"
+
         lines = []
-        for row in records:
+        for row in records[-rows:]:
             lines.append(
                 f"📅 {row.get('Date')}:\n"
-                f"• Open: ${row.get('Open_MSFT', 'N/A')} | High: ${row.get('High_MSFT', 'N/A')} | "
-                f"Low: ${row.get('Low_MSFT', 'N/A')} | Close: ${row.get('Close_MSFT', 'N/A')} | "
-                f"Volume: {int(row.get('Volume_MSFT', 0)):,}"
+                f"• Open: ${price(row.get(f'Open_{symbol}'))} | High: ${price(row.get(f'High_{symbol}'))} | "
+                f"Low: ${price(row.get(f'Low_{symbol}'))} | Close: ${price(row.get(f'Close_{symbol}'))} | "
+                f"Volume: {int(row.get(f'Volume_{symbol}') or 0):,}"
             )
         return "\n\n".join(lines)
 
@@ -134,13 +321,19 @@ class MarketDataAgent(BaseAgent):
                 except:
                     raw_stocks = [raw_stocks]
             
-            full_market_data = []
-            for stock in raw_stocks:
-                logger.info(f"[{self.name}] Fetching market data for {stock}")
-                stock_data = await self.fetch_data_sync(stock)
-                full_market_data.append(stock_data)
+            if self.derive_from_ohlcv:
+                full_market_data = await self.fetch_all(raw_stocks)
+            else:
+                await self.refresh_benchmark()
+                
+                full_market_data = []
+                for stock in raw_stocks:
+                    logger.info(f"[{self.name}] Fetching market data for {stock}")
+                    stock_data = await self.fetch_data_sync(stock)
+                    full_market_data.append(stock_data)
 
-            ctx.session.state["market_data"] = full_market_data
+            # Price histories are kept in the blob store; session state holds a small reference
+            ctx.session.state["market_data"] = offload(full_market_data)
             logger.info(f"[{self.name}] Stored market data in session.")
 
             summaries = []
@@ -150,7 +343,7 @@ class MarketDataAgent(BaseAgent):
                         summaries.append(f"\n {symbol}: {data['error']}")
                     else:
                         summary_text = self.format_market_summary(data["summary"])
-                        price_text = self.format_price_data(data["price_data"])
+                        price_text = self.format_price_data(data["price_data"], symbol)
                         summaries.append(
                             f"\n {symbol} Market Summary:\n{summary_text}\n\n"
                             f"\n\n Recent Price Data:\n{price_text}"
@@ -0,0 +1,132 @@
+import re
+import random
+import hashlib
+import logging
+from typing import Dict, List, Any, FrozenSet, Tuple
+
+logger = logging.getLogger(__name__)
+
+# MinHash signature of NUM_PERM values split into BANDS bands of ROWS rows.
+# Two articles become LSH candidates when any band matches exactly, which
+# happens with high probability once their Jaccard similarity exceeds roughly
+# (1 / BANDS) ** (1 / ROWS) ~= 0.59; candidates are then verified exactly.
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.7
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the this to was will with".split()
+)
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Normalised word set of a piece of text, stopwords removed"""
+    return frozenset(t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS)
+
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash signature of a token set"""
+    if not tokens:
+        return tuple([_MERSENNE_PRIME] * NUM_PERM)
+    hashes = [
+        int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big") % _MERSENNE_PRIME
+        for t in tokens
+    ]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _article_text(article: Dict[str, Any]) -> str:
+    """Title plus whatever body text the article carries"""
+    parts = [article.get("title") or ""]
+    for key in ("description", "summary"):
+        if article.get(key):
+            parts.append(article[key])
+            break
+    return " ".join(parts)
+
+
+class MinHashLSHIndex:
+    """Banded LSH index over MinHash signatures for near-duplicate lookup"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.token_sets: List[FrozenSet[str]] = []
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(BANDS)]
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def query(self, tokens: FrozenSet[str], signature: Tuple[int, ...]) -> List[int]:
+        """Return ids of indexed items whose Jaccard similarity meets the threshold"""
+        seen = set()
+        matches = []
+        for band, key in self._band_keys(signature):
+            for item_id in self._buckets[band].get(key, ()):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                if jaccard(tokens, self.token_sets[item_id]) >= self.threshold:
+                    matches.append(item_id)
+        return matches
+
+    def add(self, tokens: FrozenSet[str], signature: Tuple[int, ...]) -> int:
+        item_id = len(self.token_sets)
+        self.token_sets.append(tokens)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(item_id)
+        return item_id
+
+
+def dedupe_articles(articles: List[Dict[str, Any]], threshold: float = SIMILARITY_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Collapse near-duplicate articles (syndicated rewrites, re-titled copies) into one
+    representative per cluster. The first article of each cluster is kept, in input
+    order, annotated with `duplicate_count` and the `duplicate_sources` it absorbed.
+    """
+    if not articles:
+        return []
+
+    index = MinHashLSHIndex(threshold)
+    representatives: List[Dict[str, Any]] = []
+    # Index id -> position of the cluster representative in `representatives`
+    cluster_of: List[int] = []
+
+    for article in articles:
+        tokens = shingles(_article_text(article))
+        signature = minhash(tokens)
+        matches = index.query(tokens, signature) if tokens else []
+        index.add(tokens, signature)
+
+        if matches:
+            cluster = cluster_of[matches[0]]
+            cluster_of.append(cluster)
+            rep = representatives[cluster]
+            rep["duplicate_count"] += 1
+            source = article.get("source")
+            if source and source != rep.get("source") and source not in rep["duplicate_sources"]:
+                rep["duplicate_sources"].append(source)
+        else:
+            cluster_of.append(len(representatives))
+            representatives.append({**article, "duplicate_count": 0, "duplicate_sources": []})
+
+    removed = len(articles) - len(representatives)
+    if removed:
+        logger.info(f"Collapsed {removed} near-duplicate articles into {len(representatives)} unique stories")
+    return representatives
@@ -9,6 +9,8 @@ from google.genai.types import Content, Part
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
+from agents.news_dedup import dedupe_articles
+from agents.blob_store import offload
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -72,12 +74,20 @@ class NewsScraperAgent(BaseAgent):
             all_news = []
             news_summaries = []
             
-            for stock in raw_stocks:
+            # search_queries[i] was extracted for stocks[i]
+            symbols = ctx.session.state.get("stocks", [])
+            if not isinstance(symbols, list) or len(symbols) != len(raw_stocks):
+                symbols = [None] * len(raw_stocks)
+            
+            for stock, symbol in zip(raw_stocks, symbols):
                 logger.info(f"[{self.name}] Fetching news for {stock}")
                 articles = await self._fetch_articles(stock)
+                # Collapse syndicated copies so each story is scored and reported once
+                articles = dedupe_articles(articles)
                 
                 news_data = {
                     "stock": stock,
+                    "symbol": symbol,
                     "articles": articles,
                     "sentiment": "neutral"  # placeholder - you can add sentiment analysis later
                 }
@@ -101,15 +111,16 @@ class NewsScraperAgent(BaseAgent):
                 
                 article_lines = []
                 for idx, article in enumerate(articles, start=1):
+                    duplicates = f" +{article['duplicate_count']} similar" if article.get("duplicate_count") else ""
                     article_lines.append(
-                        f"{idx}. {article['title']} ({article['source']})\n🔗 {article['url']}\n🕒 {article['publishedAt']}"
+                        f"{idx}. {article['title']} ({article['source']}{duplicates})\n🔗 {article['url']}\n🕒 {article['publishedAt']}"
                 )
                 
                 stock_block = f"📰 News for {stock} ({len(articles)} articles):\n" + "\n\n".join(article_lines)
                 news_summaries.append(stock_block)
 
             # Store in session state
-            ctx.session.state["news_analysis"] = all_news
+            ctx.session.state["news_analysis"] = offload(all_news)
             logger.info(f"[{self.name}] News analysis stored in session state for {len(raw_stocks)} stocks")
 
             # Generate response
@@ -141,6 +152,7 @@ class NewsScraperAgent(BaseAgent):
                         return [
                             {
                                 "title": article["title"], 
+                                "description": article.get("description") or "",
                                 "url": article["url"],
                                 "publishedAt": article.get("publishedAt", ""),
                                 "source": article.get("source", {}).get("name", "Unknown")
@@ -0,0 +1,183 @@
+import os
+import asyncio
+import logging
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
+from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+from reportlab.lib.colors import black, blue, red
+
+from agents.process_pool import worker_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Box a chart is scaled into on the page, keeping its aspect ratio
+CHART_WIDTH, CHART_HEIGHT = 6.5*inch, 4.6*inch
+
+DISCLAIMERS = [
+    "This report is prepared for informational and educational purposes only and should not be construed as investment advice, investment recommendations, or an offer to buy or sell securities.",
+    "The information contained herein is based on sources believed to be reliable but is not guaranteed to be accurate or complete.",
+    "Past performance does not guarantee future results. All investments involve risk, including the potential loss of principal.",
+    "Before making any investment decisions, please consult with a qualified financial advisor who can assess your individual financial situation and investment objectives.",
+    "The analysis and recommendations in this report are based on market conditions and information available as of the report date and may change without notice.",
+    "Report generated using AI-assisted analysis tools."
+]
+
+# Built once per process; reportlab styles are immutable once the story is laid out
+_worker_styles: Optional[Dict[str, ParagraphStyle]] = None
+
+
+def _styles() -> Dict[str, ParagraphStyle]:
+    global _worker_styles
+    if _worker_styles is None:
+        styles = getSampleStyleSheet()
+        _worker_styles = {
+            "title": ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=18, textColor=blue,
+                                    spaceAfter=30, alignment=TA_CENTER),
+            "heading": ParagraphStyle('CustomHeading', parent=styles['Heading1'], fontSize=14, textColor=black,
+                                      spaceAfter=12, spaceBefore=20),
+            "body": ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=10, alignment=TA_JUSTIFY,
+                                   spaceAfter=12),
+            "disclaimer": ParagraphStyle('Disclaimer', parent=styles['Normal'], fontSize=8, textColor=red,
+                                         alignment=TA_JUSTIFY, spaceAfter=6),
+        }
+    return _worker_styles
+
+
+def is_section_header(line: str) -> bool:
+    """Section headers are all caps or start with a number"""
+    return (line.isupper() and len(line) > 10) or (bool(line) and line[0].isdigit() and '.' in line[:5])
+
+
+def parse_report_sections(content: str) -> List[Tuple[str, str]]:
+    """Parse report content into (title, text) sections"""
+    sections = []
+    current_section = ""
+    current_content = []
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if is_section_header(line):
+            if current_section and current_content:
+                sections.append((current_section, '\n'.join(current_content)))
+            current_section = line
+            current_content = []
+        else:
+            current_content.append(line)
+
+    if current_section and current_content:
+        sections.append((current_section, '\n'.join(current_content)))
+    return sections
+
+
+def render_pdf(content: str, stocks: List[str], analysis_date: str, filepath: Optional[str] = None,
+               charts: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Lay out the report into an in-memory PDF and return its bytes, also
+    writing them to `filepath` when given.
+    `charts` maps symbols to PNG paths placed in a PRICE CHARTS section.
+    Runs in the caller or a pool worker.
+    """
+    styles = _styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=1*inch,
+        bottomMargin=1*inch
+    )
+
+    stocks_str = ", ".join(stocks) if stocks else "Portfolio Analysis"
+    story = [
+        Paragraph("INVESTMENT RESEARCH REPORT", styles["title"]),
+        Paragraph(stocks_str, styles["heading"]),
+        Spacer(1, 0.2*inch),
+    ]
+    metadata = f"""
+    <b>Report Date:</b> {analysis_date}<br/>
+    <b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
+    <b>Total Securities Analyzed:</b> {len(stocks)}<br/>
+    """
+    story.append(Paragraph(metadata, styles["body"]))
+    story.append(Spacer(1, 0.3*inch))
+
+    for section_title, section_content in parse_report_sections(content):
+        if section_title:
+            story.append(Paragraph(section_title, styles["heading"]))
+        for para in section_content.split('\n\n'):
+            if para.strip():
+                story.append(Paragraph(para.strip().replace('\n', ' '), styles["body"]))
+        story.append(Spacer(1, 0.2*inch))
+
+    if charts:
+        story.append(PageBreak())
+        story.append(Paragraph("PRICE CHARTS", styles["heading"]))
+        for symbol in stocks or sorted(charts):
+            if symbol in charts:
+                story.append(Image(charts[symbol], width=CHART_WIDTH, height=CHART_HEIGHT, kind="proportional"))
+                story.append(Spacer(1, 0.2*inch))
+
+    story.append(PageBreak())
+    story.append(Paragraph("IMPORTANT DISCLAIMERS & RISK WARNINGS", styles["heading"]))
+    for disclaimer in DISCLAIMERS:
+        story.append(Paragraph(disclaimer, styles["disclaimer"]))
+
+    doc.build(story)
+    pdf_bytes = buffer.getvalue()
+    if filepath:
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(pdf_bytes)
+    return pdf_bytes
+
+
+def _init_render_worker():
+    _styles()
+
+
+class PdfRenderer:
+    """
+    Renders report PDFs off the event loop. A lone report is laid out in a
+    thread, which avoids shipping the content and PDF between processes; while
+    another render is in flight, further reports go to a warm process pool so
+    batch runs lay out in parallel.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_RENDER_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Not forked from this process, which runs store threads and holds locks and SQLite connections
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_render_worker,
+                                             mp_context=worker_context())
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, content: str, stocks: List[str], analysis_date: str,
+                     filepath: Optional[str] = None, charts: Optional[Dict[str, str]] = None) -> bytes:
+        """PDF bytes of one report"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool() if self.max_workers > 0 and self._in_flight > 0 else None
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(pool, render_pdf, content, stocks, analysis_date, filepath, charts)
+        finally:
+            self._in_flight -= 1
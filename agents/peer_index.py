@@ -0,0 +1,264 @@
+import os
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "peer_index.json")
+
+# Peer metric -> key in MarketDataAgent's `summary`
+PEER_METRICS: Dict[str, str] = {
+    "pe_ratio": "P/E Ratio (TTM)",
+    "forward_pe": "Forward P/E",
+    "pb_ratio": "P/B Ratio",
+    "beta": "Beta",
+    "dividend_yield": "Dividend Yield",
+    "market_cap": "Market Cap (USD)",
+    "eps": "EPS (TTM)",
+}
+
+# Quantile grid stored per (group, metric): 0%, 1%, ..., 100%
+QUANTILES = np.linspace(0.0, 1.0, 101)
+
+# Industries with fewer peers than this fall back to the sector
+MIN_PEERS = 5
+
+
+def _group_keys(summary: Dict[str, Any]) -> List[str]:
+    keys = []
+    if summary.get("Sector"):
+        keys.append(f"sector:{summary['Sector']}")
+    if summary.get("Industry"):
+        keys.append(f"industry:{summary['Industry']}")
+    return keys
+
+
+def _metric_value(summary: Dict[str, Any], key: str) -> Optional[float]:
+    value = summary.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        return None
+    return float(value)
+
+
+class PeerIndex:
+    """
+    Sector/industry peer distributions of the key fundamental metrics.
+
+    The latest fundamentals of every symbol are kept per group; a background
+    thread rebuilds the quantile sketch of each group that changed and persists
+    the index as JSON. Lookups only read the sketches, so a percentile is a
+    binary search over a fixed 101-point grid regardless of the peer count.
+    """
+
+    def __init__(self, path: Optional[str] = None, rebuild_delay: float = 1.0):
+        self.path = path or DEFAULT_INDEX_PATH
+        self.rebuild_delay = rebuild_delay
+        self._values: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._sketches: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._dirty = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                self._values = stored.get("values", {})
+                self._sketches = {
+                    group: {metric: {**sketch, "quantiles": np.array(sketch["quantiles"])}
+                            for metric, sketch in metrics.items()}
+                    for group, metrics in stored.get("sketches", {}).items()
+                }
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error loading peer index from {self.path}: {e}")
+            self._loaded = True
+
+    def update(self, symbol: str, summary: Dict[str, Any]) -> bool:
+        """Record a symbol's latest fundamentals; affected groups are rebuilt in the background"""
+        return self.update_many({symbol: summary}) > 0
+
+    def update_many(self, summaries: Dict[str, Dict[str, Any]]) -> int:
+        """Record several symbols' fundamentals at once. Returns the number of changed groups."""
+        self._ensure_loaded()
+        changed = set()
+        with self._lock:
+            for symbol, summary in summaries.items():
+                if not isinstance(summary, dict):
+                    continue
+                groups = _group_keys(summary)
+                # A symbol that moved sector/industry leaves its old groups
+                for group, metrics in self._values.items():
+                    if group in groups:
+                        continue
+                    for values in metrics.values():
+                        if values.pop(symbol, None) is not None:
+                            changed.add(group)
+                for group in groups:
+                    metrics = self._values.setdefault(group, {})
+                    for metric, key in PEER_METRICS.items():
+                        values = metrics.setdefault(metric, {})
+                        value = _metric_value(summary, key)
+                        if value is None:
+                            if values.pop(symbol, None) is not None:
+                                changed.add(group)
+                        elif values.get(symbol) != value:
+                            values[symbol] = value
+                            changed.add(group)
+            self._dirty |= changed
+        if changed:
+            self._schedule_rebuild()
+        return len(changed)
+
+    def _schedule_rebuild(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._rebuild_loop, name="peer-index-rebuild", daemon=True)
+                self._worker.start()
+        self._wake.set()
+
+    def _rebuild_loop(self):
+        while True:
+            if not self._wake.wait(timeout=60):
+                # Idle: exit unless an update slipped in while timing out
+                with self._lock:
+                    if not self._dirty:
+                        self._worker = None
+                        return
+            self._wake.clear()
+            # Let bursts of updates settle into one rebuild
+            time.sleep(self.rebuild_delay)
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Error rebuilding peer index: {e}")
+
+    def rebuild(self) -> int:
+        """Rebuild the sketches of every changed group and persist the index. Returns groups rebuilt."""
+        self._ensure_loaded()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            snapshot = {group: {metric: list(values.values()) for metric, values in self._values.get(group, {}).items()}
+                        for group in dirty}
+
+        built = {}
+        for group, metrics in snapshot.items():
+            sketches = {}
+            for metric, values in metrics.items():
+                if not values:
+                    continue
+                array = np.asarray(values, dtype=float)
+                sketches[metric] = {
+                    "count": int(array.size),
+                    "quantiles": np.quantile(array, QUANTILES),
+                }
+            built[group] = sketches
+
+        with self._lock:
+            for group, sketches in built.items():
+                if sketches:
+                    self._sketches[group] = sketches
+                else:
+                    self._sketches.pop(group, None)
+        if built:
+            self._persist()
+        return len(built)
+
+    def _persist(self):
+        with self._lock:
+            stored = {
+                "updated_at": datetime.now().isoformat(),
+                "values": self._values,
+                "sketches": {
+                    group: {metric: {"count": sketch["count"], "quantiles": sketch["quantiles"].tolist()}
+                            for metric, sketch in metrics.items()}
+                    for group, metrics in self._sketches.items()
+                },
+            }
+            payload = json.dumps(stored)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error persisting peer index to {self.path}: {e}")
+
+    def latest(self, symbol: str) -> Dict[str, float]:
+        """Most recently recorded metric values of one symbol"""
+        self._ensure_loaded()
+        with self._lock:
+            for metrics in self._values.values():
+                values = {metric: symbol_values[symbol] for metric, symbol_values in metrics.items() if symbol in symbol_values}
+                if values:
+                    return values
+        return {}
+
+    def percentile(self, group: str, metric: str, value: float) -> Optional[float]:
+        """Percentile (0-100) of `value` within a group's sketch, or None without a sketch"""
+        self._ensure_loaded()
+        sketch = self._sketches.get(group, {}).get(metric)
+        if sketch is None or value is None:
+            return None
+        grid = sketch["quantiles"]
+        if value < grid[0]:
+            return 0.0
+        if value > grid[-1]:
+            return 100.0
+        # Mid-rank over tied grid points, so a value equal to every peer sits at 50
+        first = int(np.searchsorted(grid, value, side="left"))
+        upper = int(np.searchsorted(grid, value, side="right"))
+        if upper > first:
+            return round(float((QUANTILES[first] + QUANTILES[upper - 1]) / 2 * 100), 1)
+        # Interpolate within the grid cell holding the value
+        lower = upper - 1
+        span = grid[upper] - grid[lower]
+        fraction = (value - grid[lower]) / span if span > 0 else 0.0
+        return round(float((QUANTILES[lower] + fraction * (QUANTILES[upper] - QUANTILES[lower])) * 100), 1)
+
+    def peer_percentiles(self, summary: Dict[str, Any], min_peers: int = MIN_PEERS) -> Dict[str, Dict[str, Any]]:
+        """
+        Percentile, peer median and peer count of each metric against the
+        symbol's industry, or its sector when the industry is too thin.
+        """
+        self._ensure_loaded()
+        industry = f"industry:{summary['Industry']}" if summary.get("Industry") else None
+        sector = f"sector:{summary['Sector']}" if summary.get("Sector") else None
+
+        result = {}
+        for metric, key in PEER_METRICS.items():
+            value = _metric_value(summary, key)
+            if value is None:
+                continue
+            group = None
+            for candidate in (industry, sector):
+                sketch = self._sketches.get(candidate, {}).get(metric) if candidate else None
+                if sketch and sketch["count"] >= min_peers:
+                    group = candidate
+                    break
+            if group is None:
+                continue
+            sketch = self._sketches[group][metric]
+            result[metric] = {
+                "value": value,
+                "percentile": self.percentile(group, metric, value),
+                "peer_median": round(float(sketch["quantiles"][50]), 4),
+                "peers": sketch["count"],
+                "group": group.split(":", 1)[1],
+            }
+        return result
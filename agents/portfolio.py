@@ -0,0 +1,205 @@
+import logging
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+from agents.risk import daily_returns, TRADING_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Bars of aligned returns used for the covariance estimate
+LOOKBACK = 252
+# Holdings correlated above this are flagged as redundant and clustered together
+REDUNDANT_CORRELATION = 0.8
+RISK_PARITY_ITERATIONS = 100
+RISK_PARITY_TOLERANCE = 1e-10
+
+
+def _demeaned_returns(returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(T, N) demeaned returns with missing bars set to zero, and the per-column observation counts"""
+    valid = ~np.isnan(returns)
+    count = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+    return np.where(valid, returns - mean, 0.0), count
+
+
+def shrunk_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf covariance of (T, N) daily returns, shrunk towards a scaled
+    identity. Short histories get more shrinkage, which keeps the matrix well
+    conditioned when there are fewer bars than tickers. Each pair is
+    normalised by the bars both tickers have, so gaps do not bias it towards
+    zero. Returns (cov, shrinkage).
+    """
+    x, _ = _demeaned_returns(returns)
+    valid = (~np.isnan(returns)).astype(float)
+    n = x.shape[1]
+    overlap = np.maximum(valid.T @ valid, 1.0)
+    sample = x.T @ x / overlap
+    mu = np.trace(sample) / n
+    target_distance = sample.copy()
+    target_distance[np.diag_indices(n)] -= mu
+    delta = (target_distance ** 2).sum() / n
+    # Sum over shared bars of (x_ti x_tj - S_ij)^2, without forming the (T, N, N) outer products
+    squared = x * x
+    beta = ((squared.T @ squared - overlap * sample ** 2) / overlap ** 2).sum() / n
+    shrinkage = 0.0 if delta <= 0 else float(min(max(beta, 0.0), delta) / delta)
+    covariance = (1 - shrinkage) * sample
+    covariance[np.diag_indices(n)] += shrinkage * mu
+    # Pairwise estimates need not be jointly positive semi-definite; clip any negative eigenvalues
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    if eigenvalues.min() < 0:
+        covariance = (eigenvectors * np.maximum(eigenvalues, 1e-12)) @ eigenvectors.T
+    return covariance, shrinkage
+
+
+def correlation_from_covariance(covariance: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = covariance / np.outer(std, std)
+    correlation = np.clip(np.nan_to_num(correlation), -1.0, 1.0)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation
+
+
+def cluster_holdings(correlation: np.ndarray, threshold: float = REDUNDANT_CORRELATION) -> np.ndarray:
+    """
+    Average-linkage hierarchical clustering on the correlation distance
+    sqrt((1 - rho) / 2), cut where members are correlated above `threshold`.
+    Returns a cluster label per holding.
+    """
+    from scipy.cluster.hierarchy import linkage, fcluster
+    from scipy.spatial.distance import squareform
+
+    n = correlation.shape[0]
+    if n < 2:
+        return np.ones(n, dtype=int)
+    distance = np.sqrt(np.clip((1.0 - correlation) / 2.0, 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method="average")
+    return fcluster(tree, t=np.sqrt((1.0 - threshold) / 2.0), criterion="distance")
+
+
+def min_variance_weights(covariance: np.ndarray) -> np.ndarray:
+    """Long-only minimum-variance weights: solve on the active set, dropping assets with negative weight"""
+    n = covariance.shape[0]
+    active = np.ones(n, dtype=bool)
+    weights = np.zeros(n)
+    while active.any():
+        sub = covariance[np.ix_(active, active)]
+        raw = np.linalg.solve(sub, np.ones(active.sum()))
+        if (raw >= 0).all():
+            weights[active] = raw / raw.sum()
+            return weights
+        # Drop the most negative asset and solve again
+        index = np.flatnonzero(active)[np.argmin(raw)]
+        active[index] = False
+    return np.full(n, 1.0 / n)
+
+
+def risk_parity_weights(covariance: np.ndarray) -> np.ndarray:
+    """
+    Equal-risk-contribution weights: Newton's method on the convex problem
+    min 0.5 y'Cy - sum(log y) / N, whose solution normalised to sum 1 gives
+    every holding the same share of portfolio variance.
+    """
+    n = covariance.shape[0]
+    budget = np.full(n, 1.0 / n)
+    y = 1.0 / np.sqrt(np.diag(covariance))
+    y *= np.sqrt(1.0 / (y @ covariance @ y))
+
+    def objective(v):
+        return 0.5 * v @ covariance @ v - budget @ np.log(v)
+
+    for _ in range(RISK_PARITY_ITERATIONS):
+        gradient = covariance @ y - budget / y
+        if np.abs(gradient).max() < RISK_PARITY_TOLERANCE:
+            break
+        hessian = covariance + np.diag(budget / (y * y))
+        step = np.linalg.solve(hessian, gradient)
+        # Backtrack to stay in the positive orthant and decrease the objective
+        t, current, candidate = 1.0, objective(y), None
+        while t > 1e-12:
+            trial = y - t * step
+            if (trial > 0).all() and objective(trial) <= current - 1e-4 * t * gradient @ step:
+                candidate = trial
+                break
+            t *= 0.5
+        if candidate is None:
+            # No acceptable step: keep the last feasible iterate
+            break
+        y = candidate
+
+    weights = y / y.sum()
+    if not np.isfinite(weights).all() or (weights <= 0).any():
+        logger.warning("Risk parity did not converge to positive weights; using inverse-volatility weights")
+        inverse_volatility = 1.0 / np.sqrt(np.diag(covariance))
+        return inverse_volatility / inverse_volatility.sum()
+    return weights
+
+
+def _portfolio_volatility(weights: np.ndarray, covariance: np.ndarray) -> float:
+    return float(np.sqrt(weights @ covariance @ weights * TRADING_DAYS))
+
+
+def analyze_portfolio(symbols: List[str], close: np.ndarray, lookback: int = LOOKBACK,
+                      threshold: float = REDUNDANT_CORRELATION) -> Dict[str, Any]:
+    """
+    Correlation, clusters, redundant pairs and minimum-variance / risk-parity
+    weights for an (N, T) close matrix aligned on shared dates.
+    """
+    returns = daily_returns(close)[:, -lookback:].T
+    # Tickers without enough overlapping history cannot be estimated
+    observations = (~np.isnan(returns)).sum(axis=0)
+    usable = observations >= 20
+    dropped = [s for s, ok in zip(symbols, usable) if not ok]
+    symbols = [s for s, ok in zip(symbols, usable) if ok]
+    returns = returns[:, usable]
+    if len(symbols) < 2:
+        return {"symbols": symbols, "dropped": dropped, "error": "Need at least two symbols with stored history"}
+
+    covariance, shrinkage = shrunk_covariance(returns)
+    correlation = correlation_from_covariance(covariance)
+    labels = cluster_holdings(correlation, threshold)
+
+    clusters = {}
+    for symbol, label in zip(symbols, labels):
+        clusters.setdefault(int(label), []).append(symbol)
+
+    upper = np.triu_indices(len(symbols), k=1)
+    pair_correlation = correlation[upper]
+    redundant = np.flatnonzero(pair_correlation > threshold)
+    redundant = redundant[np.argsort(-pair_correlation[redundant])]
+    redundant_pairs = [
+        {"pair": [symbols[upper[0][k]], symbols[upper[1][k]]], "correlation": round(float(pair_correlation[k]), 4)}
+        for k in redundant
+    ]
+
+    min_variance = min_variance_weights(covariance)
+    risk_parity = risk_parity_weights(covariance)
+    equal = np.full(len(symbols), 1.0 / len(symbols))
+
+    def _weights(w):
+        return {s: round(float(v), 4) for s, v in zip(symbols, w)}
+
+    return {
+        "symbols": symbols,
+        "dropped": dropped,
+        "observations": int(returns.shape[0]),
+        "shrinkage": round(shrinkage, 4),
+        "correlation": np.round(correlation, 4).tolist(),
+        "average_correlation": round(float(pair_correlation.mean()), 4),
+        # Groups of holdings that move together closely enough to be near-duplicates
+        "redundant_clusters": [members for members in clusters.values() if len(members) > 1],
+        "redundant_pairs": redundant_pairs,
+        "weights": {
+            "min_variance": _weights(min_variance),
+            "risk_parity": _weights(risk_parity),
+        },
+        "volatility": {
+            "equal_weight": round(_portfolio_volatility(equal, covariance), 4),
+            "min_variance": round(_portfolio_volatility(min_variance, covariance), 4),
+            "risk_parity": round(_portfolio_volatility(risk_parity, covariance), 4),
+        },
+    }
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import AsyncGenerator, Dict, List, Any
+from pydantic import Field
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai.types import Content, Part
+
+from agents.portfolio import analyze_portfolio
+from agents.price_store import PriceStore
+from agents.blob_store import load_state
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioAnalyticsAgent(BaseAgent):
+    """Co-movement of the requested stocks: correlation, redundant holdings and portfolio weights"""
+    price_store: PriceStore = Field(default_factory=PriceStore)
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name="PortfolioAnalyticsAgent"):
+        super().__init__(name=name)
+
+    def _symbols(self, state: Dict[str, Any]) -> List[str]:
+        insights = load_state(state, "stock_insights")
+        if isinstance(insights, dict) and insights:
+            return list(insights)
+        stocks = state.get("stocks", [])
+        return [s for s in stocks if isinstance(s, str)] if isinstance(stocks, list) else []
+
+    def _analyze(self, symbols: List[str]) -> Dict[str, Any]:
+        names, dates, prices = self.price_store.load_matrix(symbols)
+        missing = [s for s in symbols if s not in names]
+        result = analyze_portfolio(names, prices["Close"]) if names else {"symbols": [], "dropped": []}
+        result["dropped"] = missing + result.get("dropped", [])
+        result["as_of"] = dates[-1] if dates else None
+        return result
+
+    def _format_summary(self, analysis: Dict[str, Any]) -> str:
+        lines = ["📐 **PORTFOLIO ANALYTICS**", ""]
+        if analysis.get("error"):
+            lines.append(f"• {analysis['error']}")
+            return "\n".join(lines)
+        
+        lines.append(f"• **Holdings:** {', '.join(analysis['symbols'])} ({analysis['observations']} days of aligned returns)")
+        lines.append(f"• **Average Correlation:** {analysis['average_correlation']:.2f} (covariance shrinkage {analysis['shrinkage']:.0%})")
+        if analysis["redundant_pairs"]:
+            pairs = ", ".join(f"{p['pair'][0]}/{p['pair'][1]} ({p['correlation']:.2f})" for p in analysis["redundant_pairs"][:5])
+            lines.append(f"• **Redundant Holdings:** {pairs}")
+        else:
+            lines.append("• **Redundant Holdings:** None")
+        for method, label in (("min_variance", "Minimum Variance"), ("risk_parity", "Risk Parity")):
+            weights = sorted(analysis["weights"][method].items(), key=lambda kv: -kv[1])
+            shown = ", ".join(f"{s} {w:.0%}" for s, w in weights[:10])
+            lines.append(f"• **{label} Weights:** {shown} (volatility {analysis['volatility'][method]:.1%})")
+        lines.append(f"• **Equal Weight Volatility:** {analysis['volatility']['equal_weight']:.1%}")
+        if analysis.get("dropped"):
+            lines.append(f"• **Insufficient History:** {', '.join(analysis['dropped'])}")
+        return "\n".join(lines)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        # A previous request's analysis must not reach this request's report
+        ctx.session.state.pop("portfolio_analysis", None)
+        try:
+            symbols = self._symbols(ctx.session.state)
+            if len(symbols) < 2:
+                logger.info(f"[{self.name}] Fewer than two stocks; skipping portfolio analytics")
+                return
+            
+            analysis = await asyncio.to_thread(self._analyze, symbols)
+            ctx.session.state["portfolio_analysis"] = analysis
+            
+            yield Event(
+                author=self.name,
+                content=Content(parts=[Part(text=self._format_summary(analysis))])
+            )
+        except Exception as e:
+            logger.error(f"[{self.name}] Error in portfolio analytics: {e}")
+            yield Event(
+                author=self.name,
+                content=Content(parts=[Part(text=f"❌ Error in portfolio analytics: {str(e)}")])
+            )
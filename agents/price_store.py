@@ -0,0 +1,114 @@
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_DIR = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "prices")
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+class PriceStore:
+    """
+    Daily OHLCV history with one parquet file per symbol.
+
+    Every save merges the new bars into the stored history (newer bars win on
+    the same date), so repeated short downloads accumulate into a long series.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or DEFAULT_PRICE_DIR
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", symbol.upper())
+        return os.path.join(self.root, f"{safe}.parquet")
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-len(".parquet")] for name in os.listdir(self.root) if name.endswith(".parquet"))
+
+    def modified_at(self, symbol: str) -> Optional[float]:
+        """Modification time of the symbol's history file, or None without history"""
+        path = self._path(symbol)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def last_date(self, symbol: str) -> Optional[str]:
+        """Date of the most recent stored bar, or None without history"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        dates = pd.read_parquet(path, columns=["Date"])["Date"]
+        return dates.max().strftime("%Y-%m-%d") if len(dates) else None
+
+    def save(self, symbol: str, frame: pd.DataFrame) -> int:
+        """Merge a Date + OHLCV frame into the symbol's history. Returns the stored bar count."""
+        if frame is None or frame.empty:
+            return 0
+        frame = frame.loc[:, ["Date", *[f for f in FIELDS if f in frame.columns]]].copy()
+        frame["Date"] = pd.to_datetime(frame["Date"]).dt.tz_localize(None).dt.normalize()
+        frame = frame.astype({f: "float64" for f in FIELDS if f in frame.columns})
+
+        path = self._path(symbol)
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            if os.path.exists(path):
+                frame = pd.concat([pd.read_parquet(path), frame], ignore_index=True)
+            frame = frame.drop_duplicates("Date", keep="last").sort_values("Date").reset_index(drop=True)
+            tmp_path = f"{path}.tmp"
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        return len(frame)
+
+    def save_records(self, symbol: str, records: List[Dict[str, Any]]) -> int:
+        """Merge MarketDataAgent `price_data` records (keys like `Close_MSFT`) into the history"""
+        rows = []
+        for record in records or []:
+            row = {"Date": record.get("Date")}
+            for field in FIELDS:
+                row[field] = record.get(f"{field}_{symbol}", record.get(field))
+            rows.append(row)
+        return self.save(symbol, pd.DataFrame(rows))
+
+    def load(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Stored history for one symbol, optionally clipped to [start, end]"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["Date", *FIELDS])
+        frame = pd.read_parquet(path)
+        if start is not None:
+            frame = frame[frame["Date"] >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame["Date"] <= pd.Timestamp(end)]
+        return frame.reset_index(drop=True)
+
+    def load_matrix(self, symbols: Optional[List[str]] = None, start: Optional[str] = None,
+                    end: Optional[str] = None) -> Tuple[List[str], List[str], Dict[str, np.ndarray]]:
+        """
+        Align the stored histories on a shared date axis, in the same
+        (symbols, dates, {field: (N, T) array}) layout as indicators.build_price_matrix.
+        """
+        frames = {}
+        for symbol in symbols or self.symbols():
+            frame = self.load(symbol, start, end)
+            if not frame.empty:
+                frames[symbol] = frame.set_index("Date")
+
+        if not frames:
+            return [], [], {field: np.empty((0, 0)) for field in FIELDS}
+
+        panel = pd.concat(frames, axis=1).sort_index()
+        names = list(frames)
+        matrix = {
+            field: np.ascontiguousarray(panel.xs(field, axis=1, level=1).reindex(columns=names).to_numpy(dtype=float).T)
+            for field in FIELDS
+        }
+        dates = [d.strftime("%Y-%m-%d") for d in panel.index]
+        return names, dates, matrix
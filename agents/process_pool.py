@@ -0,0 +1,22 @@
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+# Imported once by the fork server, so pool workers start with the package loaded
+PRELOAD = ["agents"]
+
+
+def worker_context() -> BaseContext:
+    """
+    Start method for the agents' process pools. Workers fork from a
+    single-threaded fork server that has already imported the package: not
+    from the agent process, which runs store threads and holds locks and
+    SQLite connections, and not from a fresh interpreter, which would import
+    the whole package again in every worker. Falls back to spawn where there
+    is no fork server.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # Only takes effect before the server starts; later calls are no-ops
+    context.set_forkserver_preload(PRELOAD)
+    return context
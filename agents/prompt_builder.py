@@ -0,0 +1,287 @@
+import os
+import re
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("REPORT_PROMPT_TOKEN_BUDGET", "12000"))
+DEFAULT_HEADLINES_PER_STOCK = 5
+# Rough English/number mix for Gemini's tokenizer; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Degradation steps tried in order until the prompt fits: (headlines per stock, compact insights)
+_LEVELS = ((None, False), (3, False), (1, False), (1, True), (0, True))
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _fmt(value: Any, spec: str = ".2f") -> str:
+    if isinstance(value, bool) or value is None:
+        return "-"
+    if isinstance(value, (int, float)):
+        if value != value:
+            return "-"
+        return format(value, spec)
+    return str(value)
+
+
+def _big(value: Any) -> str:
+    """Large USD amounts as 1.23T / 456.7B / 12.3M"""
+    if not isinstance(value, (int, float)) or value != value:
+        return "-"
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(value) >= threshold:
+            return f"{value / threshold:.2f}{suffix}"
+    return f"{value:,.0f}"
+
+
+def _table(header: List[str], rows: Iterable[List[str]]) -> str:
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def iter_market(market_data: Any) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """(symbol, data) pairs from MarketDataAgent output, a list of {symbol: data} or one dict"""
+    entries = market_data if isinstance(market_data, list) else [market_data or {}]
+    for entry in entries:
+        if isinstance(entry, dict):
+            for symbol, data in entry.items():
+                if isinstance(data, dict):
+                    yield symbol, data
+
+
+def _return(closes: List[float], bars: int) -> Optional[float]:
+    if len(closes) <= bars or not closes[-bars - 1]:
+        return None
+    return (closes[-1] / closes[-bars - 1] - 1) * 100
+
+
+def market_section(market_data: Any) -> str:
+    """One row of price statistics and fundamentals per symbol, instead of every raw OHLCV record"""
+    header = ["Symbol", "Sector", "Close", "1D%", "5D%", "1M%", "3M%", "52W High", "52W Low", "50D Avg",
+              "Avg Vol 20D", "Mkt Cap", "P/E", "Fwd P/E", "EPS", "P/B", "Div Yld", "Beta"]
+    rows, errors = [], []
+    for symbol, data in iter_market(market_data):
+        if "error" in data:
+            errors.append(f"{symbol}: {data['error']}")
+            continue
+        summary = data.get("summary", {})
+        records = data.get("price_data", [])
+        closes = [r.get(f"Close_{symbol}") for r in records]
+        closes = [c for c in closes if isinstance(c, (int, float)) and c == c]
+        volumes = [r.get(f"Volume_{symbol}") for r in records[-20:]]
+        volumes = [v for v in volumes if isinstance(v, (int, float)) and v == v]
+        rows.append([
+            symbol,
+            _fmt(summary.get("Sector")),
+            _fmt(closes[-1] if closes else summary.get("Open")),
+            _fmt(_return(closes, 1), "+.2f"),
+            _fmt(_return(closes, 5), "+.2f"),
+            _fmt(_return(closes, 21), "+.2f"),
+            _fmt(_return(closes, 63), "+.2f"),
+            _fmt(summary.get("52W High")),
+            _fmt(summary.get("52W Low")),
+            _fmt(summary.get("50D Avg")),
+            _big(sum(volumes) / len(volumes) if volumes else summary.get("Volume")),
+            _big(summary.get("Market Cap (USD)")),
+            _fmt(summary.get("P/E Ratio (TTM)")),
+            _fmt(summary.get("Forward P/E")),
+            _fmt(summary.get("EPS (TTM)")),
+            _fmt(summary.get("P/B Ratio")),
+            _fmt(summary.get("Dividend Yield")),
+            _fmt(summary.get("Beta")),
+        ])
+    text = _table(header, rows) if rows else "No market data."
+    if errors:
+        text += "\nUnavailable: " + "; ".join(errors)
+    return text
+
+
+def _insight_lines(symbol: str, insight: Dict[str, Any], compact: bool) -> List[str]:
+    technical = insight.get("technical_analysis", {})
+    fundamental = insight.get("fundamental_analysis", {})
+    news = insight.get("news_analysis", {})
+    rec = insight.get("recommendations", {})
+    indicators = technical.get("indicators") or {}
+
+    lines = [
+        f"{symbol}: {rec.get('overall_action', 'HOLD')} {_fmt(rec.get('overall_score'))}/5 "
+        f"(technical {_fmt(rec.get('technical_score'), '')}, fundamental {_fmt(rec.get('fundamental_score'), '')}, "
+        f"news {_fmt(rec.get('news_score'), '')})",
+        f"  technical: momentum {technical.get('momentum', '-')} ({_fmt(technical.get('price_change_percent'), '+.2f')}%), "
+        f"trend {technical.get('trend', '-')}, volume {technical.get('volume_signal', '-')} "
+        f"({_fmt(technical.get('volume_ratio'))}x), support {_fmt(technical.get('support_level'))}, "
+        f"resistance {_fmt(technical.get('resistance_level'))}",
+        f"  fundamental: {fundamental.get('valuation', '-')} (P/E {_fmt(fundamental.get('pe_ratio'))}), "
+        f"growth {fundamental.get('growth_outlook', '-')}, {fundamental.get('risk_level', '-')} "
+        f"(beta {_fmt(fundamental.get('beta'))}), {fundamental.get('size_category', '-')}, "
+        f"{fundamental.get('dividend_rating', '-')}",
+        f"  news: {news.get('sentiment', '-')}, model {_fmt(news.get('model_score'), '+.2f')} "
+        f"(confidence {_fmt(news.get('model_confidence'), '.0%')}), {news.get('total_articles', 0)} articles, "
+        f"themes {', '.join(news.get('key_themes', [])) or '-'}",
+    ]
+    if compact:
+        return lines
+
+    lines.append(
+        f"  indicators: RSI {_fmt(indicators.get('rsi_14'), '.1f')} ({technical.get('rsi_signal', '-')}), "
+        f"MACD {technical.get('macd_trend', '-')}, MA alignment {technical.get('ma_alignment', '-')}, "
+        f"SMA20/50/200 {_fmt(indicators.get('sma_20'))}/{_fmt(indicators.get('sma_50'))}/{_fmt(indicators.get('sma_200'))}, "
+        f"ATR14 {_fmt(indicators.get('atr_14'))}"
+    )
+    peers = fundamental.get("peer_percentiles") or {}
+    if peers:
+        lines.append("  peers: " + ", ".join(
+            f"{metric} p{_fmt(p.get('percentile'), '.0f')} (median {_fmt(p.get('peer_median'))}, {p.get('peers')} {p.get('group')})"
+            for metric, p in peers.items()))
+    risk = fundamental.get("risk_metrics") or {}
+    if risk.get("volatility") is not None:
+        lines.append(
+            f"  risk: vol {_fmt(risk.get('volatility'), '.1%')}, VaR95 {_fmt(risk.get('var_historical'), '.1%')}, "
+            f"CVaR95 {_fmt(risk.get('cvar_historical'), '.1%')}, max drawdown {_fmt(risk.get('max_drawdown'), '.1%')}, "
+            f"realised beta {_fmt(risk.get('beta'))}"
+        )
+    trend = news.get("sentiment_trend") or {}
+    if trend:
+        lines.append(f"  sentiment trend: 7D {_fmt(trend.get('mean_7d'), '+.2f')}, 30D {_fmt(trend.get('mean_30d'), '+.2f')}, "
+                     f"velocity {_fmt(trend.get('velocity_ratio'))}x")
+    signal = rec.get("model_signal")
+    if signal:
+        lines.append(f"  model signal: {signal.get('signal')} ({_fmt(signal.get('confidence'), '.0%')})")
+    for investor, advice in (rec.get("recommendations") or {}).items():
+        lines.append(f"  {investor}: {advice.get('action')} - {advice.get('rationale')}")
+    return lines
+
+
+def insights_section(insights: Any, rankings: Optional[Dict[str, Any]] = None, compact: bool = False) -> str:
+    """AnalyticsAgent's computed insights, a few lines per symbol"""
+    if not isinstance(insights, dict) or not insights:
+        return "No computed insights."
+    # A single pre-`stock_insights` analysis dict is one symbol's insight
+    if "recommendations" in insights:
+        insights = {insights.get("symbol", "Stock"): insights}
+
+    lines = []
+    for symbol, insight in insights.items():
+        if isinstance(insight, dict):
+            lines.extend(_insight_lines(symbol, insight, compact))
+    if rankings and rankings.get("table"):
+        lines.append("cross-sectional rank: " + ", ".join(
+            f"#{row['rank']} {row['symbol']} ({row['sector']} #{row['sector_rank']}/{row['sector_size']})"
+            for row in rankings["table"]))
+    return "\n".join(lines)
+
+
+def _normalise_title(title: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", (title or "").lower()).strip()
+
+
+def headlines_section(news_data: Any, per_stock: int = DEFAULT_HEADLINES_PER_STOCK) -> str:
+    """Top-k headlines per stock, most widely reported and then most recent first"""
+    if per_stock <= 0:
+        return "Headlines omitted to fit the token budget; see the sentiment figures in the insights."
+    lines, seen = [], set()
+    for entry in news_data if isinstance(news_data, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        symbol = entry.get("symbol") or entry.get("stock", "?")
+        articles = sorted(
+            (a for a in entry.get("articles", []) if isinstance(a, dict) and a.get("title")),
+            key=lambda a: (a.get("duplicate_count", 0), a.get("publishedAt") or ""),
+            reverse=True,
+        )
+        shown = 0
+        for article in articles:
+            key = _normalise_title(article["title"])
+            if key in seen:
+                continue
+            seen.add(key)
+            similar = f", +{article['duplicate_count']} similar" if article.get("duplicate_count") else ""
+            lines.append(f"- [{symbol}] {article['title']} ({article.get('source') or '-'}, "
+                         f"{(article.get('publishedAt') or '-')[:10]}{similar})")
+            shown += 1
+            if shown >= per_stock:
+                break
+    return "\n".join(lines) or "No recent headlines."
+
+
+def portfolio_section(portfolio: Optional[Dict[str, Any]]) -> str:
+    if not portfolio or portfolio.get("error") or not portfolio.get("weights"):
+        return ""
+    lines = [
+        f"average correlation {_fmt(portfolio.get('average_correlation'))}, shrinkage {_fmt(portfolio.get('shrinkage'))}",
+        "redundant pairs: " + (", ".join(f"{'/'.join(p['pair'])} {_fmt(p['correlation'])}"
+                                        for p in portfolio.get("redundant_pairs", [])[:10]) or "none"),
+    ]
+    for method, weights in portfolio["weights"].items():
+        lines.append(f"{method} weights: " + ", ".join(f"{s} {w:.0%}" for s, w in weights.items())
+                     + f" (vol {_fmt(portfolio.get('volatility', {}).get(method), '.1%')})")
+    return "\n".join(lines)
+
+
+class PromptBuilder:
+    """
+    Compact, token-budgeted data sections for the report prompt.
+
+    Market data becomes one statistics row per symbol, news becomes the top-k
+    deduplicated headlines, and the computed insights a few lines per symbol.
+    When the prompt would exceed the budget, headlines are cut first, then the
+    insight detail; `build` reports the estimated tokens of every section.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, headlines_per_stock: int = DEFAULT_HEADLINES_PER_STOCK):
+        self.token_budget = token_budget
+        self.headlines_per_stock = headlines_per_stock
+
+    def sections(self, data: Dict[str, Any], headlines_per_stock: int, compact: bool) -> Dict[str, str]:
+        sections = {
+            "market_data": market_section(data.get("market_data")),
+            "insights": insights_section(data.get("analysis_data"), data.get("rankings"), compact),
+            "headlines": headlines_section(data.get("news_data"), headlines_per_stock),
+        }
+        portfolio = portfolio_section(data.get("portfolio_data"))
+        if portfolio:
+            sections["portfolio"] = portfolio
+        return sections
+
+    def build(self, data: Dict[str, Any], template: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fill `template` (with {market_data}, {insights}, {headlines} and
+        {portfolio} placeholders) within the token budget. Returns (prompt, stats).
+        """
+        fixed = estimate_tokens(template.format(market_data="", insights="", headlines="", portfolio=""))
+        for headlines, compact in _LEVELS:
+            per_stock = self.headlines_per_stock if headlines is None else min(headlines, self.headlines_per_stock)
+            sections = self.sections(data, per_stock, compact)
+            tokens = {name: estimate_tokens(text) for name, text in sections.items()}
+            if fixed + sum(tokens.values()) <= self.token_budget:
+                break
+
+        total = fixed + sum(tokens.values())
+        truncated = total > self.token_budget
+        if truncated:
+            # Last resort: cut the largest section down to what is left of the budget
+            largest = max(tokens, key=tokens.get)
+            allowed = max(self.token_budget - (total - tokens[largest]), 0) * CHARS_PER_TOKEN
+            sections[largest] = sections[largest][:allowed].rsplit("\n", 1)[0] + "\n[truncated to fit the token budget]"
+            tokens[largest] = estimate_tokens(sections[largest])
+
+        prompt = template.format(
+            market_data=sections["market_data"],
+            insights=sections["insights"],
+            headlines=sections["headlines"],
+            portfolio=sections.get("portfolio", "Single stock - not applicable"),
+        )
+        stats = {
+            "budget": self.token_budget,
+            "total_tokens": estimate_tokens(prompt),
+            "section_tokens": {"instructions": fixed, **tokens},
+            "headlines_per_stock": per_stock,
+            "compact_insights": compact,
+            "truncated": truncated,
+        }
+        return prompt, stats
@@ -1,7 +1,9 @@
 import os
-import json
+import time
+import asyncio
 import logging
 import aiohttp
+from contextlib import aclosing
 from datetime import datetime
 from dotenv import load_dotenv
 from pydantic import Field
@@ -10,21 +12,116 @@ from google.genai.types import Content, Part
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
-import google.generativeai as genai
 
-# PDF generation imports
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER, TA_LEFT
-from reportlab.lib.colors import black, blue, red
-from io import BytesIO
-import base64
+from agents.prompt_builder import PromptBuilder, market_section, DEFAULT_TOKEN_BUDGET, DEFAULT_HEADLINES_PER_STOCK
+from agents.llm_cache import LLMCache, get_default_cache, cache_key, SKIP_CACHE_STATE_KEY
+from agents.report_sections import SectionStore, section_fingerprints, report_key
+from agents.pdf_renderer import PdfRenderer, parse_report_sections, is_section_header
+from agents.blob_store import offload, load_state
+from agents.artifact_store import ArtifactStore
+from agents.charts import ChartRenderer
+from agents.gemini_client import GeminiClient, get_default_client, BATCH
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Sections of the report in order: (title, length, points to cover)
+REPORT_SECTIONS = [
+    ("EXECUTIVE SUMMARY", "3-4 paragraphs", [
+        "Overall investment thesis and key findings",
+        "Market positioning and competitive landscape",
+        "Primary risks and opportunities",
+        "Clear investment recommendation with rationale",
+    ]),
+    ("MARKET OVERVIEW & SECTOR ANALYSIS", "4-5 paragraphs", [
+        "Current market conditions and trends",
+        "Sector performance and outlook",
+        "Macroeconomic factors impacting the stocks",
+        "Comparative analysis within sector",
+    ]),
+    ("INDIVIDUAL STOCK ANALYSIS", "For each stock, 5-6 paragraphs", [
+        "Company fundamentals and business model",
+        "Financial performance and key metrics",
+        "Technical analysis and price action",
+        "News sentiment and market perception",
+        "Valuation assessment and peer comparison",
+        "Specific investment recommendation",
+    ]),
+    ("TECHNICAL ANALYSIS DEEP DIVE", "4-5 paragraphs", [
+        "Chart patterns and technical indicators",
+        "Support and resistance levels",
+        "Volume analysis and momentum indicators",
+        "Multi-timeframe analysis",
+        "Entry and exit strategies",
+    ]),
+    ("FUNDAMENTAL VALUATION ANALYSIS", "4-5 paragraphs", [
+        "P/E ratio analysis and industry comparison",
+        "Growth prospects and earnings forecasts",
+        "Dividend analysis and shareholder returns",
+        "Balance sheet strength and financial health",
+        "Intrinsic value estimation",
+    ]),
+    ("NEWS IMPACT & MARKET SENTIMENT", "3-4 paragraphs", [
+        "Recent news analysis and market impact",
+        "Sentiment trends and social media buzz",
+        "Analyst recommendations and upgrades/downgrades",
+        "Potential catalysts and upcoming events",
+    ]),
+    ("RISK ASSESSMENT & MANAGEMENT", "3-4 paragraphs", [
+        "Key risk factors and mitigation strategies",
+        "Market risks and volatility analysis",
+        "Company-specific risks and challenges",
+        "Risk-adjusted return expectations",
+    ]),
+    ("INVESTMENT STRATEGY & RECOMMENDATIONS", "4-5 paragraphs", [
+        "Portfolio allocation recommendations",
+        "Entry and exit strategies for different investor profiles",
+        "Time horizon considerations",
+        "Hedging strategies and risk management",
+    ]),
+    ("FORWARD-LOOKING ANALYSIS", "3-4 paragraphs", [
+        "Growth catalysts and expansion opportunities",
+        "Industry trends and technological disruptions",
+        "Long-term outlook and sustainability",
+        "Potential challenges and competitive threats",
+    ]),
+    ("CONCLUSION & ACTION ITEMS", "2-3 paragraphs", [
+        "Summary of key investment themes",
+        "Prioritized action items for investors",
+        "Next steps and monitoring criteria",
+    ]),
+]
+# Written last, from the other sections' text, when sections are generated in parallel
+SYNTHESIS_SECTIONS = ("EXECUTIVE SUMMARY", "CONCLUSION & ACTION ITEMS")
+
+# Ends a streamed report whose generation failed or stalled part way
+TRUNCATION_NOTICE = ("**Note:** Report generation was interrupted, so this report is incomplete. "
+                     "Sections after this point are missing.")
+
+
+async def _replay(text: str) -> AsyncGenerator[str, None]:
+    """A cached response as a one-chunk stream"""
+    yield text
+
+
+async def _close_stream(source) -> None:
+    """
+    Close an async stream. A google.generativeai streaming response keeps
+    the transport's iterator in `_iterator`; closing or cancelling that ends
+    the request.
+    """
+    for target in (source, getattr(source, "_iterator", None)):
+        if target is None:
+            continue
+        try:
+            if hasattr(target, "aclose"):
+                await target.aclose()
+            elif callable(getattr(target, "cancel", None)):
+                target.cancel()
+        except Exception as e:
+            logger.debug(f"Error closing report stream: {str(e)}")
+
+
 class ReportGeneratorAgent(BaseAgent):
     """
     Final agent that generates comprehensive PDF-ready reports from stock analysis data
@@ -33,6 +130,30 @@ class ReportGeneratorAgent(BaseAgent):
     
     gemini_api_key: str = os.getenv("GOOGLE_API_KEY", "")
     model_name: str = Field(default="gemini-1.5-flash")
+    # Shared across agents: one configured SDK and the per-model requests/tokens-per-minute scheduler
+    gemini_client: GeminiClient = Field(default_factory=get_default_client)
+    # Estimated-token ceiling for the prompt; headlines and insight detail are cut to fit
+    prompt_token_budget: int = Field(default=DEFAULT_TOKEN_BUDGET)
+    headlines_per_stock: int = Field(default=DEFAULT_HEADLINES_PER_STOCK)
+    # Seconds to wait for the next streamed chunk before giving up on the generation
+    stream_idle_timeout: float = Field(default=float(os.getenv("REPORT_STREAM_IDLE_TIMEOUT", "60")))
+    # Generate the sections as separate concurrent calls instead of one long streamed report
+    parallel_sections: bool = Field(default=os.getenv("REPORT_PARALLEL_SECTIONS", "0") == "1")
+    section_concurrency: int = Field(default=int(os.getenv("REPORT_SECTION_CONCURRENCY", "4")))
+    section_retries: int = Field(default=2)
+    # Responses for identical prompts are reused; `skip_llm_cache` in session state opts a run out
+    llm_cache: LLMCache = Field(default_factory=get_default_cache)
+    use_llm_cache: bool = Field(default=True)
+    # In section mode, sections whose input fingerprints are unchanged since the last report are reused
+    section_store: SectionStore = Field(default_factory=SectionStore)
+    incremental_sections: bool = Field(default=True)
+    pdf_renderer: PdfRenderer = Field(default_factory=PdfRenderer)
+    # Per-ticker price/volume/RSI charts for the PDF, cached by symbol, last bar and chart spec
+    chart_renderer: ChartRenderer = Field(default_factory=ChartRenderer)
+    include_charts: bool = Field(default=os.getenv("REPORT_CHARTS", "1") == "1")
+    # Report files are deduplicated, sharded by date and hash, and evicted by size and age
+    artifact_store: ArtifactStore = Field(default_factory=ArtifactStore)
+    model_config = {"arbitrary_types_allowed": True}
     
     def __init__(self, name="ReportGeneratorAgent"):
         super().__init__(name=name)
@@ -40,9 +161,11 @@ class ReportGeneratorAgent(BaseAgent):
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         try:
             # Get analysis data from session state
-            analysis_data = ctx.session.state.get("stock_analysis", {})
-            news_data = ctx.session.state.get("news_analysis", [])
-            market_data = ctx.session.state.get("market_data", {})
+            analysis_data = load_state(ctx.session.state, "stock_insights") or load_state(ctx.session.state, "stock_analysis", {})
+            news_data = load_state(ctx.session.state, "news_analysis", [])
+            market_data = load_state(ctx.session.state, "market_data", {})
+            portfolio_data = load_state(ctx.session.state, "portfolio_analysis")
+            rankings = ctx.session.state.get("stock_rankings")
             
             logger.info(f"[{self.name}] Retrieved analysis data for report generation")
             
@@ -60,29 +183,52 @@ class ReportGeneratorAgent(BaseAgent):
                 )
                 return
                 
-            # Configure Gemini
-            genai.configure(api_key=self.gemini_api_key)
-            model = genai.GenerativeModel(self.model_name)
+            # Report calls queue behind interactive extraction calls for the same quota
+            model = self.gemini_client.model(self.model_name, api_key=self.gemini_api_key, priority=BATCH)
             
             # Parse and structure the analysis data
-            structured_data = self._structure_analysis_data(analysis_data, news_data, market_data)
+            structured_data = self._structure_analysis_data(analysis_data, news_data, market_data, portfolio_data, rankings)
+            structured_data["use_llm_cache"] = self.use_llm_cache and not ctx.session.state.get(SKIP_CACHE_STATE_KEY)
             
-            # Generate comprehensive report
-            report_content = await self._generate_comprehensive_report(model, structured_data)
+            # Charts only need market data, so they render while the report is generated
+            charts_task = asyncio.create_task(self._render_charts(market_data))
+            
+            # Stream the report, surfacing each section as soon as it is complete
+            report_content = ""
+            generation = (self._generate_sections(model, structured_data) if self.parallel_sections
+                          else self._stream_report(model, structured_data))
+            try:
+                async with aclosing(generation) as stream:
+                    async for section_title, section_text, report_content in stream:
+                        if section_title:
+                            yield Event(
+                                author=self.name,
+                                partial=True,
+                                content=Content(parts=[Part(text=f"{section_title}\n{section_text}")])
+                            )
+            except BaseException:
+                charts_task.cancel()
+                raise
+            structured_data["charts"] = await charts_task
             
             # Format the report for PDF generation
             formatted_report = self._format_report_for_pdf(report_content, structured_data)
             
             # Generate PDF
-            pdf_path, pdf_base64 = await self._generate_pdf_report(formatted_report, structured_data)
+            pdf_path, pdf_name = await self._generate_pdf_report(formatted_report, structured_data)
             
-            # Store the generated report in session state
+            # Store the generated report in session state; the text goes to the blob store and
+            # the PDF is referenced by its name in the artifact store (`artifact_store.read(name)`)
             ctx.session.state["generated_report"] = {
-                "content": formatted_report,
+                "content": offload(formatted_report),
                 "pdf_path": pdf_path,
-                "pdf_base64": pdf_base64,
+                "pdf_artifact": pdf_name,
                 "generated_at": datetime.now().isoformat(),
-                "report_type": "comprehensive_analysis"
+                "report_type": "comprehensive_analysis",
+                "prompt_stats": structured_data.get("prompt_stats"),
+                "generation_stats": structured_data.get("generation_stats"),
+                "llm_cache": self.llm_cache.stats(),
+                "llm_scheduler": self.gemini_client.scheduler.stats().get(self.model_name)
             }
             
             # Save text report to file
@@ -106,7 +252,8 @@ class ReportGeneratorAgent(BaseAgent):
                 content=Content(parts=[Part(text=f"Error generating report: {str(e)}")])
             )
     
-    def _structure_analysis_data(self, analysis_data: Dict, news_data: List, market_data: Dict) -> Dict[str, Any]:
+    def _structure_analysis_data(self, analysis_data: Dict, news_data: List, market_data: Dict, portfolio_data: Dict = None,
+                                 rankings: Dict = None) -> Dict[str, Any]:
         """Structure and combine all analysis data for report generation"""
         
         # Extract stock symbols from various sources
@@ -124,18 +271,24 @@ class ReportGeneratorAgent(BaseAgent):
         # Add stocks from news data
         for news_item in news_data:
             if isinstance(news_item, dict) and 'stock' in news_item:
-                if news_item['stock'] not in stocks:
-                    stocks.append(news_item['stock'])
+                news_stock = news_item.get('symbol') or news_item['stock']
+                if news_stock not in stocks:
+                    stocks.append(news_stock)
         
         # Add stocks from market data
         if isinstance(market_data, dict):
             stocks.extend([k for k in market_data.keys() if k not in stocks])
+        elif isinstance(market_data, list):
+            stocks.extend([k for entry in market_data if isinstance(entry, dict) for k in entry if k not in stocks])
         
         structured = {
             "stocks": stocks,
             "analysis_data": analysis_data,
             "news_data": news_data,
             "market_data": market_data,
+            # The full correlation matrix is left out of the prompt; pairs and clusters carry the signal
+            "portfolio_data": {k: v for k, v in (portfolio_data or {}).items() if k != "correlation"},
+            "rankings": rankings,
             "report_metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "analysis_date": datetime.now().strftime('%Y-%m-%d'),
@@ -145,24 +298,228 @@ class ReportGeneratorAgent(BaseAgent):
         
         return structured
     
-    async def _generate_comprehensive_report(self, model, structured_data: Dict[str, Any]) -> str:
-        """Generate comprehensive report using Gemini AI"""
+    async def _stream_report(self, model, structured_data: Dict[str, Any]) -> AsyncGenerator[tuple, None]:
+        """
+        Stream the report from Gemini without blocking the event loop. Yields
+        (section_title, section_text, report_so_far) whenever a section is
+        complete; the last item carries the full report. Closing the generator
+        cancels the underlying request. A stream that fails or stalls part way
+        ends with a truncation notice and `truncated` set in the stats.
+        """
         
         prompt = self._create_report_prompt(structured_data)
-        
+        stats = {"mode": "stream", "time_to_first_token_ms": None, "total_ms": None, "chunks": 0, "sections": 0,
+                 "status": "streaming"}
+        structured_data["generation_stats"] = stats
+        started = time.perf_counter()
+        report, pending_line = "", ""
+        section_title, section_start = None, 0
+        
+        key = cache_key(self.model_name, prompt)
+        cached = self.llm_cache.get(key) if structured_data.get("use_llm_cache", True) else None
+        stats["cached"] = cached is not None
+        
+        response = stream = chunks = None
         try:
-            response = model.generate_content(prompt)
-            return response.text
+            if cached is not None:
+                chunks = _replay(cached)
+            else:
+                response = await model.generate_content_async(prompt, stream=True)
+                stream = response.__aiter__()
+                chunks = (chunk.text async for chunk in stream)
+            while True:
+                try:
+                    piece = await asyncio.wait_for(chunks.__anext__(), self.stream_idle_timeout)
+                except StopAsyncIteration:
+                    break
+                if not piece:
+                    continue
+                if stats["time_to_first_token_ms"] is None:
+                    stats["time_to_first_token_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    logger.info(f"[{self.name}] First report tokens after {stats['time_to_first_token_ms']} ms")
+                stats["chunks"] += 1
+                
+                # A new section header closes the previous section
+                position = len(report) - len(pending_line)
+                report += piece
+                lines = (pending_line + piece).split("\n")
+                pending_line = lines.pop()
+                for line in lines:
+                    title = line.replace("*", "").strip("# \t")
+                    if self._is_section_header(title):
+                        if section_title:
+                            stats["sections"] += 1
+                            yield section_title, report[section_start:position].strip(), report[:position]
+                        section_title, section_start = title, position + len(line) + 1
+                    position += len(line) + 1
+            
+            stats["status"] = "complete"
+            if cached is None:
+                self.llm_cache.put(key, self.model_name, report)
+        except asyncio.TimeoutError:
+            logger.error(f"[{self.name}] Report stream stalled for {self.stream_idle_timeout}s; keeping the partial report")
+            stats["status"] = "timeout"
+        except (asyncio.CancelledError, GeneratorExit):
+            stats["status"] = "cancelled"
+            logger.info(f"[{self.name}] Report generation cancelled after {stats['chunks']} chunks")
+            raise
         except Exception as e:
             logger.error(f"[{self.name}] Error generating report with Gemini: {str(e)}")
-            return self._generate_fallback_report(structured_data)
+            stats["status"] = "error"
+        finally:
+            # Innermost first, so the request underneath is cancelled rather than left streaming
+            for source in (chunks, stream, response):
+                await _close_stream(source)
+            stats["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        
+        if not report.strip():
+            yield None, "", self._generate_fallback_report(structured_data)
+            return
+        if stats["status"] != "complete":
+            stats["truncated"] = True
+            report = report.rstrip() + f"\n\n{TRUNCATION_NOTICE}\n"
+        stats["sections"] += 1 if section_title else 0
+        yield section_title, report[section_start:].strip(), report
     
-    def _create_report_prompt(self, data: Dict[str, Any]) -> str:
-        """Create comprehensive prompt for Gemini AI"""
+    async def _generate_sections(self, model, structured_data: Dict[str, Any]) -> AsyncGenerator[tuple, None]:
+        """
+        Generate the report one section per call, at most `section_concurrency`
+        at a time. The executive summary and conclusion are written last from
+        the other sections. Sections whose inputs have the same fingerprint as
+        in the last report for these stocks are reused instead of regenerated.
+        Yields (section_title, section_text, report_so_far) as sections finish;
+        the last item carries the assembled report.
+        """
         
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        timings, results = {}, {}
+        structured_data["generation_stats"] = {
+            "mode": "sections", "concurrency": self.section_concurrency, "total_ms": None, "sections": timings
+        }
+        key = report_key(structured_data["stocks"])
+        fingerprints = section_fingerprints(structured_data, [section[0] for section in REPORT_SECTIONS])
+        incremental = self.incremental_sections and structured_data.get("use_llm_cache", True)
+        previous = self.section_store.get(key) if incremental else {}
+        body = [i for i, section in enumerate(REPORT_SECTIONS) if section[0] not in SYNTHESIS_SECTIONS]
+        synthesis = [i for i, section in enumerate(REPORT_SECTIONS) if section[0] in SYNTHESIS_SECTIONS]
+        
+        tasks = []
+        try:
+            for indices, written in ((body, ""), (synthesis, None)):
+                if written is None:
+                    written = self._assemble_sections(results)
+                stale = []
+                for i in indices:
+                    title = REPORT_SECTIONS[i][0]
+                    stored = previous.get(title)
+                    if stored and stored.get("fingerprint") == fingerprints[title]:
+                        results[i] = stored["text"]
+                        timings[title] = {"ms": 0.0, "attempts": 0, "status": "reused"}
+                        yield title, stored["text"], self._assemble_sections(results)
+                    else:
+                        stale.append(i)
+                tasks = [asyncio.create_task(self._generate_section(model, structured_data, i, semaphore, written))
+                         for i in stale]
+                for next_done in asyncio.as_completed(tasks):
+                    index, text, timing = await next_done
+                    results[index] = text
+                    timings[REPORT_SECTIONS[index][0]] = timing
+                    yield REPORT_SECTIONS[index][0], text, self._assemble_sections(results)
+        finally:
+            for task in tasks:
+                task.cancel()
+            structured_data["generation_stats"]["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        
+        statuses = [timing["status"] for timing in timings.values()]
+        structured_data["generation_stats"]["reused"] = statuses.count("reused")
+        structured_data["generation_stats"]["regenerated"] = len(statuses) - statuses.count("reused")
+        logger.info(f"[{self.name}] Generated {len(results)} sections ({statuses.count('reused')} reused) in "
+                    f"{structured_data['generation_stats']['total_ms']} ms: "
+                    f"{ {title: t['ms'] for title, t in timings.items()} }")
+        
+        # Failed sections are left out so they are retried next time, and so are summaries written around them
+        complete = "error" not in statuses
+        self.section_store.put(key, {
+            REPORT_SECTIONS[i][0]: {"fingerprint": fingerprints[REPORT_SECTIONS[i][0]], "text": text}
+            for i, text in results.items()
+            if timings[REPORT_SECTIONS[i][0]]["status"] != "error" and (complete or i in body)
+        })
+        yield None, "", self._assemble_sections(results)
+    
+    async def _generate_section(self, model, data: Dict[str, Any], index: int, semaphore: asyncio.Semaphore,
+                                written: str = "") -> tuple:
+        """One section-scoped call with retries. Returns (index, text, timing)."""
+        
+        title = REPORT_SECTIONS[index][0]
+        requirements = "**Report Requirements:**\n        Write only the following section of the report:\n        \n" + \
+            self._format_section_requirement(index)
+        if written:
+            requirements += f"        **Sections already written (base this section on them):**\n{written}\n        \n"
+        prompt = self._create_report_prompt(data, requirements)
+        
+        timing = {"ms": None, "attempts": 0, "status": "error"}
+        key = cache_key(self.model_name, prompt)
+        cached = self.llm_cache.get(key) if data.get("use_llm_cache", True) else None
+        if cached is not None:
+            timing.update(ms=0.0, status="cached")
+            return index, self._strip_section_heading(cached, title), timing
+        
+        text = ""
+        started = time.perf_counter()
+        for attempt in range(self.section_retries + 1):
+            timing["attempts"] = attempt + 1
+            try:
+                async with semaphore:
+                    response = await asyncio.wait_for(model.generate_content_async(prompt), self.stream_idle_timeout)
+                text = self._strip_section_heading(response.text, title)
+                self.llm_cache.put(key, self.model_name, response.text)
+                timing["status"] = "ok"
+                break
+            except Exception as e:
+                logger.warning(f"[{self.name}] Section '{title}' attempt {attempt + 1} failed: {str(e)}")
+                # Back off outside the semaphore so other sections keep the slot busy
+                if attempt < self.section_retries:
+                    await asyncio.sleep(2 ** attempt)
+        timing["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        
+        if not text:
+            logger.error(f"[{self.name}] Giving up on section '{title}' after {timing['attempts']} attempts")
+            text = "This section could not be generated. Refer to the other sections of the report."
+        return index, text, timing
+    
+    def _strip_section_heading(self, text: str, title: str) -> str:
+        """Drop the heading the model may repeat; the assembled report adds its own"""
+        
+        lines = text.strip().split("\n")
+        first = lines[0].replace("*", "").strip("# \t")
+        if self._is_section_header(first) and title in first.upper():
+            lines = lines[1:]
+        return "\n".join(lines).strip()
+    
+    def _assemble_sections(self, results: Dict[int, str]) -> str:
+        return "\n\n".join(f"{i + 1}. {REPORT_SECTIONS[i][0]}\n\n{results[i]}" for i in sorted(results))
+    
+    def _format_section_requirement(self, index: int) -> str:
+        title, length, points = REPORT_SECTIONS[index]
+        lines = [f"{index + 1}. **{title}** ({length})", *(f"- {point}" for point in points), ""]
+        return "".join(f"        {line}\n" for line in lines)
+    
+    @staticmethod
+    def _is_section_header(line: str) -> bool:
+        return is_section_header(line)
+    
+    def _create_report_prompt(self, data: Dict[str, Any], requirements: Optional[str] = None) -> str:
+        """Create comprehensive prompt for Gemini AI, with the data sections compacted to the token budget"""
+        
+        if requirements is None:
+            requirements = "**Report Requirements:**\n        Create a comprehensive report with the following sections:\n        \n" + \
+                "".join(self._format_section_requirement(i) for i in range(len(REPORT_SECTIONS)))
+        # Escape braces so generated section text survives the template fill
+        requirements = requirements.rstrip().replace("{", "{{").replace("}", "}}")
         stocks_list = ", ".join(data["stocks"]) if data["stocks"] else "Multiple stocks"
         
-        prompt = f"""
+        template = f"""
         You are a professional financial analyst creating a comprehensive investment research report.
         
         Generate a detailed, professional stock analysis report suitable for institutional investors and financial advisors.
@@ -172,80 +529,19 @@ class ReportGeneratorAgent(BaseAgent):
         Analysis Date: {data["report_metadata"]["analysis_date"]}
         Total Stocks: {data["report_metadata"]["total_stocks"]}
         
-        **Market Data:**
-        {json.dumps(data["market_data"], indent=2)}
-        
-        **Technical Analysis:**
-        {json.dumps(data["analysis_data"], indent=2)}
-        
-        **News Analysis:**
-        {json.dumps(data["news_data"], indent=2)}
-        
-        **Report Requirements:**
-        Create a comprehensive report with the following sections:
-        
-        1. **EXECUTIVE SUMMARY** (3-4 paragraphs)
-        - Overall investment thesis and key findings
-        - Market positioning and competitive landscape
-        - Primary risks and opportunities
-        - Clear investment recommendation with rationale
-        
-        2. **MARKET OVERVIEW & SECTOR ANALYSIS** (4-5 paragraphs)
-        - Current market conditions and trends
-        - Sector performance and outlook
-        - Macroeconomic factors impacting the stocks
-        - Comparative analysis within sector
-        
-        3. **INDIVIDUAL STOCK ANALYSIS** (For each stock, 5-6 paragraphs)
-        - Company fundamentals and business model
-        - Financial performance and key metrics
-        - Technical analysis and price action
-        - News sentiment and market perception
-        - Valuation assessment and peer comparison
-        - Specific investment recommendation
-        
-        4. **TECHNICAL ANALYSIS DEEP DIVE** (4-5 paragraphs)
-        - Chart patterns and technical indicators
-        - Support and resistance levels
-        - Volume analysis and momentum indicators
-        - Multi-timeframe analysis
-        - Entry and exit strategies
-        
-        5. **FUNDAMENTAL VALUATION ANALYSIS** (4-5 paragraphs)
-        - P/E ratio analysis and industry comparison
-        - Growth prospects and earnings forecasts
-        - Dividend analysis and shareholder returns
-        - Balance sheet strength and financial health
-        - Intrinsic value estimation
-        
-        6. **NEWS IMPACT & MARKET SENTIMENT** (3-4 paragraphs)
-        - Recent news analysis and market impact
-        - Sentiment trends and social media buzz
-        - Analyst recommendations and upgrades/downgrades
-        - Potential catalysts and upcoming events
-        
-        7. **RISK ASSESSMENT & MANAGEMENT** (3-4 paragraphs)
-        - Key risk factors and mitigation strategies
-        - Market risks and volatility analysis
-        - Company-specific risks and challenges
-        - Risk-adjusted return expectations
-        
-        8. **INVESTMENT STRATEGY & RECOMMENDATIONS** (4-5 paragraphs)
-        - Portfolio allocation recommendations
-        - Entry and exit strategies for different investor profiles
-        - Time horizon considerations
-        - Hedging strategies and risk management
-        
-        9. **FORWARD-LOOKING ANALYSIS** (3-4 paragraphs)
-        - Growth catalysts and expansion opportunities
-        - Industry trends and technological disruptions
-        - Long-term outlook and sustainability
-        - Potential challenges and competitive threats
-        
-        10. **CONCLUSION & ACTION ITEMS** (2-3 paragraphs)
-        - Summary of key investment themes
-        - Prioritized action items for investors
-        - Next steps and monitoring criteria
+        **Market Data (latest close, returns, ranges and fundamentals):**
+        {{market_data}}
+        
+        **Computed Insights (technical, fundamental, sentiment, risk and recommendations):**
+        {{insights}}
+        
+        **Top Headlines:**
+        {{headlines}}
+        
+        **Portfolio Analytics (correlation, redundant holdings, minimum-variance and risk-parity weights):**
+        {{portfolio}}
+        
+        {requirements}
         
         **Style Guidelines:**
         - Use professional financial language and terminology
@@ -258,6 +554,10 @@ class ReportGeneratorAgent(BaseAgent):
         Generate a report that would be suitable for PDF generation and institutional presentation.
         """
         
+        prompt, stats = PromptBuilder(self.prompt_token_budget, self.headlines_per_stock).build(data, template)
+        data["prompt_stats"] = stats
+        logger.info(f"[{self.name}] Report prompt ~{stats['total_tokens']} tokens (budget {stats['budget']}): "
+                    f"{stats['section_tokens']}")
         return prompt
     
     def _generate_fallback_report(self, data: Dict[str, Any]) -> str:
@@ -281,7 +581,7 @@ class ReportGeneratorAgent(BaseAgent):
         investment opportunities and risks.
         
         MARKET DATA SUMMARY
-        {json.dumps(data["market_data"], indent=2)}
+{market_section(data["market_data"])}
         
         NEWS ANALYSIS SUMMARY
         Recent news analysis shows varying sentiment across the analyzed stocks.
@@ -354,165 +654,40 @@ Contact: support@yourcompany.com
         
         return header + content + footer
     
-    async def _generate_pdf_report(self, content: str, data: Dict[str, Any]) -> tuple[str, str]:
-        """Generate PDF report and return file path and base64 encoded content"""
+    async def _generate_pdf_report(self, content: str, data: Dict[str, Any]) -> tuple[str, Optional[str]]:
+        """Generate the PDF report and return its file path and artifact name (None on failure)"""
         
         # Create filename
         stocks_str = "_".join(data["stocks"][:3]) if data["stocks"] else "portfolio"
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"investment_report_{stocks_str}_{timestamp}.pdf"
         
-        # Ensure reports directory exists
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        filepath = os.path.join(reports_dir, filename)
-        
         try:
-            # Create PDF document
-            doc = SimpleDocTemplate(
-                filepath,
-                pagesize=letter,
-                rightMargin=0.75*inch,
-                leftMargin=0.75*inch,
-                topMargin=1*inch,
-                bottomMargin=1*inch
-            )
-            
-            # Define styles
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Title'],
-                fontSize=18,
-                textColor=blue,
-                spaceAfter=30,
-                alignment=TA_CENTER
+            pdf_bytes = await self.pdf_renderer.render(
+                content, data["stocks"], data["report_metadata"]["analysis_date"], charts=data.get("charts")
             )
+            entry = await asyncio.to_thread(self.artifact_store.put, filename, pdf_bytes, "pdf", data["stocks"])
             
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading1'],
-                fontSize=14,
-                textColor=black,
-                spaceAfter=12,
-                spaceBefore=20
-            )
-            
-            body_style = ParagraphStyle(
-                'CustomBody',
-                parent=styles['Normal'],
-                fontSize=10,
-                alignment=TA_JUSTIFY,
-                spaceAfter=12
-            )
-            
-            disclaimer_style = ParagraphStyle(
-                'Disclaimer',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=red,
-                alignment=TA_JUSTIFY,
-                spaceAfter=6
-            )
-            
-            # Parse content and create story
-            story = []
-            
-            # Add title
-            stocks_str = ", ".join(data["stocks"]) if data["stocks"] else "Portfolio Analysis"
-            story.append(Paragraph(f"INVESTMENT RESEARCH REPORT", title_style))
-            story.append(Paragraph(f"{stocks_str}", heading_style))
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Add metadata
-            metadata = f"""
-            <b>Report Date:</b> {data["report_metadata"]["analysis_date"]}<br/>
-            <b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
-            <b>Total Securities Analyzed:</b> {data["report_metadata"]["total_stocks"]}<br/>
-            """
-            story.append(Paragraph(metadata, body_style))
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Process content sections
-            sections = self._parse_report_sections(content)
-            
-            for section_title, section_content in sections:
-                if section_title:
-                    story.append(Paragraph(section_title, heading_style))
-                
-                paragraphs = section_content.split('\n\n')
-                for para in paragraphs:
-                    if para.strip():
-                        # Clean up paragraph
-                        clean_para = para.strip().replace('\n', ' ')
-                        story.append(Paragraph(clean_para, body_style))
-                
-                story.append(Spacer(1, 0.2*inch))
-            
-            # Add page break before disclaimers
-            story.append(PageBreak())
-            
-            # Add disclaimers
-            story.append(Paragraph("IMPORTANT DISCLAIMERS & RISK WARNINGS", heading_style))
-            
-            disclaimers = [
-                "This report is prepared for informational and educational purposes only and should not be construed as investment advice, investment recommendations, or an offer to buy or sell securities.",
-                "The information contained herein is based on sources believed to be reliable but is not guaranteed to be accurate or complete.",
-                "Past performance does not guarantee future results. All investments involve risk, including the potential loss of principal.",
-                "Before making any investment decisions, please consult with a qualified financial advisor who can assess your individual financial situation and investment objectives.",
-                "The analysis and recommendations in this report are based on market conditions and information available as of the report date and may change without notice.",
-                "Report generated using AI-assisted analysis tools."
-            ]
-            
-            for disclaimer in disclaimers:
-                story.append(Paragraph(disclaimer, disclaimer_style))
-            
-            # Build PDF
-            doc.build(story)
-            
-            # Generate base64 encoded version for download
-            with open(filepath, 'rb') as pdf_file:
-                pdf_base64 = base64.b64encode(pdf_file.read()).decode('utf-8')
-            
-            logger.info(f"[{self.name}] PDF report generated: {filepath}")
-            return filename, pdf_base64
+            logger.info(f"[{self.name}] PDF report generated: {entry['path']} ({len(pdf_bytes)} bytes)")
+            return entry["path"], filename
             
         except Exception as e:
             logger.error(f"[{self.name}] Error generating PDF: {str(e)}")
-            return f"error_{timestamp}.pdf", ""
+            return f"error_{timestamp}.pdf", None
+    
+    async def _render_charts(self, market_data: Any) -> Dict[str, str]:
+        """Chart PNG paths by symbol; a failure leaves the charts out of the PDF"""
+        if not self.include_charts or not market_data:
+            return {}
+        try:
+            return await self.chart_renderer.render_market_charts(market_data)
+        except Exception as e:
+            logger.error(f"[{self.name}] Error rendering charts: {str(e)}")
+            return {}
     
     def _parse_report_sections(self, content: str) -> List[tuple[str, str]]:
         """Parse report content into sections"""
-        
-        sections = []
-        lines = content.split('\n')
-        current_section = ""
-        current_content = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if this is a section header (all caps or starts with number)
-            if (line.isupper() and len(line) > 10) or (line and line[0].isdigit() and '.' in line[:5]):
-                # Save previous section
-                if current_section and current_content:
-                    sections.append((current_section, '\n'.join(current_content)))
-                
-                # Start new section
-                current_section = line
-                current_content = []
-            else:
-                current_content.append(line)
-        
-        # Add final section
-        if current_section and current_content:
-            sections.append((current_section, '\n'.join(current_content)))
-        
-        return sections
+        return parse_report_sections(content)
     
     async def _save_report_to_file(self, content: str, data: Dict[str, Any]) -> str:
         """Save the generated report to a text file"""
@@ -522,17 +697,12 @@ Contact: support@yourcompany.com
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"investment_report_{stocks_str}_{timestamp}.txt"
         
-        # Ensure reports directory exists
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        filepath = os.path.join(reports_dir, filename)
-        
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            logger.info(f"[{self.name}] Text report saved to {filepath}")
-            return filename
+            entry = await asyncio.to_thread(
+                self.artifact_store.put, filename, content.encode('utf-8'), "txt", data["stocks"]
+            )
+            logger.info(f"[{self.name}] Text report saved to {entry['path']}")
+            return entry["path"]
         except Exception as e:
             logger.error(f"[{self.name}] Error saving text report: {str(e)}")
             return f"error_saving_{timestamp}.txt"
@@ -574,7 +744,7 @@ Contact: support@yourcompany.com
 📥 **Download Options:**
 • PDF report is available for download in the reports directory
 • Text version also available for editing/customization
-• Base64 encoded PDF stored in session state for web download
+• PDF referenced from session state by its report archive name for web download
 
 📋 **Next Steps:**
 1. Download the PDF report from the reports directory
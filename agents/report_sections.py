@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+from agents.prompt_builder import iter_market
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "report_sections.json")
+MAX_STORED_REPORTS = 200
+# Significant digits kept when fingerprinting numbers, so sub-percent ticks do not invalidate a section
+FINGERPRINT_DIGITS = 3
+
+# Input components each body section is written from; the synthesis sections depend on the body sections
+SECTION_INPUTS = {
+    "MARKET OVERVIEW & SECTOR ANALYSIS": ("prices", "fundamental", "rankings"),
+    "INDIVIDUAL STOCK ANALYSIS": ("prices", "technical", "fundamental", "news", "recommendations"),
+    "TECHNICAL ANALYSIS DEEP DIVE": ("prices", "technical"),
+    "FUNDAMENTAL VALUATION ANALYSIS": ("fundamental", "rankings"),
+    "NEWS IMPACT & MARKET SENTIMENT": ("news",),
+    "RISK ASSESSMENT & MANAGEMENT": ("technical", "fundamental", "portfolio"),
+    "INVESTMENT STRATEGY & RECOMMENDATIONS": ("recommendations", "portfolio"),
+    "FORWARD-LOOKING ANALYSIS": ("fundamental", "news"),
+}
+
+
+def _rounded(value: Any) -> Any:
+    if isinstance(value, float):
+        return float(f"{value:.{FINGERPRINT_DIGITS}g}") if value == value else None
+    if isinstance(value, dict):
+        return {str(k): _rounded(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(v) for v in value]
+    return value
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(_rounded(value), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def input_components(data: Dict[str, Any]) -> Dict[str, str]:
+    """Digest of each input component of the structured report data"""
+    insights = data.get("analysis_data") if isinstance(data.get("analysis_data"), dict) else {}
+    if "recommendations" in insights:
+        insights = {insights.get("symbol", "Stock"): insights}
+
+    def _part(name):
+        return {symbol: insight.get(name) for symbol, insight in insights.items() if isinstance(insight, dict)}
+
+    prices = {}
+    for symbol, market in iter_market(data.get("market_data")):
+        records = market.get("price_data") or []
+        prices[symbol] = {
+            "summary": market.get("summary"),
+            "close": records[-1].get(f"Close_{symbol}") if records else None,
+        }
+    headlines = {
+        entry.get("symbol") or entry.get("stock"): sorted(a.get("title", "") for a in entry.get("articles", []))
+        for entry in data.get("news_data") or [] if isinstance(entry, dict)
+    }
+    return {
+        "prices": _digest(prices),
+        "technical": _digest(_part("technical_analysis")),
+        "fundamental": _digest(_part("fundamental_analysis")),
+        "news": _digest({"analysis": _part("news_analysis"), "headlines": headlines}),
+        "recommendations": _digest(_part("recommendations")),
+        "portfolio": _digest(data.get("portfolio_data")),
+        "rankings": _digest((data.get("rankings") or {}).get("table")),
+    }
+
+
+def section_fingerprints(data: Dict[str, Any], titles: List[str]) -> Dict[str, str]:
+    """
+    Fingerprint of every section's inputs. Sections without declared inputs
+    (the executive summary and conclusion) depend on all the body sections.
+    """
+    components = input_components(data)
+    fingerprints = {
+        title: _digest([components[name] for name in SECTION_INPUTS[title]])
+        for title in titles if title in SECTION_INPUTS
+    }
+    body = _digest(sorted(fingerprints.items()))
+    for title in titles:
+        fingerprints.setdefault(title, body)
+    return fingerprints
+
+
+def report_key(stocks: List[str]) -> str:
+    return ",".join(sorted(str(s) for s in stocks)) or "portfolio"
+
+
+class SectionStore:
+    """
+    Last generated text of every report section with the fingerprint of the
+    inputs it was written from, per set of stocks, persisted as JSON.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_reports: int = MAX_STORED_REPORTS):
+        self.path = path or DEFAULT_STORE_PATH
+        self.max_reports = max_reports
+        self._reports: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._reports is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._reports = json.load(f)
+            except FileNotFoundError:
+                self._reports = {}
+            except Exception as e:
+                logger.error(f"Error loading report sections from {self.path}: {e}")
+                self._reports = {}
+        return self._reports
+
+    def get(self, key: str) -> Dict[str, Dict[str, Any]]:
+        """{section title: {"fingerprint", "text"}} from the last report for these stocks"""
+        with self._lock:
+            return dict(self._load().get(key, {}).get("sections", {}))
+
+    def put(self, key: str, sections: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            reports = self._load()
+            reports[key] = {"updated_at": time.time(), "sections": sections}
+            # Keep only the most recently refreshed reports
+            for stale in sorted(reports, key=lambda k: reports[k]["updated_at"])[:-self.max_reports]:
+                del reports[stale]
+            payload = json.dumps(reports)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error persisting report sections to {self.path}: {e}")
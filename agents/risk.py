@@ -0,0 +1,134 @@
+import os
+import logging
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from agents.indicators import _previous_valid, _window_diff, min_window_count
+from agents.price_store import PriceStore
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SYMBOL = os.getenv("RISK_BENCHMARK", "SPY")
+TRADING_DAYS = 252
+# Bars used for volatility, VaR/CVaR and drawdown; beta uses a shorter rolling window
+LOOKBACK = 252
+BETA_WINDOW = 60
+CONFIDENCE = 0.95
+
+
+def daily_returns(close: np.ndarray) -> np.ndarray:
+    """Simple returns between consecutive valid closes; NaN on missing bars"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return close / _previous_valid(close) - 1.0
+
+
+def rolling_beta(returns: np.ndarray, benchmark: np.ndarray, window: int = BETA_WINDOW) -> np.ndarray:
+    """(N, T) rolling beta of every ticker against a (T,) benchmark, over bars where both are present"""
+    both = ~np.isnan(returns) & ~np.isnan(benchmark)
+    x = np.where(both, returns, 0.0)
+    y = np.where(both, benchmark, 0.0)
+    n = _window_diff(np.cumsum(both, axis=1, dtype=np.float64), window)
+    sx = _window_diff(np.cumsum(x, axis=1), window)
+    sy = _window_diff(np.cumsum(y, axis=1), window)
+    sxy = _window_diff(np.cumsum(x * y, axis=1), window)
+    syy = _window_diff(np.cumsum(y * y, axis=1), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = sxy - sx * sy / n
+        variance = syy - sy * sy / n
+        beta = covariance / variance
+    beta[(n < min_window_count(window)) | ~(variance > 0)] = np.nan
+    return beta
+
+
+def max_drawdown(close: np.ndarray) -> np.ndarray:
+    """Deepest peak-to-trough fall of each row, as a negative fraction"""
+    peak = np.fmax.accumulate(close, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = close / peak - 1.0
+    drawdown[np.isnan(drawdown)] = 0.0
+    return drawdown.min(axis=1) if close.shape[1] else np.zeros(close.shape[0])
+
+
+def compute_risk(close: np.ndarray, benchmark_close: Optional[np.ndarray] = None, lookback: int = LOOKBACK,
+                 beta_window: int = BETA_WINDOW, confidence: float = CONFIDENCE) -> Dict[str, np.ndarray]:
+    """
+    Risk metrics for every row of an (N, T) close matrix at once.
+
+    VaR and CVaR are daily losses at `confidence`, reported as positive
+    fractions; volatility is annualised. Beta is the latest rolling beta
+    against `benchmark_close` (T,), aligned on the same dates.
+    """
+    returns = daily_returns(close)[:, -lookback:]
+    recent_close = close[:, -lookback:]
+    count = (~np.isnan(returns)).sum(axis=1)
+    enough = count >= 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(returns, axis=1) / count
+        filled = np.where(np.isnan(returns), mean[:, None], returns)
+        std = np.sqrt(((filled - mean[:, None]) ** 2).sum(axis=1) / (count - 1))
+
+        # Historical: empirical loss quantile and the mean loss beyond it
+        cutoff = np.full(close.shape[0], np.nan)
+        if enough.any():
+            cutoff[enough] = np.nanquantile(returns[enough], 1 - confidence, axis=1)
+        tail = returns <= cutoff[:, None]
+        cvar_historical = -np.where(tail, returns, 0.0).sum(axis=1) / tail.sum(axis=1)
+
+        # Parametric: normal distribution with the sample mean and volatility
+        z = NormalDist().inv_cdf(confidence)
+        var_parametric = -(mean - z * std)
+        cvar_parametric = -(mean - std * np.exp(-z * z / 2) / np.sqrt(2 * np.pi) / (1 - confidence))
+
+    metrics = {
+        "volatility": std * np.sqrt(TRADING_DAYS),
+        "var_historical": -cutoff,
+        "cvar_historical": cvar_historical,
+        "var_parametric": var_parametric,
+        "cvar_parametric": cvar_parametric,
+        "max_drawdown": max_drawdown(recent_close),
+        "observations": count.astype(float),
+    }
+    for name in ("volatility", "cvar_historical", "var_parametric", "cvar_parametric"):
+        metrics[name][~enough] = np.nan
+
+    if benchmark_close is not None:
+        benchmark_returns = daily_returns(np.asarray(benchmark_close, dtype=float)[None, :])[0]
+        beta = rolling_beta(daily_returns(close), benchmark_returns, beta_window)
+        metrics["beta"] = beta[:, -1] if beta.shape[1] else np.full(close.shape[0], np.nan)
+    return metrics
+
+
+class RiskAnalyzer:
+    """Risk metrics for many tickers from the locally stored daily history; no network calls"""
+
+    def __init__(self, price_store: Optional[PriceStore] = None, benchmark: str = BENCHMARK_SYMBOL):
+        self.price_store = price_store or PriceStore()
+        self.benchmark = benchmark
+
+    def analyze(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Per-symbol risk metrics; symbols without stored history are left out"""
+        names, dates, prices = self.price_store.load_matrix([*symbols, self.benchmark])
+        if not names:
+            return {}
+
+        close = prices["Close"]
+        benchmark_close = None
+        if self.benchmark in names:
+            benchmark_close = close[names.index(self.benchmark)]
+        rows = [i for i, name in enumerate(names) if name in symbols]
+        metrics = compute_risk(close[rows], benchmark_close)
+
+        results = {}
+        for position, i in enumerate(rows):
+            values = {}
+            for name, array in metrics.items():
+                value = array[position]
+                values[name] = None if np.isnan(value) else round(float(value), 4)
+            values["observations"] = int(values["observations"] or 0)
+            values["benchmark"] = self.benchmark if benchmark_close is not None else None
+            values["as_of"] = dates[-1]
+            results[names[i]] = values
+        return results
@@ -0,0 +1,27 @@
+from typing import Dict
+
+# Thresholds of the AnalyticsAgent rule set. The live analysis and the
+# backtester (agents.backtest) both read them from here, so a parameter sweep
+# evaluates exactly the rules that produce the reports.
+RULE_PARAMS: Dict[str, float] = {
+    # Technical: daily price change % for Bullish/Bearish momentum
+    "momentum_threshold": 1.0,
+    # Technical: volume vs recent average
+    "volume_high": 1.5,
+    "volume_above_average": 1.2,
+    # Fundamental: P/E cut-offs for Expensive / Fair Value / Attractive / Undervalued
+    "pe_expensive": 35.0,
+    "pe_fair": 20.0,
+    "pe_attractive": 15.0,
+    # Fundamental: market cap (USD) for Mega Cap / Large Cap stability
+    "mega_cap": 1e12,
+    "large_cap": 2e11,
+    # Overall score cut-offs
+    "strong_buy_score": 4.0,
+    "buy_score": 3.5,
+    "hold_score": 2.5,
+}
+
+# Overall actions from most to least bullish, with the direction each one bets on
+OVERALL_ACTIONS = ("STRONG BUY", "BUY", "HOLD", "CONSIDER SELLING")
+ACTION_DIRECTION = {"STRONG BUY": 1, "BUY": 1, "HOLD": 0, "CONSIDER SELLING": -1}
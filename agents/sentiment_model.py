@@ -0,0 +1,170 @@
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+from agents.lexicon import LexiconMatcher, DEFAULT_SENTIMENT_LEXICON
+from agents.process_pool import worker_context
+
+logger = logging.getLogger(__name__)
+
+# Finance-tuned polarity lexicon used for full-text scoring. Weights are in
+# [-2, 2]; stronger terms carry more weight than the headline keywords.
+FINANCE_SENTIMENT_LEXICON: Dict[str, float] = {
+    **DEFAULT_SENTIMENT_LEXICON,
+    'surge': 1.5, 'soar': 2.0, 'rally': 1.5, 'record': 1.0, 'rebound': 1.0, 'jump': 1.0,
+    'exceed': 1.0, 'optimistic': 1.0, 'robust': 1.0, 'boost': 1.0, 'expand': 0.5,
+    'win': 1.0, 'approval': 1.0, 'raise': 0.5, 'dividend hike': 1.5, 'buyback': 1.0,
+    'plunge': -2.0, 'slump': -1.5, 'crash': -2.0, 'tumble': -1.5, 'drop': -1.0, 'slide': -1.0,
+    'lawsuit': -1.0, 'probe': -1.0, 'investigation': -1.0, 'recall': -1.0, 'layoff': -1.0,
+    'warning': -1.0, 'cut': -0.5, 'default': -2.0, 'bankruptcy': -2.0, 'fraud': -2.0,
+    'pessimistic': -1.0, 'volatile': -0.5, 'concern': -0.5, 'risk': -0.5, 'lower guidance': -1.5,
+}
+
+TITLE_WEIGHT = 0.6
+BODY_WEIGHT = 0.4
+# Raw lexicon sums are squashed with tanh(raw / SCORE_SCALE) into [-1, 1]
+SCORE_SCALE = 3.0
+# Batches larger than this are spread across the process pool
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+CACHE_SIZE = 50000
+
+_worker_matcher: Optional[LexiconMatcher] = None
+
+
+def _score_chunk(titles: List[str], bodies: List[str]) -> List[Tuple[float, float]]:
+    """Score one chunk of (title, body) pairs; runs in the caller or a pool worker"""
+    global _worker_matcher
+    if _worker_matcher is None:
+        _worker_matcher = LexiconMatcher(sentiment_lexicon=FINANCE_SENTIMENT_LEXICON, theme_lexicon={})
+
+    title_scores = _worker_matcher.score_batch(titles)["articles"]
+    body_scores = _worker_matcher.score_batch(bodies)["articles"]
+
+    results = []
+    for title, body, has_body in zip(title_scores, body_scores, bodies):
+        if has_body:
+            raw = TITLE_WEIGHT * title["score"] + BODY_WEIGHT * body["score"]
+            hits = title["positive"] + title["negative"] + body["positive"] + body["negative"]
+            agreement = abs(title["positive"] + body["positive"] - title["negative"] - body["negative"])
+        else:
+            raw = title["score"]
+            hits = title["positive"] + title["negative"]
+            agreement = abs(title["positive"] - title["negative"])
+        score = math.tanh(raw / SCORE_SCALE)
+        # More evidence that points the same way means more confidence
+        confidence = (agreement / hits) * (hits / (hits + 2)) if hits else 0.0
+        results.append((round(score, 4), round(confidence, 4)))
+    return results
+
+
+def article_hash(article: Dict[str, Any]) -> str:
+    body = article.get('text') or article.get('description') or article.get('summary') or ''
+    return hashlib.sha1(f"{article.get('title', '')}\x00{body}".encode('utf-8')).hexdigest()
+
+
+class SentimentScorer:
+    """
+    Offline lexicon-based sentiment scorer for article titles and bodies.
+
+    Scores are continuous in [-1, 1] with a confidence in [0, 1]. Results are
+    cached per article hash, and large batches are spread across a process pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, cache_size: int = CACHE_SIZE,
+                 parallel_threshold: int = PARALLEL_THRESHOLD):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.parallel_threshold = parallel_threshold
+        self._cache: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Not forked from this process, which runs store threads and holds locks and SQLite connections
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=worker_context())
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def score_articles(self, articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Score a batch of articles, returning per-article results and throughput"""
+        started = time.perf_counter()
+        keys = [article_hash(a) for a in articles]
+
+        with self._lock:
+            cached = {k: self._cache[k] for k in keys if k in self._cache}
+            for k in cached:
+                self._cache.move_to_end(k)
+
+        pending = [i for i, k in enumerate(keys) if k not in cached]
+        # Identical articles in one batch are scored once
+        unique_pending = list({keys[i]: i for i in pending}.values())
+        titles = [articles[i].get('title') or '' for i in unique_pending]
+        bodies = [articles[i].get('text') or articles[i].get('description') or articles[i].get('summary') or ''
+                  for i in unique_pending]
+
+        if len(unique_pending) > self.parallel_threshold:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_score_chunk, titles[i:i + CHUNK_SIZE], bodies[i:i + CHUNK_SIZE])
+                for i in range(0, len(titles), CHUNK_SIZE)
+            ]
+            fresh = [r for f in futures for r in f.result()]
+        else:
+            fresh = _score_chunk(titles, bodies) if titles else []
+
+        with self._lock:
+            for i, result in zip(unique_pending, fresh):
+                cached[keys[i]] = result
+                self._cache[keys[i]] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        elapsed = time.perf_counter() - started
+        results = [{"score": cached[k][0], "confidence": cached[k][1]} for k in keys]
+        return {
+            "articles": results,
+            "scored": len(unique_pending),
+            "cache_hits": len(articles) - len(pending),
+            "elapsed_seconds": round(elapsed, 6),
+            "articles_per_sec": round(len(articles) / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    def score_ticker(self, articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Confidence-weighted sentiment score and confidence for one ticker's articles"""
+        return self.summarize(self.score_articles(articles)) if articles else self.summarize(None)
+
+    def summarize(self, batch: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Collapse a scored batch from score_articles into one ticker-level score"""
+        if not batch or not batch["articles"]:
+            return {"model_score": 0.0, "model_confidence": 0.0, "articles_scored": 0}
+
+        scored = batch["articles"]
+        weight_total = sum(a["confidence"] for a in scored)
+        if weight_total > 0:
+            score = sum(a["score"] * a["confidence"] for a in scored) / weight_total
+        else:
+            score = sum(a["score"] for a in scored) / len(scored)
+        mean_confidence = weight_total / len(scored)
+        # Coverage term: a single confident article is weaker evidence than ten
+        confidence = mean_confidence * (len(scored) / (len(scored) + 3))
+
+        logger.info(f"Scored {len(scored)} articles at {batch['articles_per_sec']} articles/sec "
+                    f"({batch['cache_hits']} cache hits)")
+        return {
+            "model_score": round(score, 4),
+            "model_confidence": round(confidence, 4),
+            "articles_scored": len(scored),
+            "articles_per_sec": batch["articles_per_sec"],
+        }
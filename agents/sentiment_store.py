@@ -0,0 +1,192 @@
+import os
+import math
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from agents.sentiment_model import article_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "sentiment.db")
+HALF_LIFE_DAYS = 7.0
+_DECAY_RATE = math.log(2) / HALF_LIFE_DAYS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    ticker TEXT NOT NULL,
+    article_hash TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score REAL NOT NULL,
+    confidence REAL NOT NULL,
+    PRIMARY KEY (ticker, article_hash)
+);
+CREATE TABLE IF NOT EXISTS daily (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score_sum REAL NOT NULL,
+    weight_sum REAL NOT NULL,
+    article_count INTEGER NOT NULL,
+    PRIMARY KEY (ticker, date)
+);
+CREATE TABLE IF NOT EXISTS features (
+    ticker TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL,
+    decayed_num REAL NOT NULL,
+    decayed_den REAL NOT NULL,
+    mean_7d REAL,
+    mean_30d REAL,
+    articles_7d INTEGER NOT NULL,
+    articles_30d INTEGER NOT NULL,
+    total_articles INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _article_date(article: Dict[str, Any]) -> str:
+    published = article.get("publishedAt") or ""
+    try:
+        return datetime.fromisoformat(published.replace("Z", "+00:00")).date().isoformat()
+    except ValueError:
+        return date.today().isoformat()
+
+
+class SentimentStore:
+    """
+    Local per-ticker daily sentiment series indexed by (ticker, date).
+
+    Each recorded article updates its daily bucket and the ticker's feature row
+    (exponentially time-decayed sentiment) in place. The 7/30-day rolling means
+    and article velocity are read from the last 30 daily buckets by primary
+    key, relative to the read date.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_DB_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def record_articles(self, ticker: str, articles: List[Dict[str, Any]], scores: List[Dict[str, Any]]) -> int:
+        """Persist scored articles for a ticker and refresh its features. Returns new article count."""
+        if not articles:
+            return 0
+
+        with self._lock:
+            conn = self._connection()
+
+            new_rows = []
+            for article, scored in zip(articles, scores):
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?)",
+                    (ticker, article_hash(article), _article_date(article), scored["score"], scored["confidence"]),
+                )
+                if cursor.rowcount:
+                    new_rows.append((_article_date(article), scored["score"], scored["confidence"]))
+
+            if not new_rows:
+                conn.commit()
+                return 0
+
+            for day, score, confidence in new_rows:
+                # Articles with no lexicon evidence still count, at a small weight
+                weight = max(confidence, 0.05)
+                conn.execute(
+                    """INSERT INTO daily VALUES (?, ?, ?, ?, 1)
+                       ON CONFLICT (ticker, date) DO UPDATE SET
+                           score_sum = score_sum + excluded.score_sum,
+                           weight_sum = weight_sum + excluded.weight_sum,
+                           article_count = article_count + 1""",
+                    (ticker, day, score * weight, weight),
+                )
+            self._update_features(conn, ticker, new_rows)
+            conn.commit()
+            return len(new_rows)
+
+    def _update_features(self, conn: sqlite3.Connection, ticker: str, new_rows: List[tuple]):
+        row = conn.execute("SELECT * FROM features WHERE ticker = ?", (ticker,)).fetchone()
+        last_date = date.fromisoformat(row["last_date"]) if row else None
+        num = row["decayed_num"] if row else 0.0
+        den = row["decayed_den"] if row else 0.0
+        total = (row["total_articles"] if row else 0) + len(new_rows)
+
+        # Decay the running sums to the newest date seen and fold in each article
+        for day, score, confidence in sorted(new_rows):
+            day = date.fromisoformat(day)
+            weight = max(confidence, 0.05)
+            if last_date is None or day >= last_date:
+                factor = math.exp(-_DECAY_RATE * (day - last_date).days) if last_date else 1.0
+                num, den, last_date = num * factor + weight * score, den * factor + weight, day
+            else:
+                factor = math.exp(-_DECAY_RATE * (last_date - day).days)
+                num, den = num + factor * weight * score, den + factor * weight
+
+        # The window columns predate computing the windows on read and are kept for existing databases
+        conn.execute(
+            "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, NULL, NULL, 0, 0, ?, ?)",
+            (ticker, last_date.isoformat(), num, den, total, datetime.now().isoformat()),
+        )
+
+    def get_features(self, ticker: str, as_of: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Sentiment trend features for a ticker as of a date (default today). The
+        7/30-day windows end on that date, so a ticker that has gone quiet shows
+        falling counts rather than the windows around its last article.
+        """
+        as_of = as_of or date.today()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM features WHERE ticker = ?", (ticker,)).fetchone()
+            if not row:
+                return {}
+            # Only the last 30 daily buckets, read by primary key
+            buckets = conn.execute(
+                "SELECT date, score_sum, weight_sum, article_count FROM daily WHERE ticker = ? AND date >= ? AND date <= ?",
+                (ticker, (as_of - timedelta(days=29)).isoformat(), as_of.isoformat()),
+            ).fetchall()
+        week_start = (as_of - timedelta(days=6)).isoformat()
+        week = [b for b in buckets if b["date"] >= week_start]
+
+        def _mean(rows):
+            weight = sum(r["weight_sum"] for r in rows)
+            return round(sum(r["score_sum"] for r in rows) / weight, 4) if weight else None
+
+        articles_7d, articles_30d = sum(r["article_count"] for r in week), sum(r["article_count"] for r in buckets)
+        velocity_7d = articles_7d / 7
+        return {
+            # Decaying the sums on to the read date scales both alike, so the ratio is already current
+            "decayed_sentiment": round(row["decayed_num"] / row["decayed_den"], 4) if row["decayed_den"] else None,
+            "mean_7d": _mean(week),
+            "mean_30d": _mean(buckets),
+            "articles_7d": articles_7d,
+            "articles_30d": articles_30d,
+            "articles_per_day_7d": round(velocity_7d, 2),
+            # >1 means coverage is accelerating relative to the 30-day pace
+            "velocity_ratio": round(velocity_7d / (articles_30d / 30), 2) if articles_30d else None,
+            "total_articles": row["total_articles"],
+            "last_article_date": row["last_date"],
+            "as_of": as_of.isoformat(),
+        }
+
+    def get_series(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Daily mean sentiment and article counts for a ticker between two ISO dates"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT date, score_sum, weight_sum, article_count FROM daily "
+                "WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date",
+                (ticker, start or "0000-00-00", end or "9999-99-99"),
+            ).fetchall()
+        return [
+            {"date": r["date"], "sentiment": round(r["score_sum"] / r["weight_sum"], 4), "articles": r["article_count"]}
+            for r in rows
+        ]
@@ -0,0 +1,316 @@
+"""
+BUY/HOLD/SELL signal model: the RandomForest flow from market.ipynb, trained on
+locally stored history and served to AnalyticsAgent.
+
+Features per ticker and bar (as in the notebook: VWAP, PE, PB, EPS, returns,
+sentiment) are built by `feature_tensor` for both training and inference.
+Labels come from the forward return over `--horizon` bars.
+
+Usage (from the repository root):
+    python -m agents.signal_model train --horizon 21 --threshold 0.03
+    python -m agents.signal_model info
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from agents.indicators import sma, _previous_valid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "models")
+MODEL_NAME = "signal_model"
+
+FEATURES = ["vwap_distance", "pe", "pb", "eps", "return_1d", "return_5d", "return_21d", "sentiment"]
+# Same label encoding as the notebook
+LABELS = {0: "BUY", 1: "HOLD", 2: "SELL"}
+VWAP_PERIOD = 20
+# Daily sentiment is carried forward over quiet news days for at most this many bars
+SENTIMENT_FILL_LIMIT = 5
+
+
+def _trailing_return(close: np.ndarray, n: int) -> np.ndarray:
+    previous = np.full(close.shape, np.nan)
+    previous[:, n:] = close[:, :-n]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return close / previous - 1.0
+
+
+def feature_tensor(prices: Dict[str, np.ndarray], fundamentals: Optional[Dict[str, np.ndarray]] = None,
+                   sentiment: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (N, T, len(FEATURES)) feature tensor. `fundamentals` holds "pe", "pb" and
+    "eps", and `sentiment` the daily model score, each as an (N,) or (N, T)
+    array. Missing inputs are NaN, which the forest handles natively.
+    """
+    close, high, low, volume = prices["Close"], prices["High"], prices["Low"], prices["Volume"]
+    shape = close.shape
+    fundamentals = fundamentals or {}
+
+    typical = (high + low + close) / 3
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = sma(typical * volume, VWAP_PERIOD) / sma(volume, VWAP_PERIOD)
+        vwap_distance = close / vwap - 1.0
+        one_day = close / _previous_valid(close) - 1.0
+
+    def _matrix(values):
+        if values is None:
+            return np.full(shape, np.nan)
+        values = np.asarray(values, dtype=float)
+        return np.broadcast_to(values[:, None] if values.ndim == 1 else values, shape)
+
+    columns = [
+        vwap_distance,
+        _matrix(fundamentals.get("pe")),
+        _matrix(fundamentals.get("pb")),
+        _matrix(fundamentals.get("eps")),
+        one_day,
+        _trailing_return(close, 5),
+        _trailing_return(close, 21),
+        _matrix(sentiment),
+    ]
+    return np.stack(columns, axis=-1)
+
+
+def forward_labels(close: np.ndarray, horizon: int, threshold: float) -> np.ndarray:
+    """Label codes from the forward return: BUY above +threshold, SELL below -threshold (-1 where unknown)"""
+    forward = np.full(close.shape, np.nan)
+    if horizon < close.shape[1]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            forward[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1.0
+    labels = np.where(forward > threshold, 0, np.where(forward < -threshold, 2, 1))
+    labels[np.isnan(forward)] = -1
+    return labels
+
+
+def load_training_inputs(symbols: Optional[List[str]] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """Prices from PriceStore, latest fundamentals from PeerIndex, daily sentiment from SentimentStore"""
+    import pandas as pd
+    from agents.price_store import PriceStore
+    from agents.peer_index import PeerIndex
+    from agents.sentiment_store import SentimentStore
+
+    names, dates, prices = PriceStore().load_matrix(symbols, start, end)
+    peers = PeerIndex()
+    latest = [peers.latest(symbol) for symbol in names]
+    # Only the latest fundamentals are stored, so they are held constant over the history. That
+    # leaks today's values into every earlier bar; `train` records it in the model metadata.
+    fundamentals = {
+        feature: np.array([values.get(metric, np.nan) for values in latest], dtype=float)
+        for feature, metric in (("pe", "pe_ratio"), ("pb", "pb_ratio"), ("eps", "eps"))
+    }
+
+    store = SentimentStore()
+    index = pd.DatetimeIndex(pd.to_datetime(dates))
+    sentiment = np.full((len(names), len(dates)), np.nan)
+    for i, symbol in enumerate(names):
+        series = store.get_series(symbol, start, end)
+        if series:
+            daily = pd.Series({pd.Timestamp(r["date"]): r["sentiment"] for r in series})
+            sentiment[i] = daily.reindex(index.union(daily.index)).ffill(limit=SENTIMENT_FILL_LIMIT).reindex(index).to_numpy()
+    return names, dates, prices, fundamentals, sentiment
+
+
+def train(prices: Dict[str, np.ndarray], fundamentals: Optional[Dict[str, np.ndarray]] = None,
+          sentiment: Optional[np.ndarray] = None, horizon: int = 21, threshold: float = 0.03,
+          model_dir: Optional[str] = None, validation_fraction: float = 0.2, **forest_params) -> Dict[str, Any]:
+    """Fit the forest on every labelled ticker x bar and save a versioned artifact. Returns its metadata."""
+    import joblib
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+
+    features = feature_tensor(prices, fundamentals, sentiment)
+    labels = forward_labels(prices["Close"], horizon, threshold)
+    # Hold out the most recent bars, so validation never sees the future of training. The
+    # `horizon` bars before the split are purged: their labels use closes inside the validation window.
+    split = int(labels.shape[1] * (1 - validation_fraction))
+    usable = (labels >= 0) & ~np.isnan(features[..., 0])
+    train_mask = usable.copy()
+    train_mask[:, max(split - horizon, 0):] = False
+    valid_mask = usable.copy()
+    valid_mask[:, :split] = False
+
+    x_train, y_train = features[train_mask], labels[train_mask]
+    if not len(y_train):
+        raise ValueError("no labelled bars to train on")
+
+    params = {"n_estimators": 200, "min_samples_leaf": 20, "n_jobs": -1, "random_state": 0, **forest_params}
+    model = RandomForestClassifier(**params).fit(x_train, y_train)
+
+    metrics = {"train_samples": int(len(y_train)), "validation_samples": int(valid_mask.sum())}
+    if valid_mask.any():
+        predicted = model.predict(features[valid_mask])
+        metrics["validation_accuracy"] = round(float((predicted == labels[valid_mask]).mean()), 4)
+    metrics["class_balance"] = {LABELS[c]: int((y_train == c).sum()) for c in LABELS}
+
+    known_biases = []
+    static = [name for name, values in (fundamentals or {}).items()
+              if values is not None and np.ndim(values) == 1 and not np.isnan(values).all()]
+    if static:
+        known_biases.append(
+            f"look-ahead: fundamentals {', '.join(sorted(static))} are current values held constant over the history"
+        )
+
+    model_dir = model_dir or DEFAULT_MODEL_DIR
+    os.makedirs(model_dir, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%d%H%M%S")
+    artifact = os.path.join(model_dir, f"{MODEL_NAME}-{version}.joblib")
+    # Uncompressed, so the tree arrays can be memory-mapped on load
+    joblib.dump(model, artifact)
+
+    metadata = {
+        "version": version,
+        "artifact": os.path.basename(artifact),
+        "features": FEATURES,
+        "classes": [LABELS[int(c)] for c in model.classes_],
+        "horizon": horizon,
+        "threshold": threshold,
+        "params": params,
+        "metrics": metrics,
+        "purge_bars": horizon,
+        "known_biases": known_biases,
+        "sklearn_version": sklearn.__version__,
+        "trained_at": datetime.now().isoformat(),
+    }
+    with open(os.path.join(model_dir, f"{MODEL_NAME}-{version}.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    # Pointer to the version served by SignalModel
+    tmp_path = os.path.join(model_dir, "latest.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, os.path.join(model_dir, "latest.json"))
+    return metadata
+
+
+class SignalModel:
+    """
+    Lazily loaded signal model. The artifact named by `latest.json` is loaded
+    once (memory-mapped), and `predict` scores every ticker in a single
+    batched `predict_proba` call. Without an artifact, or without
+    scikit-learn/joblib installed, `predict` returns an empty result.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None):
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.metadata: Dict[str, Any] = {}
+        self.last_latency_ms: Optional[float] = None
+        self._model = None
+        self._attempted = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._attempted:
+            return self._model
+        with self._lock:
+            if self._attempted:
+                return self._model
+            self._attempted = True
+            pointer = os.path.join(self.model_dir, "latest.json")
+            if not os.path.exists(pointer):
+                logger.info(f"No signal model found in {self.model_dir}; model signal disabled")
+                return None
+            try:
+                import joblib
+                with open(pointer, "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+                started = time.perf_counter()
+                self._model = joblib.load(os.path.join(self.model_dir, metadata["artifact"]), mmap_mode="r")
+                # Batches are a handful of rows; a worker pool per call costs more than it saves
+                if hasattr(self._model, "n_jobs"):
+                    self._model.n_jobs = 1
+                self.metadata = metadata
+                logger.info(f"Loaded signal model {metadata['version']} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            except ImportError as e:
+                logger.warning(f"Signal model needs scikit-learn and joblib: {e}")
+            except Exception as e:
+                logger.error(f"Error loading signal model: {e}")
+        return self._model
+
+    @property
+    def available(self) -> bool:
+        return self._load() is not None
+
+    def predict(self, symbols: List[str], features: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """Class probabilities for an (N, len(FEATURES)) matrix, one call for every ticker"""
+        model = self._load()
+        if model is None or not len(symbols):
+            return {}
+        started = time.perf_counter()
+        probabilities = model.predict_proba(np.asarray(features, dtype=float))
+        self.last_latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        classes = [LABELS[int(c)] for c in model.classes_]
+        results = {}
+        for symbol, row in zip(symbols, probabilities):
+            best = int(np.argmax(row))
+            results[symbol] = {
+                "signal": classes[best],
+                "confidence": round(float(row[best]), 4),
+                "probabilities": {label: round(float(p), 4) for label, p in zip(classes, row)},
+                "model_version": self.metadata.get("version"),
+            }
+        return results
+
+    def score_market_data(self, market_data: List[Dict[str, Any]], sentiment: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+        """Model signal for every symbol in MarketDataAgent's `market_data`, from its latest bar"""
+        from agents.indicators import build_price_matrix
+
+        if self._load() is None:
+            return {}
+        symbols, dates, prices = build_price_matrix(market_data)
+        if not symbols or not dates:
+            return {}
+
+        summaries = {}
+        for entry in market_data or []:
+            for symbol, data in entry.items():
+                if isinstance(data, dict):
+                    summaries[symbol] = data.get("summary", {})
+
+        def _column(key):
+            values = [summaries.get(s, {}).get(key) for s in symbols]
+            return np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=float)
+
+        fundamentals = {"pe": _column("P/E Ratio (TTM)"), "pb": _column("P/B Ratio"), "eps": _column("EPS (TTM)")}
+        latest_sentiment = np.array([(sentiment or {}).get(s, np.nan) for s in symbols], dtype=float)
+        features = feature_tensor(prices, fundamentals, latest_sentiment)
+        return self.predict(symbols, features[:, -1, :])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="train and save a new model version")
+    train_parser.add_argument("--symbols", nargs="*", help="defaults to every stored symbol")
+    train_parser.add_argument("--start")
+    train_parser.add_argument("--end")
+    train_parser.add_argument("--horizon", type=int, default=21)
+    train_parser.add_argument("--threshold", type=float, default=0.03)
+    train_parser.add_argument("--trees", type=int, default=200)
+    train_parser.add_argument("--model-dir")
+    info_parser = commands.add_parser("info", help="show the served model version")
+    info_parser.add_argument("--model-dir")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        model = SignalModel(args.model_dir)
+        print(json.dumps(model.metadata if model.available else {"model": None}, indent=2))
+        return
+
+    names, dates, prices, fundamentals, sentiment = load_training_inputs(args.symbols, args.start, args.end)
+    if not names:
+        parser.error("no stored price history; run the market data agent first")
+    metadata = train(prices, fundamentals, sentiment, args.horizon, args.threshold,
+                     model_dir=args.model_dir, n_estimators=args.trees)
+    print(json.dumps(metadata, indent=2))
+
+
+if __name__ == "__main__":
+    main()
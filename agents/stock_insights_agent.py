@@ -1,5 +1,5 @@
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from typing_extensions import override
 from pydantic import Field
 import requests
@@ -9,6 +9,8 @@ from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
 from google.genai import types
 
+from agents.llm_cache import release_pending
+
 logger = logging.getLogger(__name__)
 # test1
 
@@ -18,10 +20,12 @@ class StockInsightsAgent(BaseAgent):
     market_agent: BaseAgent
     analytics_agent: BaseAgent
     report_agent: BaseAgent
+    portfolio_agent: Optional[BaseAgent] = None
 
     model_config = {"arbitrary_types_allowed": True}
 
-    def __init__(self, stock_parser: LlmAgent, news_agent: BaseAgent, market_agent: BaseAgent, analytics_agent: BaseAgent,report_agent: BaseAgent):
+    def __init__(self, stock_parser: LlmAgent, news_agent: BaseAgent, market_agent: BaseAgent, analytics_agent: BaseAgent,report_agent: BaseAgent,
+                 portfolio_agent: Optional[BaseAgent] = None):
         # Pass everything as kwargs to super().__init__
         super().__init__(
             name="StockInsightsAgent",
@@ -30,6 +34,7 @@ class StockInsightsAgent(BaseAgent):
             market_agent=market_agent,
             analytics_agent=analytics_agent,
             report_agent=report_agent,
+            portfolio_agent=portfolio_agent,
         )
 
     def resolve_to_symbol(self, name_or_symbol: str) -> str:
@@ -59,8 +64,12 @@ class StockInsightsAgent(BaseAgent):
         
         # Step 1: Extract stocks using LLM agent
         logger.info(f"[{self.name}] Step 1: Extracting stock symbols")
-        async for event in self.stock_parser.run_async(ctx):
-            yield event
+        try:
+            async for event in self.stock_parser.run_async(ctx):
+                yield event
+        finally:
+            # A model call that raised skips the after-model callback and would leave its cache key behind
+            release_pending(ctx.invocation_id)
 
         # Check if stocks were extracted and parse them properly
         event_text = ctx.session.events[-1].content.parts[0].text  # or just event.text
@@ -91,7 +100,17 @@ class StockInsightsAgent(BaseAgent):
         
         stocks = [self.resolve_to_symbol(sym) for sym in stocks_raw]
 
-        stocks = list(set(filter(None, stocks)))
+        # Drop unresolved and repeated symbols while keeping each search query aligned with its symbol
+        queries = ctx.session.state.get("search_queries", [])
+        if len(queries) != len(stocks):
+            queries = [None] * len(stocks)
+        pairs = {}
+        for symbol, query in zip(stocks, queries):
+            if symbol and symbol not in pairs:
+                pairs[symbol] = query
+        stocks = list(pairs)
+        if all(query is not None for query in pairs.values()):
+            ctx.session.state["search_queries"] = list(pairs.values())
 
         if not stocks:
             logger.warning(f"[{self.name}] No stocks extracted from input.")
@@ -111,12 +130,13 @@ class StockInsightsAgent(BaseAgent):
         # Step 2: Run news and market agents in parallel
         logger.info(f"[{self.name}] Step 2: Fetching news and market data in parallel")
         
-        # Create parallel agent with the stocks already in context
+        # Create parallel agent with the stocks already in context. Shallow copies take the
+        # parent link, while the stores and caches (which hold locks) stay shared across runs.
         parallel = ParallelAgent(
             name="FetchDataInParallel",
             sub_agents=[
-                self.news_agent.model_copy(deep=True),
-                self.market_agent.model_copy(deep=True)
+                self.news_agent.model_copy(),
+                self.market_agent.model_copy()
             ],
         )
         
@@ -128,6 +148,15 @@ class StockInsightsAgent(BaseAgent):
         async for event in self.analytics_agent.run_async(ctx):
             yield event
 
+        # Optional: correlation, clustering and weights across the requested stocks
+        if self.portfolio_agent is not None and len(stocks) > 1:
+            logger.info(f"[{self.name}] Running portfolio analytics")
+            async for event in self.portfolio_agent.run_async(ctx):
+                yield event
+        else:
+            # Skipped: drop any analysis left in the session by an earlier request
+            ctx.session.state.pop("portfolio_analysis", None)
+
         logger.info(f"[{self.name}] Stock analysis flow completed")
 
          # Step 4: Run analytics agent with all collected data
@@ -3,6 +3,8 @@ import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import List
+from agents.llm_cache import cache_before_model, cache_after_model
+from agents.gemini_client import ScheduledGemini
 load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY", "")
 
@@ -69,7 +71,8 @@ class StockExtractionOutput(BaseModel):
 stock_parser = LlmAgent(
     name="StockSymbolExtractor",
     # model="gemini-1.5-flash",
-    model="gemini-2.5-flash",
+    # Shared client and quota scheduler; extraction is interactive and served ahead of reports
+    model=ScheduledGemini(model="gemini-2.5-flash"),
     instruction=instruction,
 #     instruction="""
 # You are a specialized stock symbol extraction agent. Your sole purpose is to identify and return stock ticker symbols from user input.
@@ -106,5 +109,8 @@ stock_parser = LlmAgent(
 # """,
     input_schema=None,
     output_schema=StockExtractionOutput,
+    # Identical extraction requests are answered from the response cache
+    before_model_callback=cache_before_model,
+    after_model_callback=cache_after_model,
 )
 
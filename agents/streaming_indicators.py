@@ -0,0 +1,428 @@
+import math
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+from agents.indicators import (
+    SMA_PERIODS, EMA_PERIODS, RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL,
+    BOLLINGER_PERIOD, BOLLINGER_WIDTH, ATR_PERIOD, VOLUME_AVG_PERIOD, RANGE_PERIOD,
+    min_window_count,
+)
+
+# Streaming counterparts of agents.indicators. Each object consumes one bar at a
+# time in O(1) (amortised for rolling extremes), keeps JSON-serialisable state via
+# to_dict()/from_dict(), and performs the same floating point operations in the
+# same order as the batch engine so the outputs are identical.
+#
+# update() must be called for every bar on the timeline, with None (or NaN) for
+# missing values, so that windowed indicators advance over gaps.
+
+
+def _missing(value) -> bool:
+    return value is None or value != value
+
+
+class StreamingEMA:
+    def __init__(self, n: int):
+        self.n = n
+        self.alpha = 2.0 / (n + 1)
+        self.state: Optional[float] = None
+        self.seen = 0
+
+    def update(self, value: Optional[float]) -> Optional[float]:
+        if not _missing(value):
+            if self.state is None:
+                self.state = value
+            else:
+                self.state = self.alpha * value + (1.0 - self.alpha) * self.state
+            self.seen += 1
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.state if self.seen >= self.n else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "state": self.state, "seen": self.seen}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingEMA":
+        obj = cls(data["n"])
+        obj.state, obj.seen = data["state"], data["seen"]
+        return obj
+
+
+class StreamingWilder:
+    """Wilder smoothing: mean of the first `n` values, then (prev * (n - 1) + v) / n"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.total = 0.0
+        self.state: Optional[float] = None
+        self.seen = 0
+
+    def update(self, value: Optional[float]) -> Optional[float]:
+        if not _missing(value):
+            self.seen += 1
+            if self.seen <= self.n:
+                self.total = self.total + value
+            if self.seen == self.n:
+                self.state = self.total / self.n
+            elif self.seen > self.n:
+                self.state = (self.state * (self.n - 1) + value) / self.n
+        return self.state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "total": self.total, "state": self.state, "seen": self.seen}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingWilder":
+        obj = cls(data["n"])
+        obj.total, obj.state, obj.seen = data["total"], data["state"], data["seen"]
+        return obj
+
+
+class StreamingRSI:
+    def __init__(self, n: int = RSI_PERIOD):
+        self.n = n
+        self.prev_close: Optional[float] = None
+        self.gains = StreamingWilder(n)
+        self.losses = StreamingWilder(n)
+
+    def update(self, close: Optional[float]) -> Optional[float]:
+        if not _missing(close):
+            if self.prev_close is not None:
+                change = close - self.prev_close
+                self.gains.update(max(change, 0.0))
+                self.losses.update(max(-change, 0.0))
+            self.prev_close = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        avg_gain, avg_loss = self.gains.state, self.losses.state
+        if avg_gain is None:
+            return None
+        if avg_loss == 0.0:
+            return 100.0 if avg_gain > 0.0 else 50.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "prev_close": self.prev_close,
+                "gains": self.gains.to_dict(), "losses": self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingRSI":
+        obj = cls(data["n"])
+        obj.prev_close = data["prev_close"]
+        obj.gains = StreamingWilder.from_dict(data["gains"])
+        obj.losses = StreamingWilder.from_dict(data["losses"])
+        return obj
+
+
+class StreamingMACD:
+    def __init__(self, fast: int = MACD_FAST, slow: int = MACD_SLOW, signal: int = MACD_SIGNAL):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.line: Optional[float] = None
+
+    def update(self, close: Optional[float]) -> Dict[str, Optional[float]]:
+        if not _missing(close):
+            fast, slow = self.fast.update(close), self.slow.update(close)
+            if fast is not None and slow is not None:
+                self.line = fast - slow
+                self.signal.update(self.line)
+        return self.value
+
+    @property
+    def value(self) -> Dict[str, Optional[float]]:
+        signal = self.signal.value
+        histogram = self.line - signal if self.line is not None and signal is not None else None
+        return {"macd": self.line, "macd_signal": signal, "macd_histogram": histogram}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(),
+                "signal": self.signal.to_dict(), "line": self.line}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingMACD":
+        obj = cls()
+        obj.fast = StreamingEMA.from_dict(data["fast"])
+        obj.slow = StreamingEMA.from_dict(data["slow"])
+        obj.signal = StreamingEMA.from_dict(data["signal"])
+        obj.line = data["line"]
+        return obj
+
+
+class RollingMean:
+    """
+    Mean (and optionally population std) over the valid values of the last `n`
+    bars, kept as differences of running cumulative sums.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.total = 0.0
+        self.squares = 0.0
+        self.count = 0.0
+        # Cumulative sums as of each of the last n bars, oldest first
+        self.history: deque = deque(maxlen=n)
+        # (sum, sum of squares, count) over the current window
+        self.window: Optional[tuple] = None
+
+    def update(self, value: Optional[float]) -> Optional[float]:
+        filled = 0.0 if _missing(value) else value
+        if len(self.history) == self.n:
+            base_total, base_squares, base_count = self.history[0]
+        else:
+            base_total = base_squares = base_count = 0.0
+        self.total = self.total + filled
+        self.squares = self.squares + filled * filled
+        self.count = self.count + (0.0 if _missing(value) else 1.0)
+        self.history.append((self.total, self.squares, self.count))
+
+        self.window = (self.total - base_total, self.squares - base_squares, self.count - base_count)
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.window is None or self.window[2] < min_window_count(self.n):
+            return None
+        return self.window[0] / self.window[2]
+
+    @property
+    def std(self) -> Optional[float]:
+        if self.window is None or self.window[2] < min_window_count(self.n):
+            return None
+        total, squares, count = self.window
+        mean = total / count
+        return math.sqrt(max(squares / count - mean * mean, 0.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "total": self.total, "squares": self.squares, "count": self.count,
+                "history": [list(h) for h in self.history],
+                "window": list(self.window) if self.window else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingMean":
+        obj = cls(data["n"])
+        obj.total, obj.squares, obj.count = data["total"], data["squares"], data["count"]
+        obj.history.extend(tuple(h) for h in data["history"])
+        obj.window = tuple(data["window"]) if data["window"] else None
+        return obj
+
+
+class RollingExtreme:
+    """Rolling max or min over the last `n` bars using a monotonic deque"""
+
+    def __init__(self, n: int, mode: str = "max"):
+        if mode not in ("max", "min"):
+            raise ValueError("mode must be 'max' or 'min'")
+        self.n = n
+        self.mode = mode
+        self.t = -1
+        # (bar index, value) pairs, values monotonically decreasing for max
+        self.window: deque = deque()
+
+    def _dominates(self, new: float, old: float) -> bool:
+        return new >= old if self.mode == "max" else new <= old
+
+    def update(self, value: Optional[float]) -> Optional[float]:
+        self.t += 1
+        if not _missing(value):
+            while self.window and self._dominates(value, self.window[-1][1]):
+                self.window.pop()
+            self.window.append((self.t, value))
+        while self.window and self.window[0][0] <= self.t - self.n:
+            self.window.popleft()
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.window[0][1] if self.window else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "mode": self.mode, "t": self.t, "window": [list(w) for w in self.window]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingExtreme":
+        obj = cls(data["n"], data["mode"])
+        obj.t = data["t"]
+        obj.window.extend(tuple(w) for w in data["window"])
+        return obj
+
+
+class StreamingATR:
+    def __init__(self, n: int = ATR_PERIOD):
+        self.n = n
+        self.prev_close: Optional[float] = None
+        self.smoother = StreamingWilder(n)
+
+    def update(self, high: Optional[float], low: Optional[float], close: Optional[float]) -> Optional[float]:
+        if not (_missing(high) or _missing(low) or _missing(close)):
+            true_range = high - low
+            if self.prev_close is not None:
+                true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+            self.smoother.update(true_range)
+        if not _missing(close):
+            self.prev_close = close
+        return self.smoother.state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "prev_close": self.prev_close, "smoother": self.smoother.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingATR":
+        obj = cls(data["n"])
+        obj.prev_close = data["prev_close"]
+        obj.smoother = StreamingWilder.from_dict(data["smoother"])
+        return obj
+
+
+class StreamingOBV:
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.state: Optional[float] = None
+
+    def update(self, close: Optional[float], volume: Optional[float]) -> Optional[float]:
+        if not _missing(close):
+            if self.state is None:
+                self.state = 0.0
+            elif self.prev_close is not None and not _missing(volume):
+                direction = 1.0 if close > self.prev_close else -1.0 if close < self.prev_close else 0.0
+                self.state = self.state + direction * volume
+            self.prev_close = close
+        return self.state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"prev_close": self.prev_close, "state": self.state}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingOBV":
+        obj = cls()
+        obj.prev_close, obj.state = data["prev_close"], data["state"]
+        return obj
+
+
+class TickerIndicatorState:
+    """The full AnalyticsAgent indicator set for one ticker, updated bar by bar"""
+
+    def __init__(self):
+        self.sma = {n: RollingMean(n) for n in SMA_PERIODS}
+        self.ema = {n: StreamingEMA(n) for n in EMA_PERIODS}
+        self.rsi = StreamingRSI(RSI_PERIOD)
+        self.macd = StreamingMACD()
+        self.bollinger = RollingMean(BOLLINGER_PERIOD)
+        self.atr = StreamingATR(ATR_PERIOD)
+        self.obv = StreamingOBV()
+        self.volume_avg = RollingMean(VOLUME_AVG_PERIOD)
+        self.high = RollingExtreme(RANGE_PERIOD, "max")
+        self.low = RollingExtreme(RANGE_PERIOD, "min")
+        self.last_date: Optional[str] = None
+
+    def update(self, bar: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Consume one bar ({"Date", "Open", "High", "Low", "Close", "Volume"}) and return all indicators"""
+        close, high, low, volume = bar.get("Close"), bar.get("High"), bar.get("Low"), bar.get("Volume")
+        for indicator in self.sma.values():
+            indicator.update(close)
+        for indicator in self.ema.values():
+            indicator.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.atr.update(high, low, close)
+        self.obv.update(close, volume)
+        self.volume_avg.update(volume)
+        self.high.update(high)
+        self.low.update(low)
+        if bar.get("Date") is not None:
+            self.last_date = str(bar["Date"])
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        out: Dict[str, Optional[float]] = {}
+        for n, indicator in self.sma.items():
+            out[f"sma_{n}"] = indicator.value
+        for n, indicator in self.ema.items():
+            out[f"ema_{n}"] = indicator.value
+        out[f"rsi_{RSI_PERIOD}"] = self.rsi.value
+        out.update(self.macd.value)
+
+        middle, std = self.bollinger.value, self.bollinger.std
+        out["bollinger_middle"] = middle
+        out["bollinger_upper"] = middle + BOLLINGER_WIDTH * std if middle is not None else None
+        out["bollinger_lower"] = middle - BOLLINGER_WIDTH * std if middle is not None else None
+
+        out[f"atr_{ATR_PERIOD}"] = self.atr.smoother.state
+        out["obv"] = self.obv.state
+        out[f"volume_avg_{VOLUME_AVG_PERIOD}"] = self.volume_avg.value
+        out[f"high_{RANGE_PERIOD}"] = self.high.value
+        out[f"low_{RANGE_PERIOD}"] = self.low.value
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sma": {str(n): i.to_dict() for n, i in self.sma.items()},
+            "ema": {str(n): i.to_dict() for n, i in self.ema.items()},
+            "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(),
+            "bollinger": self.bollinger.to_dict(),
+            "atr": self.atr.to_dict(),
+            "obv": self.obv.to_dict(),
+            "volume_avg": self.volume_avg.to_dict(),
+            "high": self.high.to_dict(),
+            "low": self.low.to_dict(),
+            "last_date": self.last_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TickerIndicatorState":
+        obj = cls()
+        obj.sma = {int(n): RollingMean.from_dict(d) for n, d in data["sma"].items()}
+        obj.ema = {int(n): StreamingEMA.from_dict(d) for n, d in data["ema"].items()}
+        obj.rsi = StreamingRSI.from_dict(data["rsi"])
+        obj.macd = StreamingMACD.from_dict(data["macd"])
+        obj.bollinger = RollingMean.from_dict(data["bollinger"])
+        obj.atr = StreamingATR.from_dict(data["atr"])
+        obj.obv = StreamingOBV.from_dict(data["obv"])
+        obj.volume_avg = RollingMean.from_dict(data["volume_avg"])
+        obj.high = RollingExtreme.from_dict(data["high"])
+        obj.low = RollingExtreme.from_dict(data["low"])
+        obj.last_date = data["last_date"]
+        return obj
+
+
+class IndicatorBook:
+    """Streaming indicator state for many tickers, serialisable as one dict"""
+
+    def __init__(self, states: Optional[Dict[str, TickerIndicatorState]] = None):
+        self.states: Dict[str, TickerIndicatorState] = states or {}
+
+    def update(self, symbol: str, bar: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = TickerIndicatorState()
+        return state.update(bar)
+
+    def update_from_records(self, symbol: str, records: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+        """
+        Feed `price_data` records (keys like "Close_MSFT") newer than the last bar
+        already consumed for this symbol. Records must be in date order.
+        """
+        state = self.states.get(symbol)
+        last_date = state.last_date if state else None
+        snapshot = state.snapshot() if state else {}
+        for row in records:
+            if last_date is not None and str(row.get("Date")) <= last_date:
+                continue
+            bar = {field: row.get(f"{field}_{symbol}") for field in ("Open", "High", "Low", "Close", "Volume")}
+            bar["Date"] = row.get("Date")
+            snapshot = self.update(symbol, bar)
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {symbol: state.to_dict() for symbol, state in self.states.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorBook":
+        return cls({symbol: TickerIndicatorState.from_dict(d) for symbol, d in (data or {}).items()})
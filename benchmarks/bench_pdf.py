@@ -0,0 +1,69 @@
+"""
+Benchmark report PDF rendering: inline, versus PdfRenderer for a single
+report (laid out in a thread) and for a concurrent batch (spread across the
+warm worker pool). The pool can only win with more than one CPU.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pdf --reports 16 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from agents.pdf_renderer import PdfRenderer, render_pdf
+from agents.report_generator_agent import REPORT_SECTIONS
+
+
+def synthetic_report(paragraphs: int = 4) -> str:
+    body = ("Revenue grew 12% year over year while operating margin expanded 150 basis points, "
+            "supported by pricing and a richer product mix. ") * 6
+    return "\n\n".join(
+        f"{i + 1}. {title}\n\n" + "\n\n".join(body for _ in range(paragraphs))
+        for i, (title, _, _) in enumerate(REPORT_SECTIONS)
+    )
+
+
+async def _render_all(renderer: PdfRenderer, content: str, reports: int, out_dir: str):
+    return await asyncio.gather(*(
+        renderer.render(content, ["AAPL", "MSFT"], "2025-01-01", os.path.join(out_dir, f"report_{i}.pdf"))
+        for i in range(reports)
+    ))
+
+
+async def _render_single(renderer: PdfRenderer, content: str, reports: int, out_dir: str):
+    for i in range(reports):
+        await renderer.render(content, ["AAPL", "MSFT"], "2025-01-01", os.path.join(out_dir, f"single_{i}.pdf"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    content = synthetic_report()
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers")
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        for i in range(args.reports):
+            size = len(render_pdf(content, ["AAPL", "MSFT"], "2025-01-01", os.path.join(out_dir, f"inline_{i}.pdf")))
+        inline = time.perf_counter() - started
+        print(f"inline: {args.reports} reports in {inline:.2f}s ({size} bytes each)")
+
+        renderer = PdfRenderer(max_workers=args.workers)
+        started = time.perf_counter()
+        asyncio.run(_render_single(renderer, content, args.reports, out_dir))
+        elapsed = time.perf_counter() - started
+        print(f"one at a time: {args.reports} reports in {elapsed:.2f}s, {inline / elapsed:.1f}x inline")
+        # The first batch pays for worker start-up; later batches hit warm workers
+        for label in ("batch (cold pool)", "batch (warm pool)"):
+            started = time.perf_counter()
+            asyncio.run(_render_all(renderer, content, args.reports, out_dir))
+            elapsed = time.perf_counter() - started
+            print(f"{label}: {args.reports} reports in {elapsed:.2f}s, {inline / elapsed:.1f}x inline")
+        renderer.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+End-to-end benchmark of the agent pipeline on deterministic offline fixtures.
+
+Drives the full StockInsightsAgent pipeline (root_agent, wired to the fixtures
+in benchmarks.fixtures) and each agent on its own, at several ticker counts and
+concurrency levels. Reports p50/p95/p99 latency, requests/sec, peak RSS (worker
+processes included) and tracemalloc allocations per stage, and writes the
+results as JSON so runs can be compared over time.
+
+Stage requests start from the session state a pipeline run leaves behind, so
+each agent sees realistic inputs. Caches (price store, fundamentals, charts)
+are warm after the first request; the LLM response cache is off.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --tickers 1 5 20 --concurrency 1 4 16 --requests 16
+    python -m benchmarks.bench_pipeline --stages analytics report --llm-latency 2 --compare old.json
+"""
+import os
+import sys
+import copy
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import io
+import logging
+import resource
+import shutil
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+# Every store the agents write (prices, blobs, caches, reports) goes to a scratch
+# directory; the default paths are read when the agents are imported
+_SCRATCH = tempfile.mkdtemp(prefix="bench_pipeline_")
+os.environ["STOCK_DATA_DIR"] = os.path.join(_SCRATCH, "data")
+os.environ["REPORTS_DIR"] = os.path.join(_SCRATCH, "reports")
+
+import numpy as np  # noqa: E402
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from benchmarks.fixtures import offline_agents, tickers  # noqa: E402
+
+STAGES = ("parser", "news", "market", "analytics", "portfolio", "report", "pipeline")
+# Stages whose request is the user's message rather than state left by earlier stages
+MESSAGE_STAGES = ("parser", "pipeline")
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+APP_NAME = "bench_pipeline"
+
+
+class _CapturingRunner(Runner):
+    """Runner that keeps each invocation's live session, whose state the agents mutate in place"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sessions = {}
+
+    def _new_invocation_context(self, session, **kwargs):
+        self.sessions[session.id] = session
+        return super()._new_invocation_context(session, **kwargs)
+
+
+class RssSampler:
+    """
+    Peak resident set size while active, sampled from /proc every few ms. The
+    peak covers this process and every process it started (the fork server
+    and the chart, PDF, sentiment and analytics pool workers), and
+    `peak_children` is those descendants alone. Pages a worker still shares
+    with the fork server count once per process, so the sum overstates the
+    memory the workers use together.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.peak_children = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _rss(pid: int) -> int:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def _descendants(pid: int) -> List[int]:
+        """Every process below `pid`, found by parent pid in /proc/*/stat"""
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # "pid (comm) state ppid ...", where comm may contain spaces and parentheses
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        found, pending = [], [pid]
+        while pending:
+            below = children.get(pending.pop(), [])
+            found.extend(below)
+            pending.extend(below)
+        return found
+
+    @classmethod
+    def current(cls) -> Tuple[int, int]:
+        """Resident bytes of (this process, its descendants)"""
+        try:
+            own = cls._rss(os.getpid())
+        except (OSError, ValueError):
+            # Not Linux: lifetime maxima, and for children only the largest one that has exited
+            # (bytes on macOS, KiB elsewhere)
+            scale = 1 if sys.platform == "darwin" else 1024
+            return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+        children = 0
+        for pid in cls._descendants(os.getpid()):
+            try:
+                children += cls._rss(pid)
+            except (OSError, ValueError):
+                # Exited since the scan
+                continue
+        return own, children
+
+    def _update(self):
+        own, children = self.current()
+        self.peak = max(self.peak, own + children)
+        self.peak_children = max(self.peak_children, children)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def __enter__(self):
+        self.peak = self.peak_children = 0
+        self._update()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._update()
+
+
+def _message(symbols: List[str]) -> types.Content:
+    return types.Content(role="user", parts=[types.Part(text=f"How are {', '.join(symbols)} doing?")])
+
+
+async def _run_once(runner: _CapturingRunner, state: Dict[str, Any], symbols: List[str]) -> Dict[str, Any]:
+    """One request on a fresh session; returns the session state it leaves behind"""
+    session = await runner.session_service.create_session(
+        app_name=APP_NAME, user_id="bench", state=copy.deepcopy(state)
+    )
+    async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=_message(symbols)):
+        pass
+    live = runner.sessions.pop(session.id, session)
+    return dict(live.state)
+
+
+async def _load(runner: _CapturingRunner, state: Dict[str, Any], symbols: List[str], requests: int,
+                concurrency: int) -> Dict[str, Any]:
+    """`requests` requests with at most `concurrency` in flight; latency percentiles and throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def request():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await _run_once(runner, state, symbols)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "rps": round(requests / elapsed, 3),
+        "wall_s": round(elapsed, 3),
+    }
+
+
+async def _allocations(runner: _CapturingRunner, state: Dict[str, Any], symbols: List[str],
+                       top: int = 5) -> Dict[str, Any]:
+    """Python allocations of one request under tracemalloc (worker processes are not traced)"""
+    tracemalloc.start(10)
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await _run_once(runner, state, symbols)
+        current, peak = tracemalloc.get_traced_memory()
+        diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kb": round((peak - baseline) / 1024, 1),
+        "alloc_retained_kb": round((current - baseline) / 1024, 1),
+        "alloc_blocks": sum(stat.count_diff for stat in diff if stat.count_diff > 0),
+        "top_allocations": [
+            {"site": str(stat.traceback[0]), "size_kb": round(stat.size_diff / 1024, 1), "blocks": stat.count_diff}
+            for stat in sorted(diff, key=lambda s: -s.size_diff)[:top]
+        ],
+    }
+
+
+async def benchmark(args) -> Dict[str, Any]:
+    agents = offline_agents(llm_latency=args.llm_latency, io_latency=args.io_latency)
+    runners = {
+        stage: _CapturingRunner(app_name=APP_NAME, agent=agents[stage], session_service=InMemorySessionService())
+        for stage in args.stages
+    }
+    seeder = runners.get("pipeline") or _CapturingRunner(
+        app_name=APP_NAME, agent=agents["pipeline"], session_service=InMemorySessionService()
+    )
+
+    results, allocations = [], []
+    for count in args.tickers:
+        symbols = tickers(count)
+        # Inputs for the single-agent stages: the state a full pipeline run leaves behind
+        seed = await _run_once(seeder, {}, symbols)
+        seed.pop("generated_report", None)
+
+        for stage in args.stages:
+            state = {} if stage in MESSAGE_STAGES else seed
+            runner = runners[stage]
+            for _ in range(args.warmup):
+                await _run_once(runner, state, symbols)
+            for concurrency in args.concurrency:
+                with RssSampler() as rss:
+                    row = await _load(runner, state, symbols, args.requests, concurrency)
+                row = {"stage": stage, "tickers": count, "concurrency": concurrency, **row,
+                       "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+                       "peak_rss_children_mb": round(rss.peak_children / 2 ** 20, 1)}
+                results.append(row)
+                _print_row(row)
+            if not args.no_tracemalloc:
+                allocations.append({"stage": stage, "tickers": count, **await _allocations(runner, state, symbols)})
+
+    agents["report"].pdf_renderer.shutdown()
+    agents["report"].chart_renderer.shutdown()
+    return {"results": results, "allocations": allocations}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _print_row(row: Dict[str, Any]):
+    print(f"{row['stage']:>10} tickers={row['tickers']:<3} conc={row['concurrency']:<3} "
+          f"p50={row['p50_ms']:>9.1f}ms p95={row['p95_ms']:>9.1f}ms p99={row['p99_ms']:>9.1f}ms "
+          f"rps={row['rps']:>8.2f} rss={row['peak_rss_mb']:>7.1f}MB "
+          f"(workers {row.get('peak_rss_children_mb', 0):>7.1f}MB) errors={row['errors']}", file=sys.__stdout__)
+
+
+def compare(current: Dict[str, Any], previous_path: str):
+    """Print latency and throughput changes against an earlier results file"""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(r["stage"], r["tickers"], r["concurrency"]): r for r in previous.get("results", [])}
+    print(f"\nChange vs {previous_path} ({previous.get('meta', {}).get('git_commit')}):")
+    for row in current["results"]:
+        old = before.get((row["stage"], row["tickers"], row["concurrency"]))
+        if not old:
+            continue
+        deltas = [
+            f"{key} {100 * (row[key] - old[key]) / old[key]:+.1f}%"
+            for key in ("p50_ms", "p95_ms", "rps") if old.get(key)
+        ]
+        print(f"{row['stage']:>10} tickers={row['tickers']:<3} conc={row['concurrency']:<3} {'  '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--tickers", nargs="+", type=int, default=[1, 5, 20])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=16, help="requests per stage, ticker count and concurrency")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--io-latency", type=float, default=0.0, help="simulated seconds per market/news fetch")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip the allocation pass")
+    parser.add_argument("--output", help="results file (default benchmarks/results/pipeline_<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    # Agents print progress, and ADK's tracing logs a harmless context-detach error for every
+    # ParallelAgent run; keep the benchmark output readable
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            measured = asyncio.run(benchmark(args))
+    finally:
+        shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+    run = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        **measured,
+    }
+    for entry in run["allocations"]:
+        print(f"{entry['stage']:>10} tickers={entry['tickers']:<3} alloc peak={entry['alloc_peak_kb']:>10.1f}KB "
+              f"retained={entry['alloc_retained_kb']:>10.1f}KB blocks={entry['alloc_blocks']}")
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        compare(run, args.compare)
+
+
+if __name__ == "__main__":
+    main()
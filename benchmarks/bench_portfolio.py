@@ -0,0 +1,103 @@
+"""
+Benchmark portfolio analytics (shrunk covariance, clustering, weights) on synthetic prices.
+
+Also checks the weights: every set sums to 1 and is non-negative, and risk
+parity equalises risk contributions. Exits non-zero if a check fails.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_portfolio --tickers 300 --bars 252
+    python -m benchmarks.bench_portfolio --tickers 500 --gaps 0.1
+"""
+import sys
+import argparse
+import time
+
+from typing import List
+
+import numpy as np
+
+from agents.portfolio import analyze_portfolio, min_variance_weights, risk_parity_weights, shrunk_covariance
+from agents.risk import daily_returns
+
+
+def factor_prices(tickers: int, bars: int, factors: int = 5, seed: int = 3) -> np.ndarray:
+    """Closes driven by a market factor plus a few sector factors, with some near-duplicate pairs"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, (bars, 1))
+    sector = rng.normal(0, 0.008, (bars, factors))
+    membership = rng.integers(0, factors, tickers)
+    returns = market * rng.uniform(0.6, 1.4, tickers) + sector[:, membership] + rng.normal(0, 0.012, (bars, tickers))
+    # Every tenth ticker closely tracks its neighbour (e.g. two share classes)
+    returns[:, 1::10] = returns[:, 0::10][:, :returns[:, 1::10].shape[1]] + rng.normal(0, 0.002, (bars, len(range(1, tickers, 10))))
+    return (100 * np.cumprod(1 + returns, axis=0)).T
+
+
+def with_gaps(close: np.ndarray, fraction: float, seed: int = 5) -> np.ndarray:
+    """Blank out `fraction` of the bars at random, plus a late listing for every seventh ticker"""
+    rng = np.random.default_rng(seed)
+    close = close.copy()
+    close[rng.random(close.shape) < fraction] = np.nan
+    close[::7, :close.shape[1] // 3] = np.nan
+    return close
+
+
+def check_weights(name: str, weights: np.ndarray, covariance: np.ndarray, equal_risk: bool = False,
+                  tolerance: float = 1e-6) -> List[str]:
+    """Failures of one weight vector: sums to 1, non-negative and, for risk parity, equal risk contributions"""
+    failures = []
+    if not np.isfinite(weights).all():
+        return [f"{name}: non-finite weights"]
+    if abs(weights.sum() - 1.0) > tolerance:
+        failures.append(f"{name}: weights sum to {weights.sum():.8f}")
+    if (weights < 0).any():
+        failures.append(f"{name}: {int((weights < 0).sum())} negative weights (min {weights.min():.3g})")
+    if equal_risk:
+        contributions = weights * (covariance @ weights)
+        shares = contributions / contributions.sum()
+        spread = np.abs(shares * len(weights) - 1.0).max()
+        if spread > 1e-4:
+            failures.append(f"{name}: risk contributions differ by up to {100 * spread:.4f}% of the equal share")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--bars", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--gaps", type=float, default=0.0, help="fraction of bars to blank out at random")
+    args = parser.parse_args()
+
+    close = factor_prices(args.tickers, args.bars)
+    if args.gaps:
+        close = with_gaps(close, args.gaps)
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = analyze_portfolio(symbols, close)
+        timings.append(time.perf_counter() - started)
+    print(f"{args.tickers} tickers x {args.bars} bars: best {min(timings):.3f}s")
+    print(f"shrinkage {result['shrinkage']}, redundant pairs {len(result['redundant_pairs'])}, "
+          f"volatility {result['volatility']}")
+
+    # Risk parity should equalise every holding's contribution to variance
+    covariance, _ = shrunk_covariance(daily_returns(close).T)
+    weights = risk_parity_weights(covariance)
+    contributions = weights * (covariance @ weights)
+    print(f"risk-parity contribution spread (max/min): {contributions.max() / contributions.min():.6f}")
+
+    failures = check_weights("risk_parity", weights, covariance, equal_risk=True)
+    failures += check_weights("min_variance", min_variance_weights(covariance), covariance)
+    for name, reported in result["weights"].items():
+        # Reported weights are rounded to 4 places
+        failures += check_weights(f"{name} (reported)", np.array(list(reported.values())), covariance,
+                                  tolerance=5e-5 * len(reported))
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("weight checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check the streaming indicators against the vectorised engine.
+
+Feeds random OHLCV series (with gaps, a long outage and a late listing) bar by
+bar through TickerIndicatorState and compares every output with
+agents.indicators.compute_indicators at every bar, warm-up included: a bar
+the batch engine leaves NaN must stream as None, and every other bar must
+match. Halfway through, the state is round-tripped through JSON as it would be
+between runs. Exits non-zero on any mismatch.
+
+Usage (from the repository root):
+    python -m benchmarks.check_streaming_parity --tickers 20 --bars 600
+"""
+import sys
+import json
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from agents.indicators import compute_indicators
+from agents.streaming_indicators import TickerIndicatorState
+from benchmarks.bench_indicators import synthetic_prices
+
+
+def _mismatch(batch: float, streamed, tolerance: float) -> bool:
+    if np.isnan(batch):
+        return streamed is not None and streamed == streamed
+    if streamed is None or streamed != streamed:
+        return True
+    return abs(streamed - batch) > tolerance * max(1.0, abs(batch))
+
+
+def check(prices: Dict[str, np.ndarray], tolerance: float = 0.0) -> Dict[str, List[str]]:
+    """{indicator: [first few mismatch descriptions]} over every ticker and bar"""
+    expected = compute_indicators(prices)
+    tickers, bars = prices["Close"].shape
+    failures: Dict[str, List[str]] = {}
+    for i in range(tickers):
+        state = TickerIndicatorState()
+        for t in range(bars):
+            if t == bars // 2:
+                state = TickerIndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+            snapshot = state.update({field: float(prices[field][i, t]) for field in prices})
+            for name, values in expected.items():
+                if _mismatch(values[i, t], snapshot[name], tolerance):
+                    failures.setdefault(name, []).append(
+                        f"ticker {i} bar {t}: batch {values[i, t]!r}, streamed {snapshot[name]!r}"
+                    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=600)
+    parser.add_argument("--missing", type=float, default=0.03, help="fraction of bars knocked out as NaN")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--tolerance", type=float, default=0.0, help="relative tolerance (0: bit-identical)")
+    args = parser.parse_args()
+
+    prices = synthetic_prices(args.tickers, args.bars, missing=args.missing, seed=args.seed)
+    # A long outage on one ticker and a late listing on another
+    if args.tickers > 1:
+        for field in prices.values():
+            field[0, args.bars // 4:args.bars // 4 + 60] = np.nan
+            field[1, :args.bars // 5] = np.nan
+
+    failures = check(prices, args.tolerance)
+    names = sorted(compute_indicators({k: v[:1, :2] for k, v in prices.items()}))
+    for name in names:
+        found = failures.get(name, [])
+        print(f"{name:>20}: {'ok' if not found else f'{len(found)} mismatches, first: {found[0]}'}")
+    if failures:
+        sys.exit(1)
+    print(f"{len(names)} indicators match over {args.tickers} tickers x {args.bars} bars")
+
+
+if __name__ == "__main__":
+    main()
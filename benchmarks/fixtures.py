@@ -0,0 +1,229 @@
+"""
+Deterministic offline stand-ins for the pipeline's network calls: yfinance
+history and fundamentals, NewsAPI, Yahoo symbol search and Gemini. Agents are
+subclassed at their fetch seams only, so everything downstream of a fetch runs
+the production code. Data is seeded by symbol, so a ticker always gets the
+same history, fundamentals and headlines.
+"""
+import re
+import json
+import time
+import zlib
+import asyncio
+from datetime import date
+from typing import Dict, List, Any, AsyncGenerator, Optional
+
+import numpy as np
+import pandas as pd
+from google.adk.agents import BaseAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from agents.market_data_agent import MarketDataAgent
+from agents.news_scraper_agent import NewsScraperAgent
+from agents.analytics_agent import AnalyticsAgent
+from agents.portfolio_agent import PortfolioAnalyticsAgent
+from agents.report_generator_agent import ReportGeneratorAgent
+from agents.stock_insights_agent import StockInsightsAgent
+from agents.stock_parser_agent import stock_parser
+from agents.gemini_client import GeminiClient, QuotaScheduler
+from benchmarks.bench_pdf import synthetic_report
+
+TICKER_PATTERN = re.compile(r"\bTK\d{3}\b")
+HISTORY_BARS = 260
+HEADLINES = [
+    "{name} beats earnings estimates as revenue grows",
+    "{name} shares fall after weak guidance",
+    "Analysts upgrade {name} on strong demand",
+    "{name} faces regulatory probe over pricing",
+    "{name} announces share buyback and raises dividend",
+    "{name} stock slips as margins narrow",
+    "{name} wins major contract, shares rally",
+]
+
+
+def tickers(count: int) -> List[str]:
+    return [f"TK{i:03d}" for i in range(count)]
+
+
+def _rng(key: str) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(key.encode("utf-8")))
+
+
+def synthetic_history(symbol: str, bars: int = HISTORY_BARS) -> pd.DataFrame:
+    """Random-walk daily OHLCV ending on the previous business day, as `yf.download` returns it"""
+    rng = _rng(symbol)
+    dates = pd.bdate_range(end=pd.Timestamp(date.today()) - pd.offsets.BDay(1), periods=bars)
+    close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.018, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars))
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": close * (1 + rng.normal(0, 0.004, bars)),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(200_000, 20_000_000, bars).astype(float),
+    })
+
+
+def synthetic_fundamentals(symbol: str) -> Dict[str, Any]:
+    """The subset of `ticker.info` the market data agent reads"""
+    rng = _rng(f"{symbol}:info")
+    shares = float(10 ** rng.uniform(8, 10))
+    return {
+        "trailingEps": round(float(rng.uniform(-1, 12)), 2),
+        "bookValue": round(float(rng.uniform(5, 80)), 2),
+        "sharesOutstanding": shares,
+        "forwardPE": round(float(rng.uniform(8, 45)), 2),
+        "beta": round(float(rng.uniform(0.5, 1.8)), 2),
+        "dividendRate": round(float(rng.uniform(0, 3)), 2),
+        "dividendYield": round(float(rng.uniform(0, 0.04)), 4),
+        "enterpriseValue": shares * float(rng.uniform(20, 400)),
+        "sector": ["Technology", "Healthcare", "Financials", "Energy", "Industrials"][int(rng.integers(5))],
+        "industry": "Synthetic",
+    }
+
+
+def synthetic_articles(query: str, count: int = 5) -> List[Dict[str, Any]]:
+    """NewsAPI-shaped articles for a search query"""
+    rng = _rng(f"{query}:news")
+    name = query.split('"')[1] if '"' in query else query
+    articles = []
+    for i in range(count):
+        title = HEADLINES[int(rng.integers(len(HEADLINES)))].format(name=name)
+        articles.append({
+            "title": f"{title} ({i + 1})",
+            "description": f"{title}. Investors weighed the news against the broader market.",
+            "url": f"https://news.example.com/{zlib.crc32(query.encode('utf-8'))}/{i}",
+            "publishedAt": f"{date.today().isoformat()}T{9 + i:02d}:00:00Z",
+            "source": ["Wire", "Daily", "Markets"][i % 3],
+        })
+    return articles
+
+
+class OfflineMarketDataAgent(MarketDataAgent):
+    """Fixture history and fundamentals; `io_latency` seconds stand in for each remote call"""
+    io_latency: float = 0.0
+
+    def _download_history(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        time.sleep(self.io_latency)
+        return {symbol: synthetic_history(symbol) for symbol in symbols}
+
+    def _fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        cached = self.fundamentals_cache.get(symbol)
+        if cached is not None:
+            return cached
+        time.sleep(self.io_latency)
+        return self.fundamentals_cache.put(symbol, synthetic_fundamentals(symbol))
+
+
+class OfflineNewsAgent(NewsScraperAgent):
+    api_key: str = "offline"
+    io_latency: float = 0.0
+
+    async def _fetch_articles(self, stock: str):
+        await asyncio.sleep(self.io_latency)
+        return synthetic_articles(stock)
+
+
+class OfflineInsightsAgent(StockInsightsAgent):
+    def resolve_to_symbol(self, name_or_symbol: str) -> str:
+        return name_or_symbol
+
+
+class FixtureLlm(BaseLlm):
+    """Extraction model: answers with the TKnnn tickers named in the user's message"""
+    model: str = "fixture-extractor"
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        text = " ".join(
+            part.text for content in llm_request.contents or [] if content.role == "user"
+            for part in content.parts or [] if part.text
+        )
+        symbols = list(dict.fromkeys(TICKER_PATTERN.findall(text)))
+        await asyncio.sleep(self.latency)
+        payload = {
+            "stocks": symbols,
+            "search_queries": [f'("{s} Corp") AND ("stock market" OR "earnings" OR "share price")' for s in symbols],
+        }
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=json.dumps(payload))]))
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _Stream:
+    def __init__(self, text: str, latency: float, chunk_chars: int = 400):
+        self.chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self.delay = latency / max(1, len(self.chunks))
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield _Chunk(chunk)
+
+
+class FixtureGenerativeModel:
+    """`GenerativeModel` stand-in streaming a fixed report over `latency` seconds"""
+
+    def __init__(self, report: str, latency: float = 0.0):
+        self.report = report
+        self.latency = latency
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            return _Stream(self.report, self.latency)
+        await asyncio.sleep(self.latency)
+        return _Chunk(self.report.split("\n\n", 2)[1])
+
+
+class OfflineGeminiClient(GeminiClient):
+    """Fixture models behind a real scheduler whose limits never bind"""
+
+    def __init__(self, llm_latency: float = 0.0):
+        super().__init__(scheduler=QuotaScheduler(default_rpm=10 ** 6, default_tpm=10 ** 12, limits={}))
+        self.fixture = FixtureGenerativeModel(synthetic_report(), llm_latency)
+
+    def _generative_model(self, model_name: str, api_key: Optional[str]) -> FixtureGenerativeModel:
+        return self.fixture
+
+
+def offline_agents(llm_latency: float = 0.0, io_latency: float = 0.0) -> Dict[str, BaseAgent]:
+    """Each pipeline stage wired to fixtures, plus the full pipeline (`root_agent`) built from them"""
+    parser = stock_parser.model_copy(update={
+        "model": FixtureLlm(latency=llm_latency),
+        "before_model_callback": None,
+        "after_model_callback": None,
+        "parent_agent": None,
+    })
+    news = OfflineNewsAgent()
+    news.io_latency = io_latency
+    market = OfflineMarketDataAgent()
+    market.io_latency = io_latency
+    report = ReportGeneratorAgent()
+    report.gemini_api_key = "offline"
+    report.gemini_client = OfflineGeminiClient(llm_latency)
+    # Every request generates; the response cache would turn the stage into a lookup
+    report.use_llm_cache = False
+    agents = {
+        "parser": parser,
+        "news": news,
+        "market": market,
+        "analytics": AnalyticsAgent(),
+        "portfolio": PortfolioAnalyticsAgent(),
+        "report": report,
+    }
+    agents["pipeline"] = OfflineInsightsAgent(
+        stock_parser=parser,
+        news_agent=news,
+        market_agent=market,
+        analytics_agent=agents["analytics"],
+        report_agent=report,
+        portfolio_agent=agents["portfolio"],
+    )
+    return agents